@@ -20,7 +20,11 @@ function Booking() {
       <div className="booked-properties">
         {bookedProperties.map(booking => (
           <div key={booking.id} className="booked-property-card">
-            <img src={booking.property_image_link} alt={`Booked Property ${booking.id}`} />
+            <img
+              src={booking.property_thumbnail_link || booking.property_image_link}
+              loading="lazy"
+              alt={`Booked Property ${booking.id}`}
+            />
             <div className="booked-property-details">
               <h3>Property ID: {booking.property_id}</h3>
               <p>User ID: {booking.user_id}</p>
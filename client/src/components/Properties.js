@@ -4,7 +4,9 @@ import './Properties.css';
 
 function Properties() {
   const [properties, setProperties] = useState([]);
-  const [currentPage, setCurrentPage] = useState(1);
+  // Cursors of the pages visited so far; the last entry is the current page
+  const [cursors, setCursors] = useState([""]);
+  const [nextCursor, setNextCursor] = useState(null);
   const propertiesPerPage = 12;
 
   // New state for user details
@@ -15,29 +17,32 @@ function Properties() {
     check_out_date: "",
   });
 
+  const currentCursor = cursors[cursors.length - 1];
+
   useEffect(() => {
-    // Fetch properties from the backend API
-    fetch("/get_all_properties")
+    // Fetch one page of properties from the backend API
+    const params = new URLSearchParams({ limit: propertiesPerPage });
+    if (currentCursor) {
+      params.set("cursor", currentCursor);
+    }
+    fetch(`/get_all_properties?${params}`)
       .then(response => response.json())
       .then(data => {
-        setProperties(data.properties);
+        setProperties(data.properties || []);
+        setNextCursor(data.next_cursor || null);
       })
       .catch(error => console.error('Error fetching properties:', error));
-  }, []);
-
-  const indexOfLastProperty = currentPage * propertiesPerPage;
-  const indexOfFirstProperty = indexOfLastProperty - propertiesPerPage;
-  const currentProperties = properties.slice(indexOfFirstProperty, indexOfLastProperty);
+  }, [currentCursor]);
 
   const nextPage = () => {
-    if (indexOfLastProperty < properties.length) {
-      setCurrentPage(currentPage + 1);
+    if (nextCursor) {
+      setCursors([...cursors, nextCursor]);
     }
   };
 
   const prevPage = () => {
-    if (currentPage > 1) {
-      setCurrentPage(currentPage - 1);
+    if (cursors.length > 1) {
+      setCursors(cursors.slice(0, -1));
     }
   };
 
@@ -99,9 +104,15 @@ function Properties() {
         <button onClick={nextPage}>Next</button>
       </div>
       <div className="property-grid">
-        {currentProperties.map(property => (
+        {properties.map(property => (
           <div key={property.id} className="property-card">
-            <img src={property.image_link} alt={property.title} />
+            <img
+              src={property.thumbnail_link || property.image_link}
+              srcSet={property.image_srcset || undefined}
+              sizes="320px"
+              loading="lazy"
+              alt={property.title}
+            />
             <div className="property-details">
               <h3>{property.title}</h3>
               <p>{property.location}</p>
@@ -1,36 +1,77 @@
-from flask import Flask, jsonify, request
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_bcrypt import Bcrypt
+import io
+import click
+from functools import wraps
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, send_from_directory, stream_with_context, url_for
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from sqlalchemy import text
+from flask_jwt_extended import (
+    create_access_token, get_current_user, get_jwt, get_jwt_identity, jwt_required, verify_jwt_in_request,
+)
+from sqlalchemy import func, select, text, and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from models import db, Property, User, Booking
+from pagination import PaginationError, parse_limit, encode_cursor, decode_cursor
+from instrumentation import Instrumentation
+from compression import Compression
+from ratelimit import RateLimiter
+from hashing import PasswordHasher, HasherSaturated
+from auth import CachedJWTManager
+from booking_queue import BookingQueue, IdempotencyKeyReused, QueueFull, MAX_IDEMPOTENCY_KEY_LENGTH
+from cache import ResponseCache, property_key, query_string_key
+from conditional import row_etag, rows_etag, http_date, is_not_modified, not_modified_response, conditional_json
+from importer import REQUIRED_PROPERTY_FIELDS, DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE, iter_rows, import_properties
+from export import EXPORTS, CONTENT_TYPES, generate_export
+from serializers import (
+    FieldSelectionError, USER_SCHEMA, PROPERTY_SCHEMA, BOOKING_SCHEMA, USER_LIST_FIELDS,
+    PROPERTY_LIST_FIELDS, PROPERTY_DETAIL_FIELDS, BOOKING_FIELDS, configure_json,
+)
+from geo import CoordinateError, DEFAULT_RADIUS_KM, MAX_RADIUS_KM, is_geo_table, parse_coordinates, nearby_property_ids, register_sql_functions
+from search import is_search_table, search_properties, rebuild_index
+from loader import InvalidIds, loader, parse_ids, register_loader
+from facets import is_facet_table, property_facets, rebuild_facets
+from users import (
+    InvalidUserBatch, PREFIX_COLUMNS, delete_users, parse_user_changes, parse_user_ids, prefix_filter, update_users,
+)
+from occupancy import InvalidPeriod, occupancy_report, parse_month, parse_year, property_calendar, rebuild_occupancy
+from similarity import DEFAULT_K, SimilarityIndex
+from images import ImagePipeline, ImageError, DIGEST_RE, IMMUTABLE_CACHE_CONTROL
+from availability import (
+    BOOKING_DATE_FORMAT, BookingConflict, InvalidBooking, PropertyNotFound, parse_booking, reserve, available_properties,
+)
+from config import Config
+from database import engine_options, configure_engine
 from datetime import datetime
-from key import secret_key
-
-app = Flask(__name__)
-bcrypt = Bcrypt(app)
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///real_estate.db"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["JWT_SECRET_KEY"] = "secret_key"  
-migrate = Migrate(app, db)
-db.init_app(app)
-CORS(app)
-jwt = JWTManager(app)
-
-@app.route("/")
+from key import instance_secret_key
+
+def include_name(name, type_, parent_names):
+    if type_ == "table":
+        return not (is_search_table(name) or is_geo_table(name) or is_facet_table(name))
+    return True
+
+cors = CORS()
+jwt = CachedJWTManager()
+cache = ResponseCache()
+hasher = PasswordHasher()
+booking_queue = BookingQueue()
+images = ImagePipeline()
+similarity = SimilarityIndex()
+compression = Compression()
+limiter = RateLimiter()
+instrumentation = Instrumentation()
+
+bp = Blueprint("api", __name__, cli_group=None)
+
+@bp.route("/")
 def home():
     data = {"Server side": "Real Estate"}
     return jsonify(data), 200
 
-@app.route("/protected_route", methods=["GET"])
+@bp.route("/protected_route", methods=["GET"])
 @jwt_required()
 def protected_route():
-    current_user = get_jwt_identity()
-    return jsonify(logged_in_as=current_user), 200
+    return jsonify(logged_in_as=get_current_user()), 200
 
-@app.route("/user_signup", methods=["POST"])
+@bp.route("/user_signup", methods=["POST"])
 def create_user():
     try:
         data = request.get_json()
@@ -48,7 +89,7 @@ def create_user():
                     400,
                 )
 
-        hashed_password = bcrypt.generate_password_hash(data["password"]).decode("utf-8")
+        hashed_password = hasher.hash(data["password"])
         new_user = User(
             username=data["username"],
             email=data["email"],
@@ -68,10 +109,12 @@ def create_user():
             201,
         )
 
+    except HasherSaturated as e:
+        return jsonify({"error": True, "message": str(e)}), 429, {"Retry-After": "1"}
     except Exception as e:
         return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
     
-@app.route("/user_signin", methods=["POST"])
+@bp.route("/user_signin", methods=["POST"])
 def user_signin():
     try:
         data = request.get_json()
@@ -82,17 +125,49 @@ def user_signin():
 
         user = User.query.filter_by(username=data["username"]).first()
 
-        if user and bcrypt.check_password_hash(user.password, data["password"]):
-            # Create JWT token
-            access_token = create_access_token(identity={"username": user.username})
-            return jsonify({"access_token": access_token}), 200
+        if user and hasher.check(user.password, data["password"]):
+            if hasher.needs_rehash(user.password):
+                user.password = hasher.hash(data["password"])
+                db.session.commit()
+
+            # Create JWT tokens
+            return jsonify(jwt.issue_tokens(user)), 200
         else:
             return jsonify({"error": True, "message": "Invalid username or password"}), 401
 
+    except HasherSaturated as e:
+        return jsonify({"error": True, "message": str(e)}), 429, {"Retry-After": "1"}
     except Exception as e:
         return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
 
-@app.route("/delete_user/<int:user_id>", methods=["DELETE"])
+@bp.route("/token/refresh", methods=["POST"])
+@jwt_required(refresh=True)
+def refresh_token():
+    try:
+        user = get_current_user()
+        access_token = create_access_token(identity=str(user["id"]), additional_claims={"username": user["username"]})
+        return jsonify({"access_token": access_token}), 200
+
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/token/revoke", methods=["POST"])
+@jwt_required(verify_type=False)
+def revoke_token():
+    try:
+        token = get_jwt()
+        jwt.revocations.revoke(token)
+        return jsonify({"message": f"{token['type'].capitalize()} token revoked"}), 200
+
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/me", methods=["GET"])
+@jwt_required()
+def get_me():
+    return jsonify(get_current_user()), 200
+
+@bp.route("/delete_user/<int:user_id>", methods=["DELETE"])
 def delete_user(user_id):
     try:
         user_to_delete = User.query.get(user_id)
@@ -101,13 +176,14 @@ def delete_user(user_id):
 
         db.session.delete(user_to_delete)
         db.session.commit()
+        jwt.forget_user(user_id)
 
         return jsonify({"id": user_to_delete.id, "message": "User deleted successfully"}), 200
 
     except Exception as e:
         return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
 
-@app.route("/update_user/<int:user_id>", methods=["PATCH"])
+@bp.route("/update_user/<int:user_id>", methods=["PATCH"])
 def update_user(user_id):
     try:
         data = request.get_json()
@@ -124,11 +200,15 @@ def update_user(user_id):
                 404,
             )
 
+        if data.get("password"):
+            data["password"] = hasher.hash(data["password"])
+
         for key, value in data.items():
             if hasattr(user_to_update, key):
                 setattr(user_to_update, key, value)
 
         db.session.commit()
+        jwt.forget_user(user_id)
 
         return (
             jsonify(
@@ -141,22 +221,106 @@ def update_user(user_id):
             200,
         )
 
+    except HasherSaturated as e:
+        return jsonify({"error": True, "message": str(e)}), 429, {"Retry-After": "1"}
     except Exception as e:
         return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
 
-@app.route("/get_all_users", methods=["GET"])
+@bp.route("/get_all_users", methods=["GET"])
 def get_all_users():
     try:
-        users = User.query.all()
-        user_list = [{"username": user.username, "email": user.email} for user in users]
+        limit = parse_limit(request.args.get("limit"))
+        fields = USER_SCHEMA.parse_fields(request.args.get("fields"), USER_LIST_FIELDS)
+        prefixes = {name: request.args.get(f"{name}_prefix") for name in PREFIX_COLUMNS if request.args.get(f"{name}_prefix")}
+        if len(prefixes) > 1:
+            return jsonify({"error": True, "message": "Use either username_prefix or email_prefix"}), 400
+
+        # Keyset pagination on the column being searched, so both the prefix
+        # match and the page walk one unique index; by id otherwise.
+        if prefixes:
+            name, prefix = prefixes.popitem()
+            order_column, cursor_type = PREFIX_COLUMNS[name], str
+            query = User.query.filter(prefix_filter(order_column, prefix))
+        else:
+            order_column, cursor_type = User.id, int
+            query = User.query
+        values = decode_cursor(request.args.get("cursor"), (cursor_type,))
+        if values:
+            query = query.filter(order_column > values[0])
+
+        users = (
+            query.with_entities(*USER_SCHEMA.columns(fields, extra=(order_column,)))
+            .order_by(order_column.asc())
+            .limit(limit + 1)
+            .all()
+        )
+
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_cursor = encode_cursor(getattr(users[-1], order_column.key))
+
+        serialize = USER_SCHEMA.serializer(fields)
+        user_list = [serialize(user) for user in users]
+
+        return jsonify({"users": user_list, "next_cursor": next_cursor}), 200
+
+    except (PaginationError, FieldSelectionError) as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/users/bulk", methods=["PATCH"])
+def bulk_update_users():
+    try:
+        changes = parse_user_changes(request.get_json(silent=True), current_app.config["USER_BULK_MAX_IDS"])
+        updated = update_users(changes)
+        db.session.commit()
+        for user_id in updated:
+            jwt.forget_user(user_id)
 
-        return jsonify({"users": user_list}), 200
+        not_found = sorted(set(changes) - set(updated))
+        return jsonify({"updated": updated, "not_found": not_found, "message": f"{len(updated)} users updated"}), 200
 
+    except InvalidUserBatch as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": True, "message": "Username or email already taken, nothing was updated"}), 409
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
 
+@bp.route("/users/bulk", methods=["DELETE"])
+def bulk_delete_users():
+    try:
+        user_ids = parse_user_ids(request.get_json(silent=True), current_app.config["USER_BULK_MAX_IDS"])
+        deleted, booking_count = delete_users(user_ids)
+        db.session.commit()
+        for user_id in deleted:
+            jwt.forget_user(user_id)
 
-@app.route("/create_property", methods=["POST"])
+        not_found = sorted(set(user_ids) - set(deleted))
+        return (
+            jsonify(
+                {
+                    "deleted": deleted,
+                    "not_found": not_found,
+                    "bookings_deleted": booking_count,
+                    "message": f"{len(deleted)} users deleted",
+                }
+            ),
+            200,
+        )
+
+    except InvalidUserBatch as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+
+@bp.route("/create_property", methods=["POST"])
 def create_property():
     try:
         data = request.get_json()
@@ -166,14 +330,18 @@ def create_property():
                 400,
             )
 
-        required_fields = ["title", "description", "price", "bedrooms", "bathrooms", "location", "image_link"]
-        for field in required_fields:
+        for field in REQUIRED_PROPERTY_FIELDS:
             if field not in data or not data[field]:
                 return (
                     jsonify({"error": True, "message": f"Missing or empty {field}"}),
                     400,
                 )
 
+        try:
+            latitude, longitude = parse_coordinates(data.get("latitude"), data.get("longitude"))
+        except CoordinateError as e:
+            return jsonify({"error": True, "message": str(e)}), 400
+
         new_property = Property(
             title=data["title"],
             description=data["description"],
@@ -182,9 +350,15 @@ def create_property():
             bathrooms=data["bathrooms"],
             location=data["location"],
             image_link=data["image_link"],
+            latitude=latitude,
+            longitude=longitude,
         )
         db.session.add(new_property)
         db.session.commit()
+        cache.write_through(property_key(new_property.id), _written_property_entry(new_property))
+        cache.invalidate_namespace("properties")
+        images.schedule(new_property.id, new_property.image_link)
+        similarity.schedule_sync([new_property.id])
 
         return (
             jsonify(
@@ -200,51 +374,393 @@ def create_property():
     except Exception as e:
         return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
     
-@app.route("/get_property_by_id/<int:property_id>", methods=["GET"])
+PROPERTY_FIELDS = tuple(PROPERTY_SCHEMA.fields)
+
+def _property_entry(info, version, updated_at):
+    return {
+        "property": info,
+        "etag": row_etag("property", info["id"], version),
+        "last_modified": http_date(updated_at),
+    }
+
+def _forget_property(property_id):
+    cache.delete(property_key(property_id))
+    cache.invalidate_namespace("properties")
+
+def _written_property_entry(prop):
+    return _property_entry(PROPERTY_SCHEMA.dump(prop, PROPERTY_FIELDS), prop.version, prop.updated_at)
+
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/json-lines": "jsonl",
+}
+
+@bp.route("/properties/bulk", methods=["POST"])
+def bulk_create_properties():
+    try:
+        fmt = request.args.get("format") or IMPORT_CONTENT_TYPES.get(request.mimetype)
+        if fmt not in ("csv", "jsonl"):
+            return (
+                jsonify({"error": True, "message": "Send text/csv or application/x-ndjson, or pass format=csv|jsonl"}),
+                415,
+            )
+
+        batch_size = parse_limit(request.args.get("batch_size"), DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE, "batch_size")
+        lines = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+        # Imported rows get ids above the current maximum, so the similarity
+        # index only has to look at those.
+        last_id = db.session.query(func.max(Property.id)).scalar() or 0
+        report = import_properties(iter_rows(lines, fmt), batch_size)
+        if report.inserted:
+            cache.invalidate_namespace("properties")
+            similarity.schedule_sync(db.session.scalars(select(Property.id).where(Property.id > last_id)).all())
+
+        return jsonify(report.to_dict()), 200
+
+    except PaginationError as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/get_property_by_id/<int:property_id>", methods=["GET"])
 def get_property_by_id(property_id):
     try:
-        property_details = Property.query.get(property_id)
-        if not property_details:
+        fields = PROPERTY_SCHEMA.parse_fields(request.args.get("fields"), PROPERTY_DETAIL_FIELDS)
+
+        entry = loader("property").load(property_id)
+        if entry is None:
             return (
                 jsonify({"error": True, "message": "Property not found"}),
                 404,
             )
 
-        property_info = {
-            "title": property_details.title,
-            "description": property_details.description,
-            "price": property_details.price,
-            "bedrooms": property_details.bedrooms,
-            "bathrooms": property_details.bathrooms,
-            "location": property_details.location,
-            "image_link": property_details.image_link,
-        }
+        # Each field selection is its own representation, so it gets its own tag.
+        etag = entry["etag"] if fields == PROPERTY_DETAIL_FIELDS else row_etag(entry["etag"], *fields)
+        if is_not_modified(etag, entry["last_modified"]):
+            return not_modified_response(etag, entry["last_modified"])
 
-        return jsonify({"property": property_info}), 200
+        property_info = {name: entry["property"][name] for name in fields}
+        return conditional_json({"property": property_info}, etag, entry["last_modified"])
 
+    except FieldSelectionError as e:
+        return jsonify({"error": True, "message": str(e)}), 400
     except Exception as e:
         return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
 
-@app.route("/get_all_properties", methods=["GET"])
+def _load_property_entries(property_ids):
+    # Cached entries first, then one IN query for the rest.
+    entries = {
+        property_id: entry
+        for property_id, entry in zip(property_ids, cache.get_many([property_key(i) for i in property_ids]))
+        if entry is not None
+    }
+    missing = [property_id for property_id in property_ids if property_id not in entries]
+    if missing:
+        rows = (
+            Property.query.with_entities(
+                *PROPERTY_SCHEMA.columns(PROPERTY_FIELDS, extra=(Property.version, Property.updated_at))
+            )
+            .filter(Property.id.in_(missing))
+            .all()
+        )
+        serialize = PROPERTY_SCHEMA.serializer(PROPERTY_FIELDS)
+        for row in rows:
+            entry = _property_entry(serialize(row), row.version, row.updated_at)
+            cache.set(property_key(row.id), entry)
+            entries[row.id] = entry
+    return entries
+
+register_loader("property", _load_property_entries)
+
+@bp.route("/properties/batch", methods=["GET"])
+def get_properties_batch():
+    try:
+        property_ids = parse_ids(request.args.get("ids"), current_app.config["BATCH_MAX_IDS"])
+        fields = PROPERTY_SCHEMA.parse_fields(request.args.get("fields"), PROPERTY_DETAIL_FIELDS)
+        entries = loader("property").load_many(property_ids)
+
+        results = []
+        for property_id, entry in zip(property_ids, entries):
+            if entry is None:
+                results.append({"id": property_id, "error": "not_found"})
+            else:
+                results.append({"id": property_id, "property": {name: entry["property"][name] for name in fields}})
+
+        found = [entry for entry in entries if entry is not None]
+        etag = row_etag("properties-batch", *fields, *[entry["etag"] if entry else "-" for entry in entries])
+        last_modified = max((entry["last_modified"] for entry in found if entry["last_modified"]), default=None)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        return conditional_json({"properties": results}, etag, last_modified)
+
+    except (InvalidIds, FieldSelectionError) as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+PROPERTY_SORTS = {
+    "id": (Property.id.asc(),),
+    "newest": (Property.id.desc(),),
+    "price_asc": (Property.price.asc(), Property.id.asc()),
+    "price_desc": (Property.price.desc(), Property.id.desc()),
+}
+
+def _float_arg(name):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise PaginationError(f"{name} must be a number")
+
+def _int_arg(name):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise PaginationError(f"{name} must be an integer")
+
+def _filtered_properties_query():
+    query = Property.query
+
+    min_price = _float_arg("min_price")
+    max_price = _float_arg("max_price")
+    bedrooms = _int_arg("bedrooms")
+    bathrooms = _int_arg("bathrooms")
+    location = request.args.get("location")
+
+    if location:
+        query = query.filter(Property.location == location)
+    if bedrooms is not None:
+        query = query.filter(Property.bedrooms >= bedrooms)
+    if bathrooms is not None:
+        query = query.filter(Property.bathrooms >= bathrooms)
+    if min_price is not None:
+        query = query.filter(Property.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Property.price <= max_price)
+
+    return query
+
+def _apply_property_cursor(query, sort, cursor):
+    if sort == "id":
+        values = decode_cursor(cursor, (int,))
+        if values:
+            query = query.filter(Property.id > values[0])
+    elif sort == "newest":
+        values = decode_cursor(cursor, (int,))
+        if values:
+            query = query.filter(Property.id < values[0])
+    else:
+        values = decode_cursor(cursor, (float, int))
+        if values:
+            price, last_id = values
+            if sort == "price_asc":
+                query = query.filter(
+                    or_(Property.price > price, and_(Property.price == price, Property.id > last_id))
+                )
+            else:
+                query = query.filter(
+                    or_(Property.price < price, and_(Property.price == price, Property.id < last_id))
+                )
+    return query
+
+def _property_cursor(prop, sort):
+    if sort in ("id", "newest"):
+        return encode_cursor(prop.id)
+    return encode_cursor(prop.price, prop.id)
+
+@bp.route("/get_all_properties", methods=["GET"])
 def get_all_properties():
     try:
-        properties = Property.query.all()
-        property_list = [
-            {
-                "id": prop.id,
-                "title": prop.title,
-                "price": prop.price,
-                "location": prop.location,
-                "image_link": prop.image_link,  
-            }
-            for prop in properties
-        ]
+        sort = request.args.get("sort", "id")
+        if sort not in PROPERTY_SORTS:
+            return (
+                jsonify({"error": True, "message": f"Invalid sort, expected one of {', '.join(PROPERTY_SORTS)}"}),
+                400,
+            )
+
+        listing_key = cache.namespace_key("properties", query_string_key(request.args))
+        entry = cache.get(listing_key)
+        if entry is not None:
+            if is_not_modified(entry["etag"], entry["last_modified"]):
+                return not_modified_response(entry["etag"], entry["last_modified"])
+            return conditional_json(entry["payload"], entry["etag"], entry["last_modified"])
+
+        limit = parse_limit(request.args.get("limit"))
+        fields = PROPERTY_SCHEMA.parse_fields(request.args.get("fields"), PROPERTY_LIST_FIELDS)
+        columns = PROPERTY_SCHEMA.columns(
+            fields, extra=(Property.id, Property.price, Property.version, Property.updated_at)
+        )
+        query = _filtered_properties_query().with_entities(*columns)
+        query = _apply_property_cursor(query, sort, request.args.get("cursor"))
+        properties = query.order_by(*PROPERTY_SORTS[sort]).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(properties) > limit:
+            properties = properties[:limit]
+            next_cursor = _property_cursor(properties[-1], sort)
+
+        etag = rows_etag(query_string_key(request.args), [(prop.id, prop.version) for prop in properties])
+        last_modified = http_date(max((prop.updated_at for prop in properties if prop.updated_at), default=None))
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
+        serialize = PROPERTY_SCHEMA.serializer(fields)
+        property_list = [serialize(prop) for prop in properties]
+
+        payload = {"properties": property_list, "next_cursor": next_cursor}
+        cache.set(listing_key, {"payload": payload, "etag": etag, "last_modified": last_modified})
+
+        return conditional_json(payload, etag, last_modified)
+
+    except (PaginationError, FieldSelectionError) as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+def _date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        raise PaginationError(f"Missing or empty {name}")
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise PaginationError(f"{name} must be a date in YYYY-MM-DD format")
+
+@bp.route("/properties/available", methods=["GET"])
+def get_available_properties():
+    try:
+        start = _date_arg("from")
+        end = _date_arg("to")
+        if end <= start:
+            return jsonify({"error": True, "message": "to must be after from"}), 400
+
+        limit = parse_limit(request.args.get("limit"))
+        fields = PROPERTY_SCHEMA.parse_fields(request.args.get("fields"), PROPERTY_LIST_FIELDS)
+        query = available_properties(_filtered_properties_query(), start, end)
+        query = query.with_entities(*PROPERTY_SCHEMA.columns(fields, extra=(Property.id,)))
+        query = _apply_property_cursor(query, "id", request.args.get("cursor"))
+        properties = query.order_by(Property.id.asc()).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(properties) > limit:
+            properties = properties[:limit]
+            next_cursor = _property_cursor(properties[-1], "id")
+
+        serialize = PROPERTY_SCHEMA.serializer(fields)
+        property_list = [serialize(prop) for prop in properties]
+
+        return jsonify({"properties": property_list, "next_cursor": next_cursor}), 200
+
+    except (PaginationError, FieldSelectionError) as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/properties/facets", methods=["GET"])
+def get_property_facets():
+    try:
+        facets_key = cache.namespace_key("properties", "facets")
+        facets = cache.get(facets_key)
+        if facets is None:
+            facets = property_facets()
+            cache.set(facets_key, facets)
+        return jsonify(facets), 200
+
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/properties/occupancy", methods=["GET"])
+def get_occupancy_report():
+    try:
+        report = occupancy_report(parse_year(request.args.get("year")), parse_month(request.args.get("month")))
+        return jsonify(report), 200
+
+    except InvalidPeriod as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/properties/nearby", methods=["GET"])
+def get_nearby_properties():
+    try:
+        latitude, longitude = parse_coordinates(request.args.get("lat"), request.args.get("lng"))
+        if latitude is None:
+            return jsonify({"error": True, "message": "Missing or empty lat/lng"}), 400
+        radius = _float_arg("radius")
+        radius = DEFAULT_RADIUS_KM if radius is None else radius
+        if not 0 < radius <= MAX_RADIUS_KM:
+            return jsonify({"error": True, "message": f"radius must be between 0 and {MAX_RADIUS_KM} km"}), 400
+
+        limit = parse_limit(request.args.get("limit"))
+        fields = PROPERTY_SCHEMA.parse_fields(request.args.get("fields"), PROPERTY_LIST_FIELDS)
+
+        values = decode_cursor(request.args.get("cursor"), (float, int))
+        after = (values[0], values[1]) if values else None
+        matches = nearby_property_ids(latitude, longitude, radius, limit + 1, after)
+
+        page = matches[:limit]
+        next_cursor = encode_cursor(*page[-1]) if len(matches) > limit else None
+
+        ids = [property_id for _, property_id in page]
+        rows = (
+            Property.query.with_entities(*PROPERTY_SCHEMA.columns(fields, extra=(Property.id,)))
+            .filter(Property.id.in_(ids))
+            .all()
+        ) if ids else []
+        serialize = PROPERTY_SCHEMA.serializer(fields)
+        by_id = {row.id: serialize(row) for row in rows}
+
+        property_list = []
+        for distance, property_id in page:
+            if property_id in by_id:
+                property_list.append({**by_id[property_id], "distance_km": round(distance, 3)})
 
-        return jsonify({"properties": property_list}), 200
+        return jsonify({"properties": property_list, "next_cursor": next_cursor}), 200
 
+    except (PaginationError, FieldSelectionError, CoordinateError) as e:
+        return jsonify({"error": True, "message": str(e)}), 400
     except Exception as e:
         return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
-@app.route("/update_property/<int:property_id>", methods=["PATCH"])
+
+@bp.route("/search", methods=["GET"])
+def search():
+    try:
+        query = request.args.get("q", "").strip()
+        if not query:
+            return jsonify({"error": True, "message": "Missing or empty q"}), 400
+
+        limit = parse_limit(request.args.get("limit"))
+        fields = PROPERTY_SCHEMA.parse_fields(request.args.get("fields"), PROPERTY_LIST_FIELDS)
+        values = decode_cursor(request.args.get("cursor"), (int,))
+        offset = values[0] if values else 0
+        if offset < 0:
+            raise PaginationError("Invalid cursor")
+
+        rows = search_properties(query, PROPERTY_SCHEMA.columns(fields), limit + 1, offset)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(offset + limit)
+
+        serialize = PROPERTY_SCHEMA.serializer(fields)
+        property_list = [serialize(row) for row in rows]
+
+        return jsonify({"properties": property_list, "next_cursor": next_cursor}), 200
+
+    except (PaginationError, FieldSelectionError) as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/update_property/<int:property_id>", methods=["PATCH"])
 def update_property(property_id):
     try:
         data = request.get_json()
@@ -261,11 +777,30 @@ def update_property(property_id):
                 404,
             )
 
+        if "latitude" in data or "longitude" in data:
+            try:
+                data["latitude"], data["longitude"] = parse_coordinates(
+                    data.get("latitude", property_to_update.latitude),
+                    data.get("longitude", property_to_update.longitude),
+                )
+            except CoordinateError as e:
+                return jsonify({"error": True, "message": str(e)}), 400
+
+        data.pop("image_digest", None)
+        image_changed = "image_link" in data and data["image_link"] != property_to_update.image_link
+        if image_changed:
+            data["image_digest"] = None
+
         for key, value in data.items():
             if hasattr(property_to_update, key):
                 setattr(property_to_update, key, value)
 
         db.session.commit()
+        cache.write_through(property_key(property_id), _written_property_entry(property_to_update))
+        cache.invalidate_namespace("properties")
+        similarity.schedule_sync([property_id])
+        if image_changed:
+            images.schedule(property_id, property_to_update.image_link)
 
         return (
             jsonify(
@@ -278,10 +813,57 @@ def update_property(property_id):
             200,
         )
 
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({"error": True, "message": "Property was modified concurrently, retry the update"}), 409
     except Exception as e:
         return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
     
-@app.route("/delete_property/<int:property_id>", methods=["DELETE"])
+@bp.route("/properties/<int:property_id>/image", methods=["PUT"])
+def upload_property_image(property_id):
+    try:
+        if not images.enabled:
+            return jsonify({"error": True, "message": "Image uploads are disabled"}), 404
+        if request.content_length and request.content_length > images.max_bytes:
+            return jsonify({"error": True, "message": f"Image is larger than {images.max_bytes} bytes"}), 413
+
+        upload = request.files.get("image")
+        data = upload.read() if upload is not None else request.get_data()
+        if not data:
+            return jsonify({"error": True, "message": "Missing image, send it as the 'image' form field or the body"}), 400
+
+        property_to_update = Property.query.get(property_id)
+        if not property_to_update:
+            return jsonify({"error": True, "message": "Property not found"}), 404
+
+        try:
+            property_to_update.image_link = images.save_upload(data)
+        except ImageError as e:
+            return jsonify({"error": True, "message": str(e)}), 415
+        property_to_update.image_digest = None
+        db.session.commit()
+        cache.write_through(property_key(property_id), _written_property_entry(property_to_update))
+        cache.invalidate_namespace("properties")
+        images.schedule(property_id, property_to_update.image_link)
+
+        return jsonify({"id": property_id, "image_link": property_to_update.image_link, "message": "Image uploaded"}), 202
+
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({"error": True, "message": "Property was modified concurrently, retry the upload"}), 409
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/images/<digest>/<name>", methods=["GET"])
+def get_image(digest, name):
+    if not DIGEST_RE.match(digest):
+        return jsonify({"error": True, "message": "Image not found"}), 404
+    # Content-addressed, so the file behind a URL never changes.
+    response = send_from_directory(images.directory(digest), name, max_age=31536000)
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+@bp.route("/delete_property/<int:property_id>", methods=["DELETE"])
 def delete_property(property_id):
     try:
         property_to_delete = Property.query.get(property_id)
@@ -293,6 +875,9 @@ def delete_property(property_id):
 
         db.session.delete(property_to_delete)
         db.session.commit()
+        cache.delete(property_key(property_id))
+        cache.invalidate_namespace("properties")
+        similarity.schedule_sync([property_id])
 
         return (
             jsonify(
@@ -307,29 +892,52 @@ def delete_property(property_id):
     except Exception as e:
         return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
 
-@app.route("/create_booking", methods=["POST"])
-def create_booking():
-    try:
-        data = request.get_json()
+@bp.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(cache.stats()), 200
 
-        if not data or not isinstance(data, dict):
-            return jsonify({"error": True, "message": "Invalid JSON data in request"}), 400
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    if not instrumentation.enabled:
+        return jsonify({"error": True, "message": "Metrics are disabled"}), 404
+    return Response(instrumentation.render(), mimetype="text/plain; version=0.0.4")
 
-        required_fields = ["user_id", "property_id", "check_in_date", "check_out_date"]
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({"error": True, "message": f"Missing or empty {field}"}), 400
+def booking_auth_required(view):
+    # Bookings are made as the token's user. BOOKING_BODY_USER_ID lets clients
+    # without a token keep booking as the user_id in the body while they move
+    # to tokens; it is off by default.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        verify_jwt_in_request(optional=current_app.config["BOOKING_BODY_USER_ID"])
+        return view(*args, **kwargs)
+    return wrapper
 
-        data["check_in_date"] = datetime.strptime(data["check_in_date"], "%dth %b %Y")
-        data["check_out_date"] = datetime.strptime(data["check_out_date"], "%dth %b %Y")
+def _parse_booking_request():
+    identity = get_jwt_identity()
+    if identity is not None:
+        return parse_booking(request.get_json(silent=True), int(identity))
+    values = parse_booking(request.get_json(silent=True))
+    if db.session.get(User, values["user_id"]) is None:
+        raise InvalidBooking(f"User with ID {values['user_id']} not found")
+    return values
 
-        new_booking = Booking(
-            user_id=data["user_id"],
-            property_id=data["property_id"],
-            check_in_date=data["check_in_date"],
-            check_out_date=data["check_out_date"],
-        )
-        db.session.add(new_booking)
+@bp.route("/create_booking", methods=["POST"])
+@booking_auth_required
+def create_booking():
+    try:
+        try:
+            new_booking = Booking(**_parse_booking_request())
+        except InvalidBooking as e:
+            return jsonify({"error": True, "message": str(e)}), 400
+
+        try:
+            reserve(new_booking)
+        except PropertyNotFound as e:
+            db.session.rollback()
+            return jsonify({"error": True, "message": str(e)}), 404
+        except BookingConflict as e:
+            db.session.rollback()
+            return jsonify({"error": True, "message": str(e)}), 409
         db.session.commit()
 
         return (
@@ -338,8 +946,8 @@ def create_booking():
                     "id": new_booking.id,
                     "user_id": new_booking.user_id,
                     "property_id": new_booking.property_id,
-                    "check_in_date": new_booking.check_in_date.strftime("%dth %b %Y"),
-                    "check_out_date": new_booking.check_out_date.strftime("%dth %b %Y"),
+                    "check_in_date": new_booking.check_in_date.strftime(BOOKING_DATE_FORMAT),
+                    "check_out_date": new_booking.check_out_date.strftime(BOOKING_DATE_FORMAT),
                     "message": "Booking created successfully",
                 }
             ),
@@ -347,57 +955,238 @@ def create_booking():
         )
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
 
     
-@app.route("/get_all_bookings", methods=["GET"])
-def get_all_bookings():
+@bp.route("/booking_requests", methods=["POST"])
+@booking_auth_required
+def create_booking_request():
+    if not booking_queue.enabled:
+        return jsonify({"error": True, "message": "Queued bookings are disabled"}), 404
     try:
-        bookings = Booking.query.all()
-        booking_list = []
+        key = request.headers.get("Idempotency-Key", "").strip()
+        if not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            return jsonify(
+                {"error": True, "message": f"Idempotency-Key header of 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters is required"}
+            ), 400
+        try:
+            values = _parse_booking_request()
+        except InvalidBooking as e:
+            return jsonify({"error": True, "message": str(e)}), 400
 
-        for booking in bookings:
-            property_details = Property.query.get(booking.property_id)
+        try:
+            status = booking_queue.submit(key, values)
+        except IdempotencyKeyReused as e:
+            return jsonify({"error": True, "message": str(e)}), 422
+        except QueueFull as e:
+            response = jsonify({"error": True, "message": str(e)})
+            response.headers["Retry-After"] = "1"
+            return response, 503
 
-            if property_details:
-                booking_info = {
-                    "user_id": booking.user_id,
-                    "property_id": booking.property_id,
-                    "check_in_date": str(booking.check_in_date),
-                    "check_out_date": str(booking.check_out_date),
-                    "property_image_link": property_details.image_link,
-                }
-                booking_list.append(booking_info)
+        return _booking_request_response(status)
+
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/booking_requests/<key>", methods=["GET"])
+def get_booking_request(key):
+    if not booking_queue.enabled:
+        return jsonify({"error": True, "message": "Queued bookings are disabled"}), 404
+    try:
+        status = booking_queue.status(key)
+        if status is None:
+            return jsonify({"error": True, "message": "Booking request not found"}), 404
+        return _booking_request_response(status)
+
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+def _booking_request_response(status):
+    status_url = url_for("api.get_booking_request", key=status["idempotency_key"])
+    response = jsonify(dict(status, status_url=status_url))
+    if status["status"] == "pending":
+        response.headers["Location"] = status_url
+        response.headers["Retry-After"] = "1"
+        return response, 202
+    return response, 200
+
+def _booking_rows(query, fields, extra=()):
+    # Inner join drops bookings whose property no longer exists and supplies
+    # property_image_link from the same query instead of one lookup per row.
+    columns = BOOKING_SCHEMA.columns(fields, extra=extra)
+    return query.join(Booking.property).with_entities(*columns)
+
+def _paginated_bookings(query):
+    limit = parse_limit(request.args.get("limit"))
+    fields = BOOKING_SCHEMA.parse_fields(request.args.get("fields"), BOOKING_FIELDS)
+    values = decode_cursor(request.args.get("cursor"), (int,))
+    if values:
+        query = query.filter(Booking.id > values[0])
+
+    bookings = (
+        _booking_rows(query, fields, extra=(Booking.id,))
+        .order_by(Booking.id.asc())
+        .limit(limit + 1)
+        .all()
+    )
+
+    next_cursor = None
+    if len(bookings) > limit:
+        bookings = bookings[:limit]
+        next_cursor = encode_cursor(bookings[-1].id)
+
+    serialize = BOOKING_SCHEMA.serializer(fields)
+    return [serialize(booking) for booking in bookings], next_cursor
+
+BOOKING_ALL_FIELDS = tuple(BOOKING_SCHEMA.fields)
+
+def _load_bookings(booking_ids):
+    rows = _booking_rows(Booking.query.filter(Booking.id.in_(booking_ids)), BOOKING_ALL_FIELDS).all()
+    serialize = BOOKING_SCHEMA.serializer(BOOKING_ALL_FIELDS)
+    return {row.id: serialize(row) for row in rows}
+
+register_loader("booking", _load_bookings)
+
+@bp.route("/bookings/batch", methods=["GET"])
+def get_bookings_batch():
+    try:
+        booking_ids = parse_ids(request.args.get("ids"), current_app.config["BATCH_MAX_IDS"])
+        fields = BOOKING_SCHEMA.parse_fields(request.args.get("fields"), BOOKING_FIELDS)
+
+        results = []
+        for booking_id, booking in zip(booking_ids, loader("booking").load_many(booking_ids)):
+            if booking is None:
+                results.append({"id": booking_id, "error": "not_found"})
+            else:
+                results.append({"id": booking_id, "booking": {name: booking[name] for name in fields}})
+
+        return jsonify({"bookings": results}), 200
+
+    except (InvalidIds, FieldSelectionError) as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/get_all_bookings", methods=["GET"])
+def get_all_bookings():
+    try:
+        fields = BOOKING_SCHEMA.parse_fields(request.args.get("fields"), BOOKING_FIELDS)
+        bookings = _booking_rows(Booking.query, fields).order_by(Booking.id.asc()).all()
+        serialize = BOOKING_SCHEMA.serializer(fields)
+        booking_list = [serialize(booking) for booking in bookings]
 
         return jsonify({"bookings": booking_list}), 200
 
+    except FieldSelectionError as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/users/<int:user_id>/bookings", methods=["GET"])
+def get_user_bookings(user_id):
+    try:
+        if not db.session.query(User.query.filter_by(id=user_id).exists()).scalar():
+            return jsonify({"error": True, "message": "User not found"}), 404
+
+        booking_list, next_cursor = _paginated_bookings(Booking.query.filter(Booking.user_id == user_id))
+
+        return jsonify({"bookings": booking_list, "next_cursor": next_cursor}), 200
+
+    except (PaginationError, FieldSelectionError) as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/me/bookings", methods=["GET"])
+@jwt_required()
+def get_my_bookings():
+    try:
+        booking_list, next_cursor = _paginated_bookings(Booking.query.filter(Booking.user_id == get_current_user()["id"]))
+
+        return jsonify({"bookings": booking_list, "next_cursor": next_cursor}), 200
+
+    except (PaginationError, FieldSelectionError) as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/properties/<int:property_id>/bookings", methods=["GET"])
+def get_property_bookings(property_id):
+    try:
+        if not db.session.query(Property.query.filter_by(id=property_id).exists()).scalar():
+            return jsonify({"error": True, "message": "Property not found"}), 404
+
+        booking_list, next_cursor = _paginated_bookings(Booking.query.filter(Booking.property_id == property_id))
+
+        return jsonify({"bookings": booking_list, "next_cursor": next_cursor}), 200
+
+    except (PaginationError, FieldSelectionError) as e:
+        return jsonify({"error": True, "message": str(e)}), 400
     except Exception as e:
         return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
         
-@app.route("/booking/<int:booking_id>")
+@bp.route("/properties/<int:property_id>/similar", methods=["GET"])
+def get_similar_properties(property_id):
+    try:
+        if not similarity.enabled:
+            return jsonify({"error": True, "message": "Similar properties are disabled"}), 404
+        k = parse_limit(request.args.get("k"), DEFAULT_K, current_app.config["SIMILAR_MAX_K"], "k")
+        fields = PROPERTY_SCHEMA.parse_fields(request.args.get("fields"), PROPERTY_LIST_FIELDS)
+        if loader("property").load(property_id) is None:
+            return jsonify({"error": True, "message": "Property not found"}), 404
+
+        matches = similarity.similar(property_id, k)
+        if matches is None:
+            similarity.schedule_sync()
+            return jsonify({"error": True, "message": "The similarity index is being built, retry shortly"}), 503, {"Retry-After": "5"}
+
+        entries = loader("property").load_many([match_id for match_id, _ in matches])
+        similar = [
+            dict({name: entry["property"][name] for name in fields}, score=round(score, 4))
+            for (_, score), entry in zip(matches, entries)
+            if entry is not None
+        ]
+        return jsonify({"property_id": property_id, "similar": similar}), 200
+
+    except (PaginationError, FieldSelectionError) as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/properties/<int:property_id>/calendar", methods=["GET"])
+def get_property_calendar(property_id):
+    try:
+        year = parse_year(request.args.get("year"))
+        if not db.session.query(Property.query.filter_by(id=property_id).exists()).scalar():
+            return jsonify({"error": True, "message": "Property not found"}), 404
+
+        return jsonify(property_calendar(property_id, year)), 200
+
+    except InvalidPeriod as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.route("/booking/<int:booking_id>")
 def get_booking(booking_id):
     try:
-        booking_details = Booking.query.get(booking_id)
+        fields = BOOKING_SCHEMA.parse_fields(request.args.get("fields"), BOOKING_FIELDS)
+        booking_details = loader("booking").load(booking_id)
         if not booking_details:
             return (
                 jsonify({"error": True, "message": "Booking not found"}),
                 404,
             )
 
-        booking_info = {
-            "user_id": booking_details.user_id,
-            "property_id": booking_details.property_id,
-            "check_in_date": str(booking_details.check_in_date),
-            "check_out_date": str(booking_details.check_out_date),
-            "property_image_link": booking_details.property_image_link,
-        }
-
-        return jsonify({"booking": booking_info}), 200
+        return jsonify({"booking": {name: booking_details[name] for name in fields}}), 200
 
+    except FieldSelectionError as e:
+        return jsonify({"error": True, "message": str(e)}), 400
     except Exception as e:
         return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
 
-@app.route("/delete_booking/<int:booking_id>", methods=["DELETE"])
+@bp.route("/delete_booking/<int:booking_id>", methods=["DELETE"])
 def delete_booking(booking_id):
     try:
         booking_to_delete = Booking.query.get(booking_id)
@@ -423,5 +1212,167 @@ def delete_booking(booking_id):
     except Exception as e:
         return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
     
+@bp.route("/export/<string:name>", methods=["GET"])
+def export_table(name):
+    try:
+        if name not in EXPORTS:
+            return jsonify({"error": True, "message": "Export not found"}), 404
+
+        fmt = request.args.get("format", "ndjson")
+        if fmt not in CONTENT_TYPES:
+            return jsonify({"error": True, "message": "format must be ndjson or csv"}), 400
+
+        after_id = request.args.get("after_id", 0)
+        try:
+            after_id = int(after_id)
+        except ValueError:
+            return jsonify({"error": True, "message": "after_id must be an integer"}), 400
+
+        return Response(
+            stream_with_context(generate_export(name, fmt, after_id)),
+            mimetype=CONTENT_TYPES[fmt],
+            headers={"Content-Disposition": f"attachment; filename={name}.{fmt}"},
+        )
+
+    except Exception as e:
+        return jsonify({"error": True, "message": f"An error occurred: {str(e)}"}), 500
+
+@bp.cli.command("rebuild-search-index")
+def rebuild_search_index():
+    """Rebuild the property full-text index from the property table."""
+    rebuild_index()
+    print("Search index rebuilt")
+
+@bp.cli.command("rebuild-facets")
+def rebuild_facets_command():
+    """Recompute the property facet summary tables from scratch."""
+    rebuild_facets()
+    cache.invalidate_namespace("properties")
+    print("Property facets rebuilt")
+
+@bp.cli.command("build-similarity")
+@click.option("--sync", "incremental", is_flag=True, help="Only re-vectorize properties changed since the last build.")
+def build_similarity_command(incremental):
+    """Build the similar-properties vector index from the property table."""
+    if not similarity.enabled:
+        print("Similar properties are disabled (SIMILAR_PROPERTIES=off or numpy is not installed)")
+        return
+    if incremental:
+        print(f"Similarity index synced ({similarity.sync()} properties updated)")
+    else:
+        print(f"Similarity index built ({similarity.build()} properties)")
+
+@bp.cli.command("rebuild-occupancy")
+def rebuild_occupancy_command():
+    """Recompute the property occupancy bitmaps from the booking table."""
+    print(f"Occupancy rebuilt ({rebuild_occupancy()} property months booked)")
+
+@bp.cli.command("purge-revoked-tokens")
+def purge_revoked_tokens():
+    """Forget revocations of tokens that have expired anyway."""
+    print(f"Purged {jwt.revocations.purge()} expired revocations")
+
+@bp.cli.command("generate-thumbnails")
+@click.option("--all", "regenerate", is_flag=True, help="Also redo properties that already have thumbnails.")
+def generate_thumbnails_command(regenerate):
+    """Fetch property images and render their thumbnails."""
+    query = db.session.query(Property.id, Property.image_link).filter(Property.image_link.isnot(None))
+    if not regenerate:
+        query = query.filter(Property.image_digest.is_(None))
+    done = failed = 0
+    for property_id, error in images.backfill(query.order_by(Property.id).all()):
+        if error is None:
+            done += 1
+        else:
+            failed += 1
+            print(f"  property {property_id}: {error}")
+    print(f"Thumbnails ready for {done} properties, {failed} failed")
+
+def _sync_new_properties(last_id):
+    # The process exits right after a command, before a background sync
+    # (schedule_sync) would run, so commands sync in the foreground.
+    if similarity.enabled:
+        new_ids = db.session.scalars(select(Property.id).where(Property.id > last_id)).all()
+        print(f"Similarity index synced ({similarity.sync(new_ids)} properties updated)")
+
+@bp.cli.command("import-properties")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["jsonl", "csv"]), help="Defaults to the file extension.")
+@click.option("--batch-size", default=DEFAULT_BATCH_SIZE, show_default=True, type=click.IntRange(1, MAX_BATCH_SIZE))
+def import_properties_command(path, fmt, batch_size):
+    """Bulk load properties from a JSON Lines or CSV file."""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    last_id = db.session.query(func.max(Property.id)).scalar() or 0
+    with open(path, encoding="utf-8", newline="") as lines:
+        report = import_properties(iter_rows(lines, fmt), batch_size)
+    if report.inserted:
+        cache.invalidate_namespace("properties")
+
+    print(f"Inserted {report.inserted} properties, {report.error_count} rows rejected")
+    for error in report.errors:
+        print(f"  row {error['row']}: {error['message']}")
+    if report.inserted:
+        _sync_new_properties(last_id)
+
+@bp.cli.command("seed")
+@click.option("--users", default=100, show_default=True, type=click.IntRange(0))
+@click.option("--properties", default=1000, show_default=True, type=click.IntRange(0))
+@click.option("--bookings", default=2000, show_default=True, type=click.IntRange(0))
+@click.option("--seed", "random_seed", default=0, show_default=True, help="Random seed for repeatable data.")
+def seed_command(users, properties, bookings, random_seed):
+    """Fill the database with generated users, properties and bookings."""
+    from benchmarks.seed import SEED_PASSWORD, seed_database
+
+    last_id = db.session.query(func.max(Property.id)).scalar() or 0
+    counts = seed_database(users, properties, bookings, hasher.hash(SEED_PASSWORD), random_seed)
+    # Seeded bookings are bulk inserted, bypassing the incremental updates.
+    rebuild_occupancy()
+    cache.invalidate_namespace("properties")
+    print("Seeded " + ", ".join(f"{count} {name}" for name, count in counts.items()))
+    print(f"Every seeded user's password is {SEED_PASSWORD!r}")
+    if properties:
+        _sync_new_properties(last_id)
+
+def _init_migrations(app):
+    # Alembic is only needed by the `flask db` commands and takes longer to
+    # import than the rest of the app, so servers and tests never load it.
+    from flask_migrate import Migrate
+
+    Migrate(app, db, include_name=include_name)
+
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
+    if not app.config["JWT_SECRET_KEY"]:
+        app.config["JWT_SECRET_KEY"] = instance_secret_key(app.instance_path)
+
+    configure_json(app)
+    db.init_app(app)
+    with app.app_context():
+        configure_engine(db.engine, app.config)
+        register_sql_functions(db.engine)
+        instrumentation.init_app(app, db.engine)
+    if click.get_current_context(silent=True) is not None:
+        # Created by the flask command line, which may run `flask db ...`.
+        _init_migrations(app)
+    cors.init_app(app)
+    jwt.init_app(app)
+    limiter.init_app(app)
+    cache.init_app(app)
+    hasher.init_app(app)
+    booking_queue.init_app(app)
+    images.init_app(app)
+    images.on_ready = _forget_property
+    similarity.init_app(app)
+    compression.init_app(app)
+
+    app.register_blueprint(bp)
+    return app
+
 if __name__ == "__main__":
-    app.run(port=4000, debug=True)
+    create_app().run(port=4000, debug=True)
@@ -0,0 +1,154 @@
+import threading
+import time
+from datetime import datetime, timezone
+from flask import jsonify
+from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token
+from cache import MemoryBackend
+from models import db, User, RevokedToken
+
+
+def _utc(timestamp):
+    # Stored naive in UTC like the other DateTime columns.
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def _auth_error(message):
+    return jsonify({"error": True, "message": message}), 401
+
+
+class RevocationList:
+    """Revoked token ids held in a dict for O(1) checks on every request.
+
+    Revocations are written to the revoked_token table so every process
+    sees them: each process pulls rows it has not seen yet at most once per
+    ``AUTH_REVOCATION_SYNC_SECONDS``, so a token revoked by another server
+    worker is rejected everywhere within that interval (immediately by the
+    worker that revoked it).
+    """
+
+    def __init__(self, sync_interval=5):
+        self.sync_interval = sync_interval
+        self._revoked = {}
+        self._last_id = 0
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def is_revoked(self, jti):
+        if self._synced_at is None or time.monotonic() - self._synced_at >= self.sync_interval:
+            self.sync()
+        return jti in self._revoked
+
+    def revoke(self, jwt_data):
+        record = RevokedToken(
+            jti=jwt_data["jti"],
+            token_type=jwt_data["type"],
+            user_id=int(jwt_data["sub"]),
+            expires_at=_utc(jwt_data["exp"]),
+        )
+        db.session.add(record)
+        db.session.commit()
+        with self._lock:
+            self._revoked[record.jti] = record.expires_at
+
+    def sync(self):
+        now = datetime.utcnow()
+        rows = (
+            db.session.query(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+            .filter(RevokedToken.id > self._last_id, RevokedToken.expires_at > now)
+            .order_by(RevokedToken.id)
+            .all()
+        )
+        with self._lock:
+            for row in rows:
+                self._revoked[row.jti] = row.expires_at
+                self._last_id = row.id
+            # Expired tokens fail verification anyway; stop tracking them.
+            for jti in [jti for jti, expires_at in self._revoked.items() if expires_at <= now]:
+                del self._revoked[jti]
+            self._synced_at = time.monotonic()
+
+    def purge(self):
+        """Delete revocations of tokens that have expired since."""
+        deleted = RevokedToken.query.filter(RevokedToken.expires_at <= datetime.utcnow()).delete()
+        db.session.commit()
+        return deleted
+
+
+class CachedJWTManager(JWTManager):
+    """JWTManager that skips repeated token decoding and user lookups.
+
+    Tokens carry the user id as their identity and the username as a claim.
+    Decoded tokens are kept in a small LRU (never past their own expiry) and
+    user records in another, so an authenticated request normally costs no
+    signature check and no database round trip. Revocation is still checked
+    on every request through ``RevocationList``.
+    """
+
+    def __init__(self, app=None, add_context_processor=False):
+        self.revocations = RevocationList()
+        self._tokens = None
+        self._users = None
+        super().__init__(app, add_context_processor)
+        self.user_lookup_loader(self._load_user)
+        self.token_in_blocklist_loader(self._is_revoked)
+        self.unauthorized_loader(lambda reason: _auth_error(reason))
+        self.invalid_token_loader(lambda reason: _auth_error(f"Invalid token: {reason}"))
+        self.expired_token_loader(lambda jwt_header, jwt_data: _auth_error("Token has expired"))
+        self.revoked_token_loader(lambda jwt_header, jwt_data: _auth_error("Token has been revoked"))
+        self.user_lookup_error_loader(lambda jwt_header, jwt_data: _auth_error("User not found"))
+
+    def init_app(self, app, add_context_processor=False):
+        app.config.setdefault("AUTH_TOKEN_CACHE_SIZE", 4096)
+        app.config.setdefault("AUTH_TOKEN_CACHE_TTL", 300)
+        app.config.setdefault("AUTH_USER_CACHE_SIZE", 4096)
+        app.config.setdefault("AUTH_USER_CACHE_TTL", 60)
+        app.config.setdefault("AUTH_REVOCATION_SYNC_SECONDS", 5)
+        super().init_app(app, add_context_processor)
+
+        self._tokens = MemoryBackend(app.config["AUTH_TOKEN_CACHE_SIZE"], app.config["AUTH_TOKEN_CACHE_TTL"])
+        self._users = MemoryBackend(app.config["AUTH_USER_CACHE_SIZE"], app.config["AUTH_USER_CACHE_TTL"])
+        self.revocations.sync_interval = app.config["AUTH_REVOCATION_SYNC_SECONDS"]
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        # Overrides the decoding step every flask_jwt_extended check goes
+        # through; the signature of a cached token was verified when it was
+        # first seen, and only its expiry can change since.
+        if csrf_value is not None or allow_expired or self._tokens is None:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        decoded = self._tokens.get(encoded_token)
+        if decoded is not None and decoded["exp"] > time.time():
+            return decoded
+        decoded = super()._decode_jwt_from_config(encoded_token)
+        ttl = min(self._tokens.default_ttl, decoded["exp"] - time.time())
+        if ttl > 0:
+            self._tokens.set(encoded_token, decoded, ttl)
+        return decoded
+
+    def _load_user(self, jwt_header, jwt_data):
+        return self.cached_user(int(jwt_data["sub"]))
+
+    def _is_revoked(self, jwt_header, jwt_data):
+        return self.revocations.is_revoked(jwt_data["jti"])
+
+    def cached_user(self, user_id):
+        """Public fields of a user, or None if the user no longer exists."""
+        user = self._users.get(user_id) if self._users is not None else None
+        if user is None:
+            row = db.session.query(User.id, User.username, User.email).filter(User.id == user_id).first()
+            if row is None:
+                return None
+            user = {"id": row.id, "username": row.username, "email": row.email}
+            if self._users is not None:
+                self._users.set(user_id, user)
+        return user
+
+    def forget_user(self, user_id):
+        if self._users is not None:
+            self._users.delete(user_id)
+
+    def issue_tokens(self, user):
+        claims = {"username": user.username}
+        return {
+            "access_token": create_access_token(identity=str(user.id), additional_claims=claims),
+            "refresh_token": create_refresh_token(identity=str(user.id), additional_claims=claims),
+        }
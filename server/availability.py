@@ -0,0 +1,84 @@
+from datetime import datetime
+from sqlalchemy import and_, exists
+from models import db, Booking, Property
+
+BOOKING_DATE_FORMAT = "%dth %b %Y"
+REQUIRED_BOOKING_FIELDS = ["user_id", "property_id", "check_in_date", "check_out_date"]
+
+
+class InvalidBooking(ValueError):
+    pass
+
+
+class BookingConflict(Exception):
+    pass
+
+
+class PropertyNotFound(Exception):
+    pass
+
+
+def parse_booking(data, user_id=None):
+    """Validate a booking request body into Booking column values.
+
+    ``user_id`` (the authenticated caller) takes precedence over the body.
+    """
+    if not data or not isinstance(data, dict):
+        raise InvalidBooking("Invalid JSON data in request")
+    if user_id is not None:
+        data = dict(data, user_id=user_id)
+    for field in REQUIRED_BOOKING_FIELDS:
+        if field not in data or not data[field]:
+            raise InvalidBooking(f"Missing or empty {field}")
+
+    values = {}
+    for field in ("user_id", "property_id"):
+        try:
+            values[field] = int(data[field])
+        except (TypeError, ValueError):
+            raise InvalidBooking(f"Invalid {field}, expected an integer id")
+    for field in ("check_in_date", "check_out_date"):
+        try:
+            values[field] = datetime.strptime(data[field], BOOKING_DATE_FORMAT).date()
+        except (TypeError, ValueError):
+            raise InvalidBooking(f"Invalid {field}, expected a date like '25th Jan 2024'")
+    if values["check_out_date"] <= values["check_in_date"]:
+        raise InvalidBooking("check_out_date must be after check_in_date")
+    return values
+
+
+def overlaps(start, end):
+    # Stays are half-open [check_in, check_out), so a check-out day can be
+    # the next guest's check-in day.
+    return and_(Booking.check_in_date < end, Booking.check_out_date > start)
+
+
+def has_conflict(property_id, start, end, exclude_id=None):
+    query = Booking.query.filter(Booking.property_id == property_id, overlaps(start, end))
+    if exclude_id is not None:
+        query = query.filter(Booking.id != exclude_id)
+    return db.session.query(query.exists()).scalar()
+
+
+def reserve(booking):
+    """Add ``booking`` to the session, raising BookingConflict on overlap.
+
+    The row is flushed before the overlap check so the transaction already
+    holds SQLite's write lock (and the property row lock elsewhere) when it
+    looks for conflicts; a concurrent writer cannot slip a booking in between.
+    The caller commits or rolls back.
+    """
+    if Property.query.with_for_update().filter_by(id=booking.property_id).first() is None:
+        raise PropertyNotFound("Property not found")
+    db.session.add(booking)
+    db.session.flush()
+    if has_conflict(booking.property_id, booking.check_in_date, booking.check_out_date, exclude_id=booking.id):
+        raise BookingConflict("Property is already booked for the requested dates")
+
+
+def available_properties(query, start, end):
+    # Correlated NOT EXISTS probes ix_booking_property_dates per candidate
+    # property, so only bookings of that property starting before ``end``
+    # are ever read.
+    booked = exists().where(Booking.property_id == Property.id, overlaps(start, end))
+    return query.filter(~booked)
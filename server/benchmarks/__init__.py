@@ -0,0 +1,11 @@
+"""Data generation, micro-benchmarks and load tests for the API server.
+
+Run from the server directory:
+
+    flask --app app seed --users 1000 --properties 20000 --bookings 50000
+    python -m benchmarks micro
+    python -m benchmarks load --serve --duration 30
+    python -m benchmarks limiter
+    python -m benchmarks startup
+    python -m benchmarks compare results/a.json results/b.json
+"""
@@ -0,0 +1,150 @@
+import argparse
+import json
+import sys
+from app import create_app
+from .load import DEFAULT_MIX, run_load
+from .limiter import run_limiter
+from .micro import ROUTES, Scenarios, run_micro
+from .startup import run_startup
+from .stats import save_results
+
+
+def _app(args):
+    # Responses are not cached by default so every request measures the
+    # real handler; pass --cache to benchmark with the configured cache.
+    overrides = {} if args.cache else {"CACHE_BACKEND": "null"}
+    return create_app(overrides)
+
+
+def _mix(value):
+    mix = {}
+    for part in value.split(","):
+        route, _, weight = part.partition("=")
+        if route not in ROUTES:
+            raise argparse.ArgumentTypeError(f"Unknown route {route!r}")
+        mix[route] = int(weight or 1)
+    return mix
+
+
+def micro(args):
+    results = run_micro(_app(args), args.routes, args.iterations, args.warmup, args.seed)
+    for route, stats in results.items():
+        print(
+            f"{route:18} p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms  "
+            f"p99 {stats['p99_ms']:8.2f} ms  {stats['queries_per_request']:5.1f} queries  {stats['statuses']}"
+        )
+    print("Saved", save_results("micro", {"iterations": args.iterations, "routes": results}, args.output))
+
+
+def load(args):
+    app = _app(args)
+    scenarios = Scenarios(app, args.seed)
+    scenarios.setup(app.test_client())
+    results = run_load(
+        app,
+        scenarios,
+        base_url=None if args.serve else args.url,
+        concurrency=args.concurrency,
+        duration=args.duration,
+        mix=args.mix,
+        seed=args.seed,
+    )
+    latency = results["latency"]
+    print(
+        f"{results['requests']} requests in {results['duration_s']:.1f}s, "
+        f"{results['throughput_rps']:.1f} req/s, p50 {latency['p50_ms']:.2f} ms, "
+        f"p95 {latency['p95_ms']:.2f} ms, p99 {latency['p99_ms']:.2f} ms, "
+        f"queries/request {results['queries_per_request']}"
+    )
+    print("Saved", save_results("load", results, args.output))
+
+
+def limiter(args):
+    results = run_limiter(create_app, args.iterations, args.clients)
+    for group, label in (("backends", "take()"), ("requests", "hook")):
+        for name, stats in results[group].items():
+            print(f"{label:6} {name:17} p50 {stats['p50_ms'] * 1000:7.2f} us  p99 {stats['p99_ms'] * 1000:7.2f} us")
+    print("Saved", save_results("limiter", results, args.output))
+
+
+def startup(args):
+    results = run_startup(args.runs, args.path, args.top)
+    imports = results["imports"]
+    print(f"import app: {imports['total_ms']:.1f} ms, {imports['modules']} modules")
+    for package in imports["packages"]:
+        print(f"  {package['package']:24} {package['self_ms']:8.2f} ms")
+    for mode in ("cold", "warm"):
+        stats = {key: value["p50_ms"] for key, value in results[mode].items()}
+        print(
+            f"{mode}: import {stats['import_ms']:.1f} ms, create_app {stats['create_app_ms']:.1f} ms, "
+            f"warm-up {stats['warm_up_ms']:.1f} ms, first request {stats['first_request_ms']:.2f} ms, "
+            f"second {stats['second_request_ms']:.2f} ms, max RSS {stats['max_rss_mb']:.1f} MB"
+        )
+    print("Saved", save_results("startup", results, args.output))
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    print(f"{baseline.get('revision')} -> {candidate.get('revision')}")
+    routes = candidate.get("routes", {})
+    for route, stats in routes.items():
+        before = baseline.get("routes", {}).get(route)
+        if not before:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if before.get(key) and stats.get(key) is not None:
+                change = (stats[key] - before[key]) / before[key] * 100
+                print(f"{route:18} {key:7} {before[key]:9.2f} -> {stats[key]:9.2f} ms ({change:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    micro_parser = commands.add_parser("micro", help="Time each route through the Flask test client")
+    micro_parser.add_argument("--routes", nargs="+", choices=ROUTES)
+    micro_parser.add_argument("--iterations", type=int, default=200)
+    micro_parser.add_argument("--warmup", type=int, default=20)
+    micro_parser.set_defaults(handler=micro)
+
+    load_parser = commands.add_parser("load", help="Run concurrent HTTP clients against the API")
+    target = load_parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://127.0.0.1:4000")
+    target.add_argument("--serve", action="store_true", help="Serve the app in-process and count queries")
+    load_parser.add_argument("--concurrency", type=int, default=8)
+    load_parser.add_argument("--duration", type=float, default=10.0)
+    load_parser.add_argument("--mix", type=_mix, default=DEFAULT_MIX, help="e.g. listing=5,detail=4,signin=1")
+    load_parser.set_defaults(handler=load)
+
+    limiter_parser = commands.add_parser("limiter", help="Measure the rate limiter's overhead")
+    limiter_parser.add_argument("--iterations", type=int, default=20000, help="take() calls per backend")
+    limiter_parser.add_argument("--clients", type=int, default=1000, help="Distinct client keys")
+    limiter_parser.add_argument("--output", help="Result file (default: benchmarks/results/<mode>-<rev>-<time>.json)")
+    limiter_parser.set_defaults(handler=limiter)
+
+    startup_parser = commands.add_parser("startup", help="Report import time and time to first request")
+    startup_parser.add_argument("--runs", type=int, default=5, help="Fresh processes per mode")
+    startup_parser.add_argument("--path", default="/get_all_properties", help="Request sent after startup")
+    startup_parser.add_argument("--top", type=int, default=15, help="Packages listed by import time")
+    startup_parser.add_argument("--output", help="Result file (default: benchmarks/results/<mode>-<rev>-<time>.json)")
+    startup_parser.set_defaults(handler=startup)
+
+    for sub in (micro_parser, load_parser):
+        sub.add_argument("--cache", action="store_true", help="Keep the response cache enabled")
+        sub.add_argument("--seed", type=int, default=0)
+        sub.add_argument("--output", help="Result file (default: benchmarks/results/<mode>-<rev>-<time>.json)")
+
+    compare_parser = commands.add_parser("compare", help="Compare two saved result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import time
+from flask_jwt_extended import create_access_token
+from ratelimit import MemoryBuckets, SqliteBuckets
+from .stats import summarize
+
+# High enough that nothing is ever rejected, so only the limiter's own
+# bookkeeping is measured.
+UNLIMITED_RATE = "1000000/second"
+
+
+def _time_backend(backend, iterations, clients):
+    keys = [f"api.get_property_by_id|ip:10.0.{client // 256}.{client % 256}" for client in range(clients)]
+    samples = []
+    for index in range(iterations):
+        started = time.perf_counter()
+        backend.take(keys[index % clients], 1000000.0, 1000000)
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+def _time_hook(app, iterations, headers=None):
+    # The limiter's whole per-request cost: identifying the client and taking
+    # a token, i.e. its before_request hook, in a fresh request each time.
+    limiter = app.extensions["rate_limiter"]
+    samples = []
+    for _ in range(iterations):
+        with app.test_request_context("/get_property_by_id/1", headers=headers):
+            started = time.perf_counter()
+            limiter._before_request()
+            samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+def run_limiter(create_app, iterations=20000, clients=1000):
+    """Measure the rate limiter's buckets and its per-request overhead.
+
+    ``create_app`` builds an app from config overrides; the request hook is
+    timed for anonymous and token-carrying requests with both backends.
+    """
+    results = {"backends": {}, "requests": {}}
+    results["backends"]["memory"] = _time_backend(MemoryBuckets(), iterations, clients)
+    with tempfile.TemporaryDirectory() as directory:
+        results["backends"]["sqlite"] = _time_backend(
+            SqliteBuckets(os.path.join(directory, "buckets.db")), iterations, clients
+        )
+
+        for backend in ("memory", "sqlite"):
+            app = create_app(
+                {
+                    "RATE_LIMIT_ENABLED": True,
+                    "RATE_LIMIT_BACKEND": backend,
+                    "RATE_LIMIT_SQLITE_PATH": os.path.join(directory, "ratelimit.db"),
+                    "RATE_LIMIT_DEFAULT": UNLIMITED_RATE,
+                    "RATE_LIMITS": {},
+                    "CONCURRENCY_LIMITS": {},
+                }
+            )
+            with app.app_context():
+                token = create_access_token(identity="1")
+            results["requests"][f"{backend}-anonymous"] = _time_hook(app, iterations)
+            results["requests"][f"{backend}-token"] = _time_hook(
+                app, iterations, {"Authorization": f"Bearer {token}"}
+            )
+    return results
@@ -0,0 +1,116 @@
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+from werkzeug.serving import make_server
+from models import db
+from .micro import AUTHENTICATED_ROUTES, QueryCounter
+from .stats import summarize
+
+DEFAULT_MIX = {"listing": 5, "detail": 4, "bookings_listing": 1}
+
+
+class ServerThread(threading.Thread):
+    """Serves ``app`` on a local port in a background thread."""
+
+    def __init__(self, app, host="127.0.0.1", port=0):
+        super().__init__(daemon=True)
+        self.server = make_server(host, port, app, threaded=True)
+        self.url = f"http://{host}:{self.server.server_port}"
+
+    def run(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def _worker(base_url, scenarios, mix, deadline, lock, samples, statuses, seed):
+    rng = random.Random(seed)
+    parts = urlsplit(base_url)
+    # One keep-alive connection per worker, as a browser or client pool would.
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    routes, weights = zip(*mix.items())
+    local_samples = []
+    local_statuses = {}
+    while time.perf_counter() < deadline:
+        route = rng.choices(routes, weights)[0]
+        with lock:
+            method, url, body = getattr(scenarios, route)()
+        started = time.perf_counter()
+        try:
+            headers = {"Content-Type": "application/json"} if body is not None else {}
+            if route in AUTHENTICATED_ROUTES:
+                headers.update(scenarios.headers)
+            connection.request(method, url, body=None if body is None else json.dumps(body), headers=headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+            status = "error"
+        local_samples.append((route, (time.perf_counter() - started) * 1000))
+        local_statuses[status] = local_statuses.get(status, 0) + 1
+    connection.close()
+    with lock:
+        samples.extend(local_samples)
+        for status, count in local_statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+
+def run_load(app, scenarios, base_url=None, concurrency=8, duration=10.0, mix=None, seed=0):
+    """Drive ``concurrency`` keep-alive clients against the API for ``duration`` seconds.
+
+    Without ``base_url`` the app is served in-process, which also lets the
+    run count SQL statements per request; against an external server the
+    query count is reported as null.
+    """
+    mix = mix or DEFAULT_MIX
+    server = None
+    queries = None
+    if base_url is None:
+        server = ServerThread(app)
+        server.start()
+        base_url = server.url
+        with app.app_context():
+            queries = QueryCounter(db.engine)
+
+    lock = threading.Lock()
+    samples = []
+    statuses = {}
+    queries_before = queries.count if queries else 0
+    started = time.perf_counter()
+    deadline = started + duration
+    threads = [
+        threading.Thread(target=_worker, args=(base_url, scenarios, mix, deadline, lock, samples, statuses, seed + n))
+        for n in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if server is not None:
+        server.stop()
+
+    per_route = {}
+    for route in mix:
+        route_samples = [ms for name, ms in samples if name == route]
+        if route_samples:
+            per_route[route] = summarize(route_samples)
+
+    return {
+        "base_url": base_url,
+        "concurrency": concurrency,
+        "duration_s": elapsed,
+        "mix": mix,
+        "requests": len(samples),
+        "throughput_rps": len(samples) / elapsed if elapsed else None,
+        "latency": summarize([ms for _, ms in samples]),
+        "routes": per_route,
+        "statuses": {str(code): count for code, count in statuses.items()},
+        "queries_per_request": (queries.count - queries_before) / len(samples) if queries and samples else None,
+    }
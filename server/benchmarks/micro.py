@@ -0,0 +1,122 @@
+import itertools
+import random
+import threading
+import time
+from datetime import date, timedelta
+from sqlalchemy import event, func
+from models import db, User, Property
+from .stats import summarize
+
+BOOKING_DATE_FORMAT = "%dth %b %Y"
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._increment)
+
+    def _increment(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+class Scenarios:
+    """Request factories for each benchmarked route.
+
+    Each method returns ``(method, url, json_body)`` for one request; state
+    such as the user names created by signup is kept on the instance so later
+    requests stay valid.
+    """
+
+    def __init__(self, app, seed=0):
+        self.rng = random.Random(seed)
+        self.counter = itertools.count(1)
+        with app.app_context():
+            self.max_property_id = db.session.query(func.max(Property.id)).scalar() or 0
+            self.max_user_id = db.session.query(func.max(User.id)).scalar() or 0
+        self.username = f"bench_{int(time.time())}"
+        # Set by setup() once the benchmark user has signed in.
+        self.headers = {}
+        # Bookings go far into the future, one night each and never on the
+        # same night, so the overlap check does not turn them into 409s.
+        self.next_night = date(2100, 1, 1)
+
+    def setup(self, client):
+        client.post("/user_signup", json={"username": self.username, "email": f"{self.username}@bench.local", "password": "password"})
+        signin = client.post("/user_signin", json={"username": self.username, "password": "password"})
+        self.headers = {"Authorization": f"Bearer {signin.get_json()['access_token']}"}
+
+    def signup(self):
+        name = f"{self.username}_{next(self.counter)}"
+        return "POST", "/user_signup", {"username": name, "email": f"{name}@bench.local", "password": "password"}
+
+    def signin(self):
+        return "POST", "/user_signin", {"username": self.username, "password": "password"}
+
+    def listing(self):
+        return "GET", "/get_all_properties?limit=12", None
+
+    def detail(self):
+        return "GET", f"/get_property_by_id/{self.rng.randint(1, max(1, self.max_property_id))}", None
+
+    def booking_create(self):
+        check_in = self.next_night
+        self.next_night += timedelta(days=1)
+        return "POST", "/create_booking", {
+            "property_id": self.rng.randint(1, max(1, self.max_property_id)),
+            "check_in_date": check_in.strftime(BOOKING_DATE_FORMAT),
+            "check_out_date": (check_in + timedelta(days=1)).strftime(BOOKING_DATE_FORMAT),
+        }
+
+    def bookings_listing(self):
+        return "GET", f"/users/{self.rng.randint(1, max(1, self.max_user_id))}/bookings?limit=12", None
+
+    def all_bookings(self):
+        return "GET", "/get_all_bookings", None
+
+
+# Sent with the benchmark user's access token.
+AUTHENTICATED_ROUTES = {"booking_create"}
+ROUTES = ["signup", "signin", "listing", "detail", "booking_create", "bookings_listing", "all_bookings"]
+# /get_all_bookings returns the whole table, which takes seconds on a large
+# seed; it only runs when asked for explicitly.
+DEFAULT_ROUTES = [route for route in ROUTES if route != "all_bookings"]
+
+
+def run_micro(app, routes=None, iterations=200, warmup=20, seed=0):
+    """Time each route through the Flask test client.
+
+    Returns per-route latency percentiles, status code counts and the mean
+    number of SQL statements per request.
+    """
+    client = app.test_client()
+    scenarios = Scenarios(app, seed)
+    scenarios.setup(client)
+    with app.app_context():
+        queries = QueryCounter(db.engine)
+
+    results = {}
+    for route in routes or DEFAULT_ROUTES:
+        make_request = getattr(scenarios, route)
+        headers = scenarios.headers if route in AUTHENTICATED_ROUTES else None
+        for _ in range(warmup):
+            method, url, body = make_request()
+            client.open(url, method=method, json=body, headers=headers)
+
+        samples = []
+        statuses = {}
+        queries_before = queries.count
+        for _ in range(iterations):
+            method, url, body = make_request()
+            started = time.perf_counter()
+            response = client.open(url, method=method, json=body, headers=headers)
+            samples.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        results[route] = {
+            **summarize(samples),
+            "queries_per_request": (queries.count - queries_before) / iterations,
+            "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        }
+    return results
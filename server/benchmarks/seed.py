@@ -0,0 +1,113 @@
+import random
+from datetime import date, timedelta
+from faker import Faker
+from sqlalchemy import func, insert
+from models import db, User, Property, Booking
+
+INSERT_BATCH_SIZE = 2000
+SEED_PASSWORD = "password"
+
+CITIES = {
+    "New York": (40.7128, -74.0060), "Los Angeles": (34.0522, -118.2437), "Chicago": (41.8781, -87.6298),
+    "Houston": (29.7604, -95.3698), "Phoenix": (33.4484, -112.0740), "Philadelphia": (39.9526, -75.1652),
+    "San Antonio": (29.4241, -98.4936), "San Diego": (32.7157, -117.1611), "Dallas": (32.7767, -96.7970),
+    "Austin": (30.2672, -97.7431), "Seattle": (47.6062, -122.3321), "Denver": (39.7392, -104.9903),
+    "Boston": (42.3601, -71.0589), "Miami": (25.7617, -80.1918), "Atlanta": (33.7490, -84.3880),
+    "Portland": (45.5152, -122.6784), "Nashville": (36.1627, -86.7816), "Las Vegas": (36.1699, -115.1398),
+    "Detroit": (42.3314, -83.0458), "Minneapolis": (44.9778, -93.2650),
+}
+CITY_NAMES = list(CITIES)
+BEDROOM_WEIGHTS = {1: 20, 2: 35, 3: 28, 4: 12, 5: 4, 6: 1}
+
+
+def _zipf_weights(count, exponent=1.1):
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def _insert_batches(model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            db.session.execute(insert(model), batch)
+            db.session.commit()
+            batch = []
+    if batch:
+        db.session.execute(insert(model), batch)
+        db.session.commit()
+
+
+def _users(fake, count, password_hash, offset):
+    # The numeric suffix keeps names unique across any number of users and
+    # across repeated seeding runs.
+    for number in range(offset + 1, offset + count + 1):
+        username = fake.user_name()
+        yield {
+            "username": f"{username}{number}",
+            "email": f"{username}{number}@{fake.free_email_domain()}",
+            "password": password_hash,
+        }
+
+
+def _properties(fake, rng, count):
+    city_weights = _zipf_weights(len(CITY_NAMES))
+    bedrooms, weights = zip(*BEDROOM_WEIGHTS.items())
+    for _ in range(count):
+        rooms = rng.choices(bedrooms, weights)[0]
+        city = rng.choices(CITY_NAMES, city_weights)[0]
+        center_lat, center_lng = CITIES[city]
+        yield {
+            "title": fake.catch_phrase()[:100],
+            "description": fake.paragraph(nb_sentences=4),
+            # Log-normal prices around $90k per bedroom, pricier in big cities.
+            "price": round(rng.lognormvariate(11.4, 0.45) * rooms * (1.5 if CITY_NAMES.index(city) < 5 else 1.0), -2),
+            "bedrooms": rooms,
+            "bathrooms": rng.randint(1, max(1, rooms - 1)),
+            "location": f"{fake.street_address()}, {city}"[:100],
+            "image_link": fake.image_url(),
+            # Spread listings over roughly 20 km around the city centre.
+            "latitude": round(center_lat + rng.gauss(0, 0.08), 6),
+            "longitude": round(center_lng + rng.gauss(0, 0.1), 6),
+        }
+
+
+def _bookings(rng, count, user_ids, property_ids, start):
+    # Popular listings get most of the bookings; stays never overlap because
+    # each property's next stay starts after its previous check-out.
+    weights = _zipf_weights(len(property_ids), exponent=0.8)
+    next_free = {}
+    for chosen in rng.choices(property_ids, weights, k=count):
+        check_in = next_free.get(chosen, start) + timedelta(days=rng.randint(0, 20))
+        check_out = check_in + timedelta(days=rng.choices([1, 2, 3, 4, 5, 7, 10, 14], [5, 10, 12, 10, 8, 8, 3, 2])[0])
+        next_free[chosen] = check_out
+        yield {
+            "user_id": rng.choice(user_ids),
+            "property_id": chosen,
+            "check_in_date": check_in,
+            "check_out_date": check_out,
+        }
+
+
+def seed_database(users, properties, bookings, password_hash, seed=0):
+    """Insert generated users, properties and bookings; returns row counts.
+
+    Every generated user shares one precomputed password hash (SEED_PASSWORD)
+    so seeding does not spend minutes in bcrypt.
+    """
+    fake = Faker()
+    Faker.seed(seed)
+    rng = random.Random(seed)
+
+    offset = db.session.query(func.max(User.id)).scalar() or 0
+    _insert_batches(User, _users(fake, users, password_hash, offset))
+    _insert_batches(Property, _properties(fake, rng, properties))
+
+    if bookings:
+        user_ids = [row[0] for row in db.session.query(User.id)]
+        property_ids = [row[0] for row in db.session.query(Property.id)]
+        if not user_ids or not property_ids:
+            raise ValueError("Bookings need at least one user and one property")
+        start = (db.session.query(func.max(Booking.check_out_date)).scalar() or date.today()) + timedelta(days=1)
+        _insert_batches(Booking, _bookings(rng, bookings, user_ids, property_ids, start))
+
+    return {"users": users, "properties": properties, "bookings": bookings}
@@ -0,0 +1,93 @@
+import json
+import os
+import subprocess
+import sys
+from collections import Counter
+from .stats import summarize
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so nothing is already imported or cached.
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app({"CACHE_BACKEND": "null"})
+created = time.perf_counter()
+warmed = created
+if %(warm)r:
+    from warmup import warm_up
+    warm_up(app)
+    warmed = time.perf_counter()
+client = app.test_client()
+timings = []
+for _ in range(2):
+    before = time.perf_counter()
+    client.get(%(path)r, environ_base={"REMOTE_ADDR": "127.0.0.1"})
+    timings.append(time.perf_counter() - before)
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "warm_up_ms": (warmed - created) * 1000,
+    "first_request_ms": timings[0] * 1000,
+    "second_request_ms": timings[1] * 1000,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+}))
+"""
+
+
+def import_times(module="app", top=15):
+    """Parse ``python -X importtime -c "import <module>"`` into a per-package report.
+
+    Returns the total in ms and the ``top`` packages by the time spent
+    importing their own modules (``sqlalchemy`` counts every
+    ``sqlalchemy.*`` module, wherever it was imported from).
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVER_DIR, capture_output=True, text=True, check=True,
+    )
+    total = None
+    packages = Counter()
+    modules = 0
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        modules += 1
+        packages[name.split(".")[0]] += int(self_us)
+        if name == module:
+            total = int(cumulative_us)
+    return {
+        "total_ms": round(total / 1000, 2) if total is not None else None,
+        "modules": modules,
+        "packages": [{"package": name, "self_ms": round(us / 1000, 2)} for name, us in packages.most_common(top)],
+    }
+
+
+def _probe(path, warm):
+    completed = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", PROBE % {"path": path, "warm": warm}],
+        cwd=SERVER_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_startup(runs=5, path="/get_all_properties", top=15):
+    """Measure how long a fresh process takes to serve its first request.
+
+    Each run starts a new interpreter that imports the app, calls
+    create_app and sends ``path`` twice, once as is ("cold") and once
+    after warmup.warm_up ("warm"). Timings are summarized over ``runs``.
+    """
+    results = {"runs": runs, "path": path, "imports": import_times(top=top)}
+    for mode, warm in (("cold", False), ("warm", True)):
+        samples = [_probe(path, warm) for _ in range(runs)]
+        results[mode] = {
+            key: summarize([sample[key] for sample in samples])
+            for key in samples[0]
+        }
+    return results
@@ -0,0 +1,49 @@
+import json
+import os
+import subprocess
+import time
+
+
+def percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, max(0, round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def summarize(samples_ms):
+    ordered = sorted(samples_ms)
+    count = len(ordered)
+    return {
+        "count": count,
+        "mean_ms": sum(ordered) / count if count else None,
+        "p50_ms": percentile(ordered, 0.50),
+        "p95_ms": percentile(ordered, 0.95),
+        "p99_ms": percentile(ordered, 0.99),
+        "max_ms": ordered[-1] if ordered else None,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(mode, results, output=None):
+    results = {
+        "mode": mode,
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **results,
+    }
+    if output is None:
+        directory = os.path.join(os.path.dirname(__file__), "results")
+        os.makedirs(directory, exist_ok=True)
+        output = os.path.join(directory, f"{mode}-{results['revision'] or 'local'}-{int(time.time())}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    return output
@@ -0,0 +1,273 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from models import db, Booking, BookingRequest
+from availability import BookingConflict, PropertyNotFound, reserve
+from database import begin_write
+
+logger = logging.getLogger("real_estate.booking_queue")
+
+PENDING = "pending"
+CONFIRMED = "confirmed"
+REJECTED = "rejected"
+FAILED = "failed"
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 64
+
+_STOP = object()
+
+
+class QueueFull(Exception):
+    pass
+
+
+class IdempotencyKeyReused(Exception):
+    pass
+
+
+def request_status(record):
+    return {
+        "idempotency_key": record.idempotency_key,
+        "status": record.status,
+        "booking_id": record.booking_id,
+        "message": record.message,
+    }
+
+
+class BookingQueue:
+    """Accepts bookings right away and writes them in group commits.
+
+    Accepting a request records it as a pending BookingRequest, so every
+    worker process can report its status. A single background thread per
+    process drains the queue, waiting up to ``BOOKING_QUEUE_LINGER_MS`` for
+    a batch of ``BOOKING_QUEUE_BATCH_SIZE`` requests, and settles the whole
+    batch in one transaction. Every booking runs the usual overlap check in
+    its own savepoint, so a conflict rejects only that request, and later
+    requests in the batch see the bookings confirmed before them. A batch
+    that keeps failing to get the database is retried
+    ``BOOKING_QUEUE_RETRIES`` times, then its requests are marked failed.
+
+    Requests are tracked by their idempotency key: retrying with the same
+    key returns the original outcome instead of booking twice. A request
+    still pending after ``BOOKING_QUEUE_STALE_S`` (its process died before
+    settling it) is queued again by whichever process is asked about it.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.batch_size = 50
+        self.linger = 0.005
+        self.retries = 3
+        self.stale_after = timedelta(seconds=60)
+        self._app = None
+        self._queue = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._worker = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("BOOKING_QUEUE_ENABLED", False)
+        app.config.setdefault("BOOKING_QUEUE_MAX_SIZE", 1000)
+        app.config.setdefault("BOOKING_QUEUE_BATCH_SIZE", 50)
+        app.config.setdefault("BOOKING_QUEUE_LINGER_MS", 5)
+        app.config.setdefault("BOOKING_QUEUE_RETRIES", 3)
+        app.config.setdefault("BOOKING_QUEUE_STALE_S", 60)
+        app.extensions["booking_queue"] = self
+
+        self.enabled = app.config["BOOKING_QUEUE_ENABLED"]
+        self.batch_size = app.config["BOOKING_QUEUE_BATCH_SIZE"]
+        self.linger = app.config["BOOKING_QUEUE_LINGER_MS"] / 1000
+        self.retries = max(1, app.config["BOOKING_QUEUE_RETRIES"])
+        self.stale_after = timedelta(seconds=app.config["BOOKING_QUEUE_STALE_S"])
+        self._app = app
+        self._queue = queue.Queue(maxsize=app.config["BOOKING_QUEUE_MAX_SIZE"])
+
+    def submit(self, key, values):
+        """Queue a booking, or return the status already recorded for ``key``.
+
+        Raises IdempotencyKeyReused when ``key`` was used for another booking
+        and QueueFull when the backlog is at ``BOOKING_QUEUE_MAX_SIZE``.
+        """
+        record = BookingRequest.query.filter_by(idempotency_key=key).first()
+        if record is not None:
+            if _record_values(record) != values:
+                raise IdempotencyKeyReused("Idempotency-Key was already used for a different booking")
+            self._adopt_if_stale(record)
+            return request_status(record)
+
+        if self._queue.full():
+            raise QueueFull("Booking queue is full, retry shortly")
+        record = BookingRequest(idempotency_key=key, status=PENDING, **values)
+        db.session.add(record)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another request with the same key was accepted first.
+            db.session.rollback()
+            return self.submit(key, values)
+        status = request_status(record)
+        if not self._enqueue(key, values):
+            db.session.delete(record)
+            db.session.commit()
+            raise QueueFull("Booking queue is full, retry shortly")
+        return status
+
+    def status(self, key):
+        record = BookingRequest.query.filter_by(idempotency_key=key).first()
+        if record is None:
+            return None
+        self._adopt_if_stale(record)
+        return request_status(record)
+
+    def depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _enqueue(self, key, values):
+        with self._lock:
+            if key in self._pending:
+                return True
+            try:
+                self._queue.put_nowait((key, values))
+            except queue.Full:
+                return False
+            self._pending[key] = values
+            self._ensure_worker()
+        return True
+
+    def _adopt_if_stale(self, record):
+        # Settling is idempotent (see _apply), so a request that is queued
+        # again while its first process is still alive is harmless.
+        if self.enabled and record.status == PENDING and datetime.utcnow() - record.created_at > self.stale_after:
+            self._enqueue(record.idempotency_key, _record_values(record))
+
+    def _ensure_worker(self):
+        # Started on first use so server processes never inherit a thread
+        # from the parent they were forked from.
+        if self._worker is None:
+            atexit.register(self.shutdown)
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="booking-queue", daemon=True)
+            self._worker.start()
+
+    def _next_batch(self):
+        item = self._queue.get()
+        if item is _STOP:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                with self._app.app_context():
+                    self._commit_batch(batch)
+            except Exception:
+                logger.exception("Booking queue batch of %d failed", len(batch))
+            finally:
+                with self._lock:
+                    for key, _ in batch:
+                        self._pending.pop(key, None)
+
+    def _commit_batch(self, batch):
+        try:
+            self._retry(self._settle, batch)
+        except OperationalError as e:
+            logger.error("Booking queue batch of %d failed: %s", len(batch), e)
+            self._retry(self._mark_failed, [key for key, _ in batch], "The booking could not be saved, please retry")
+        except Exception:
+            if len(batch) == 1:
+                logger.exception("Booking request %s failed", batch[0][0])
+                self._retry(self._mark_failed, [batch[0][0]], "The booking could not be processed")
+                return
+            # One bad request must not cost the rest of the batch.
+            for item in batch:
+                self._commit_batch([item])
+
+    def _retry(self, write, *args):
+        # OperationalError covers a lock that could not be had within
+        # busy_timeout; anything else is not worth retrying.
+        for attempt in range(self.retries):
+            try:
+                write(*args)
+                return
+            except OperationalError:
+                db.session.rollback()
+                if attempt + 1 == self.retries:
+                    raise
+                time.sleep(0.05 * 2 ** attempt)
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def _settle(self, batch):
+        begin_write(db.session)
+        for key, values in batch:
+            self._apply(key, values)
+        db.session.commit()
+
+    def _apply(self, key, values):
+        record = BookingRequest.query.filter_by(idempotency_key=key).first()
+        if record is None or record.status != PENDING:
+            return
+        savepoint = db.session.begin_nested()
+        try:
+            booking = Booking(**values)
+            reserve(booking)
+            savepoint.commit()
+            record.status = CONFIRMED
+            record.booking_id = booking.id
+        except (PropertyNotFound, BookingConflict) as e:
+            savepoint.rollback()
+            record.status = REJECTED
+            record.message = str(e)
+
+    def _mark_failed(self, keys, message):
+        begin_write(db.session)
+        db.session.execute(
+            update(BookingRequest)
+            .where(BookingRequest.idempotency_key.in_(keys), BookingRequest.status == PENDING)
+            .values(status=FAILED, message=message)
+        )
+        db.session.commit()
+
+    def shutdown(self, timeout=5):
+        """Let the worker finish the queued requests, then stop it."""
+        if self._worker is None or not self._worker.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._worker.join(timeout)
+
+
+def _record_values(record):
+    return {
+        "user_id": record.user_id,
+        "property_id": record.property_id,
+        "check_in_date": record.check_in_date,
+        "check_out_date": record.check_out_date,
+    }
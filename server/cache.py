@@ -0,0 +1,319 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Marks namespace bumps in the invalidation log; keys never start with it.
+COUNTER_PREFIX = "#"
+
+
+class MemoryBackend:
+    """Per-process LRU cache with a TTL on every entry.
+
+    With an InvalidationLog, deletes and counter bumps are published to the
+    other processes and theirs are applied by ``sync``.
+    """
+
+    def __init__(self, max_entries=1024, default_ttl=300, invalidations=None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.invalidations = invalidations
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        self._drop(key)
+        if self.invalidations is not None:
+            self.invalidations.publish(key)
+
+    def counter(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def incr(self, name):
+        value = self._bump(name)
+        if self.invalidations is not None:
+            self.invalidations.publish(COUNTER_PREFIX + name)
+        return value
+
+    def sync(self):
+        if self.invalidations is None:
+            return
+        for key in self.invalidations.poll():
+            if key.startswith(COUNTER_PREFIX):
+                self._bump(key[len(COUNTER_PREFIX):])
+            else:
+                self._drop(key)
+
+    def _drop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _bump(self, name):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+    def lookups(self):
+        with self._lock:
+            return self.hits, self.misses
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class InvalidationLog:
+    """Cache invalidations shared by the worker processes on one host.
+
+    Each process keeps its own MemoryBackend, so a write handled by one
+    worker must reach the others: deleted keys and namespace bumps are
+    appended to a local SQLite file, and every process replays the entries
+    it has not seen yet (one indexed read) before it handles a request.
+    Entries older than the cache TTL are pruned, since any copy they could
+    retire has expired by then.
+    """
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_seq = None
+        self._published = 0
+        self._lock = threading.Lock()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS invalidation "
+            "(seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, created REAL NOT NULL)"
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None or getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def publish(self, key):
+        connection = self._connection()
+        now = time.time()
+        connection.execute("INSERT INTO invalidation (key, created) VALUES (?, ?)", (key, now))
+        self._published += 1
+        if self._published % self.PRUNE_EVERY == 0:
+            connection.execute("DELETE FROM invalidation WHERE created < ?", (now - self.ttl,))
+
+    def poll(self):
+        """Keys invalidated by any process since the previous poll in this one."""
+        connection = self._connection()
+        with self._lock:
+            if self._last_seq is None:
+                # A fresh process has nothing cached that could be stale.
+                self._last_seq = connection.execute("SELECT COALESCE(MAX(seq), 0) FROM invalidation").fetchone()[0]
+                return []
+            rows = connection.execute(
+                "SELECT seq, key FROM invalidation WHERE seq > ? ORDER BY seq", (self._last_seq,)
+            ).fetchall()
+            if rows:
+                self._last_seq = rows[-1][0]
+        return [key for _, key in rows]
+
+
+class RedisBackend:
+    """Cache shared by every worker through a Redis-compatible server.
+
+    Eviction is left to the server (configure ``maxmemory-policy allkeys-lru``);
+    entries still carry a TTL so they expire even without memory pressure.
+    """
+
+    def __init__(self, url, default_ttl=300, prefix="real_estate:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+        # Guards the hit and miss counts of this process.
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        raws = self.client.mget([self.prefix + key for key in keys])
+        found = sum(raw is not None for raw in raws)
+        with self._lock:
+            self.hits += found
+            self.misses += len(raws) - found
+        return [None if raw is None else json.loads(raw) for raw in raws]
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl or self.default_ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def counter(self, name):
+        return int(self.client.get(self.prefix + "counter:" + name) or 0)
+
+    def incr(self, name):
+        return self.client.incr(self.prefix + "counter:" + name)
+
+    def lookups(self):
+        with self._lock:
+            return self.hits, self.misses
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+class ResponseCache:
+    """Caches JSON-ready response payloads for read-mostly routes.
+
+    Single objects live under a stable key and are written through or deleted
+    when that object changes. Listing pages depend on many rows at once, so
+    their keys embed a namespace generation; bumping the generation retires
+    every page of that listing in O(1) and the old entries age out of the LRU.
+
+    The memory backend is per process. With ``CACHE_INVALIDATION`` "sqlite"
+    (the default) changes are shared with the other workers on the host
+    through ``CACHE_INVALIDATION_PATH``; "local" is only safe for a single
+    process.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("CACHE_BACKEND", "memory")
+        app.config.setdefault("CACHE_TTL", 300)
+        app.config.setdefault("CACHE_MAX_ENTRIES", 1024)
+        app.config.setdefault("CACHE_REDIS_URL", "redis://localhost:6379/0")
+        app.config.setdefault("CACHE_INVALIDATION", "sqlite")
+        app.config.setdefault("CACHE_INVALIDATION_PATH", None)
+
+        backend = app.config["CACHE_BACKEND"]
+        if backend == "memory":
+            invalidations = None
+            mode = app.config["CACHE_INVALIDATION"]
+            if mode == "sqlite":
+                path = app.config["CACHE_INVALIDATION_PATH"] or os.path.join(app.instance_path, "cache.db")
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                invalidations = InvalidationLog(path, app.config["CACHE_TTL"])
+            elif mode != "local":
+                raise ValueError(f"Unknown CACHE_INVALIDATION {mode!r}")
+            self.backend = MemoryBackend(app.config["CACHE_MAX_ENTRIES"], app.config["CACHE_TTL"], invalidations)
+        elif backend == "redis":
+            self.backend = RedisBackend(app.config["CACHE_REDIS_URL"], app.config["CACHE_TTL"])
+        elif backend == "null":
+            self.backend = None
+        else:
+            raise ValueError(f"Unknown CACHE_BACKEND {backend!r}")
+        app.extensions["response_cache"] = self
+        if getattr(self.backend, "invalidations", None) is not None:
+            # Apply other workers' changes before answering from this cache.
+            app.before_request(self.backend.sync)
+
+    def get(self, key):
+        if self.backend is None:
+            return None
+        return self.backend.get(key)
+
+    def get_many(self, keys):
+        if self.backend is None:
+            return [None] * len(keys)
+        return self.backend.get_many(keys)
+
+    def set(self, key, value, ttl=None):
+        if self.backend is not None:
+            self.backend.set(key, value, ttl)
+
+    def write_through(self, key, value, ttl=None):
+        """Store the new value of an object that just changed.
+
+        Unlike ``set`` (filling a miss), the copies other processes hold are
+        now stale, so they are dropped.
+        """
+        if self.backend is not None:
+            self.backend.delete(key)
+            self.backend.set(key, value, ttl)
+
+    def delete(self, key):
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def namespace_key(self, namespace, suffix):
+        generation = self.backend.counter(namespace) if self.backend is not None else 0
+        return f"{namespace}:{generation}:{suffix}"
+
+    def invalidate_namespace(self, namespace):
+        if self.backend is not None:
+            self.backend.incr(namespace)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        # Counted by the backend under its lock, as requests run on threads.
+        hits, misses = self.backend.lookups() if self.backend is not None else (0, 0)
+        lookups = hits + misses
+        return {
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+def property_key(property_id):
+    return f"property:{property_id}"
+
+
+def query_string_key(args):
+    return "&".join(f"{key}={value}" for key, value in sorted(args.items(multi=True)))
@@ -0,0 +1,162 @@
+import gzip
+import hashlib
+import importlib.util
+import zlib
+from flask import request
+from cache import MemoryBackend
+from conditional import encoded_etag
+from instrumentation import span
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/plain",
+    "text/html",
+}
+
+
+def _load_brotli():
+    import brotli
+
+    return brotli
+
+
+class Compression:
+    """Negotiates gzip or brotli response compression.
+
+    Bodies smaller than ``COMPRESS_MIN_SIZE`` go out as they are. GET
+    responses are compressed once per payload: the compressed body is kept
+    in an LRU keyed by path, encoding and ETag, or by a hash of the body
+    when there is no ETag, so repeated requests for an unchanged payload
+    only pay for a lookup (and the hash).
+    Streamed exports are compressed chunk by chunk as they are produced.
+    Compressed responses get their own strong ETag (``<etag>-<encoding>``)
+    and every response that could have been compressed carries
+    ``Vary: Accept-Encoding``.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.min_size = 500
+        self.gzip_level = 6
+        self.brotli_level = 5
+        self.encodings = ("gzip",)
+        self.compress_streams = True
+        self._brotli = None
+        self._bodies = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("COMPRESS_ENABLED", True)
+        app.config.setdefault("COMPRESS_MIN_SIZE", 500)
+        app.config.setdefault("COMPRESS_GZIP_LEVEL", 6)
+        app.config.setdefault("COMPRESS_BROTLI_LEVEL", 5)
+        app.config.setdefault("COMPRESS_CACHE_ENTRIES", 256)
+        app.config.setdefault("COMPRESS_STREAMS", True)
+        app.extensions["compression"] = self
+
+        self.enabled = app.config["COMPRESS_ENABLED"]
+        if not self.enabled:
+            return
+        self.min_size = app.config["COMPRESS_MIN_SIZE"]
+        self.gzip_level = app.config["COMPRESS_GZIP_LEVEL"]
+        self.brotli_level = app.config["COMPRESS_BROTLI_LEVEL"]
+        self.compress_streams = app.config["COMPRESS_STREAMS"]
+        # Preferred over gzip when the client accepts both equally; the module
+        # itself is imported by the first brotli response.
+        self.encodings = ("br", "gzip") if importlib.util.find_spec("brotli") is not None else ("gzip",)
+        self._bodies = MemoryBackend(app.config["COMPRESS_CACHE_ENTRIES"], default_ttl=3600)
+        app.after_request(self._after_request)
+
+    def negotiate(self):
+        return request.accept_encodings.best_match(self.encodings)
+
+    @property
+    def brotli(self):
+        if self._brotli is None:
+            self._brotli = _load_brotli()
+        return self._brotli
+
+    def compress(self, data, encoding):
+        if encoding == "br":
+            return self.brotli.compress(data, quality=self.brotli_level)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def _after_request(self, response):
+        if response.headers.get("Content-Encoding") or request.method == "HEAD":
+            return response
+
+        if response.status_code == 304:
+            self._not_modified(response)
+            return response
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES or response.status_code < 200 or response.status_code == 204:
+            return response
+
+        if response.is_streamed:
+            if self.compress_streams:
+                response.vary.add("Accept-Encoding")
+                encoding = self.negotiate()
+                if encoding:
+                    response.response = self._stream(response.response, encoding)
+                    response.headers["Content-Encoding"] = encoding
+                    response.headers.pop("Content-Length", None)
+            return response
+
+        length = response.calculate_content_length()
+        if length is None or length < self.min_size:
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = self.negotiate()
+        if not encoding:
+            return response
+
+        with span("compress"):
+            etag, weak = response.get_etag()
+            data = None
+            if request.method != "GET":
+                key = None
+            elif etag:
+                key = f"{encoding}:{request.full_path}:{etag}"
+            else:
+                # Hashing is far cheaper than compressing, so bodies without
+                # an ETag (/get_all_users, /get_all_bookings) are keyed by it.
+                data = response.get_data()
+                key = f"{encoding}:#{hashlib.blake2b(data, digest_size=16).hexdigest()}"
+            body = self._bodies.get(key) if key else None
+            if body is None:
+                body = self.compress(response.get_data() if data is None else data, encoding)
+                if key:
+                    self._bodies.set(key, body)
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            response.set_etag(encoded_etag(etag, encoding), weak)
+        return response
+
+    def _not_modified(self, response):
+        # Keep the validator the client holds, i.e. the one of the
+        # representation it was sent.
+        etag, weak = response.get_etag()
+        if not etag:
+            return
+        response.vary.add("Accept-Encoding")
+        encoding = self.negotiate()
+        if encoding and request.if_none_match.contains(encoded_etag(etag, encoding)):
+            response.set_etag(encoded_etag(etag, encoding), weak)
+
+    def _stream(self, chunks, encoding):
+        if encoding == "br":
+            compressor = self.brotli.Compressor(quality=self.brotli_level)
+            compress, finish = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            compress, finish = compressor.compress, compressor.flush
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            data = compress(chunk)
+            if data:
+                yield data
+        yield finish()
@@ -0,0 +1,57 @@
+import hashlib
+from datetime import datetime, timezone
+from flask import jsonify, request, make_response
+
+
+def row_etag(*parts):
+    return "-".join(str(part) for part in parts)
+
+
+def encoded_etag(etag, encoding):
+    # A compressed body is a different representation, so it needs its own
+    # strong validator (RFC 9110, 8.8.3).
+    return f"{etag}-{encoding}"
+
+
+def rows_etag(key, rows):
+    """Strong ETag for a set of rows, derived from their ids and versions."""
+    digest = hashlib.sha1(key.encode("utf-8"))
+    for row_id, version in rows:
+        digest.update(f"|{row_id}:{version}".encode("ascii"))
+    return digest.hexdigest()
+
+
+def http_date(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0).isoformat()
+
+
+def is_not_modified(etag, last_modified=None):
+    # If-None-Match wins over If-Modified-Since when both are sent (RFC 9110).
+    if request.if_none_match:
+        return any(
+            request.if_none_match.contains(candidate)
+            for candidate in (etag, encoded_etag(etag, "gzip"), encoded_etag(etag, "br"))
+        )
+    if last_modified and request.if_modified_since:
+        return datetime.fromisoformat(last_modified) <= request.if_modified_since
+    return False
+
+
+def not_modified_response(etag, last_modified=None):
+    response = make_response("", 304)
+    return _with_validators(response, etag, last_modified)
+
+
+def conditional_json(payload, etag, last_modified=None, status=200):
+    return _with_validators(make_response(jsonify(payload), status), etag, last_modified)
+
+
+def _with_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = datetime.fromisoformat(last_modified)
+    return response
@@ -0,0 +1,163 @@
+import os
+from datetime import timedelta
+
+
+def env_str(name, default):
+    return os.environ.get(name, default)
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_dict(name, default):
+    # "key=value,key=value"
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return dict(item.split("=", 1) for item in value.split(",") if "=" in item)
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = env_str("DATABASE_URL", "sqlite:///real_estate.db")
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Unset: a random key generated once under the instance folder.
+    JWT_SECRET_KEY = env_str("JWT_SECRET_KEY", None)
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=env_int("JWT_ACCESS_TOKEN_MINUTES", 15))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=env_int("JWT_REFRESH_TOKEN_DAYS", 30))
+    # Decoded tokens and user records are cached per process; a revocation
+    # made by another process is picked up within AUTH_REVOCATION_SYNC_SECONDS.
+    AUTH_TOKEN_CACHE_SIZE = env_int("AUTH_TOKEN_CACHE_SIZE", 4096)
+    AUTH_TOKEN_CACHE_TTL = env_int("AUTH_TOKEN_CACHE_TTL", 300)
+    AUTH_USER_CACHE_SIZE = env_int("AUTH_USER_CACHE_SIZE", 4096)
+    AUTH_USER_CACHE_TTL = env_int("AUTH_USER_CACHE_TTL", 60)
+    AUTH_REVOCATION_SYNC_SECONDS = env_int("AUTH_REVOCATION_SYNC_SECONDS", 5)
+    # Bookings are made as the signed-in user. Set this to let clients without
+    # a token book as the user_id in the request body, as they used to.
+    BOOKING_BODY_USER_ID = env_bool("BOOKING_BODY_USER_ID", False)
+
+    # Applied to every new SQLite connection. WAL lets readers proceed while a
+    # writer commits, busy_timeout makes writers wait for the lock instead of
+    # failing with "database is locked", and synchronous=NORMAL is durable in
+    # WAL mode while skipping an fsync per commit.
+    SQLITE_JOURNAL_MODE = env_str("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_BUSY_TIMEOUT_MS = env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+    SQLITE_SYNCHRONOUS = env_str("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_CACHE_SIZE_KB = env_int("SQLITE_CACHE_SIZE_KB", 20000)
+    SQLITE_MMAP_SIZE = env_int("SQLITE_MMAP_SIZE", 128 * 1024 * 1024)
+
+    # Connection pool for server databases such as Postgres; SQLite keeps
+    # SQLAlchemy's default pool.
+    DB_POOL_SIZE = env_int("DB_POOL_SIZE", 10)
+    DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 20)
+    DB_POOL_TIMEOUT = env_int("DB_POOL_TIMEOUT", 30)
+    DB_POOL_RECYCLE = env_int("DB_POOL_RECYCLE", 1800)
+
+    CACHE_BACKEND = env_str("CACHE_BACKEND", "memory")
+    CACHE_TTL = env_int("CACHE_TTL", 300)
+    CACHE_MAX_ENTRIES = env_int("CACHE_MAX_ENTRIES", 1024)
+    CACHE_REDIS_URL = env_str("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    # How the memory backend's invalidations reach the other worker processes:
+    # "sqlite" through a file shared on the host, "local" for one process only.
+    CACHE_INVALIDATION = env_str("CACHE_INVALIDATION", "sqlite")
+    CACHE_INVALIDATION_PATH = env_str("CACHE_INVALIDATION_PATH", None)
+
+    BCRYPT_LOG_ROUNDS = env_int("BCRYPT_LOG_ROUNDS", 12)
+    PASSWORD_HASH_WORKERS = env_int("PASSWORD_HASH_WORKERS", 2)
+    PASSWORD_HASH_MAX_PENDING = env_int("PASSWORD_HASH_MAX_PENDING", 16)
+    PASSWORD_HASH_TIMEOUT = env_int("PASSWORD_HASH_TIMEOUT", 10)
+
+    # Response compression: brotli when the package is installed and the
+    # client accepts it, otherwise gzip; bodies under COMPRESS_MIN_SIZE bytes
+    # are sent uncompressed.
+    COMPRESS_ENABLED = env_bool("COMPRESS_ENABLED", True)
+    COMPRESS_MIN_SIZE = env_int("COMPRESS_MIN_SIZE", 500)
+    COMPRESS_GZIP_LEVEL = env_int("COMPRESS_GZIP_LEVEL", 6)
+    COMPRESS_BROTLI_LEVEL = env_int("COMPRESS_BROTLI_LEVEL", 5)
+    COMPRESS_CACHE_ENTRIES = env_int("COMPRESS_CACHE_ENTRIES", 256)
+    COMPRESS_STREAMS = env_bool("COMPRESS_STREAMS", True)
+
+    # Token buckets per endpoint and client (JWT identity, else IP), as
+    # "<count>/<period>"; endpoints without a rule use RATE_LIMIT_DEFAULT.
+    # RATE_LIMIT_BACKEND=sqlite shares the buckets between all workers on the
+    # host. CONCURRENCY_LIMITS caps requests in flight per endpoint and process.
+    RATE_LIMIT_ENABLED = env_bool("RATE_LIMIT_ENABLED", False)
+    RATE_LIMIT_BACKEND = env_str("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_SQLITE_PATH = env_str("RATE_LIMIT_SQLITE_PATH", None)
+    RATE_LIMIT_DEFAULT = env_str("RATE_LIMIT_DEFAULT", "20/second")
+    RATE_LIMITS = env_dict(
+        "RATE_LIMITS",
+        {
+            "api.user_signin": "10/minute",
+            "api.user_signup": "5/minute",
+            "api.refresh_token": "30/minute",
+            "api.get_all_properties": "300/minute",
+            "api.search": "120/minute",
+        },
+    )
+    CONCURRENCY_LIMITS = env_dict(
+        "CONCURRENCY_LIMITS",
+        {"api.export_table": 2, "api.bulk_create_properties": 2, "api.get_all_bookings": 4},
+    )
+
+    # Most ids accepted by /properties/batch and /bookings/batch.
+    BATCH_MAX_IDS = env_int("BATCH_MAX_IDS", 100)
+    # Users per PATCH/DELETE /users/bulk request.
+    USER_BULK_MAX_IDS = env_int("USER_BULK_MAX_IDS", 10000)
+
+    # "auto" uses orjson when it is installed, "std" forces Flask's encoder.
+    JSON_BACKEND = env_str("JSON_BACKEND", "auto")
+
+    METRICS_ENABLED = env_bool("METRICS_ENABLED", False)
+    SLOW_REQUEST_MS = env_int("SLOW_REQUEST_MS", 500)
+    N_PLUS_ONE_THRESHOLD = env_int("N_PLUS_ONE_THRESHOLD", 10)
+
+    # Optional queued write path for POST /booking_requests: bookings are
+    # acknowledged with 202 and written by a background thread in group
+    # commits of up to BOOKING_QUEUE_BATCH_SIZE.
+    BOOKING_QUEUE_ENABLED = env_bool("BOOKING_QUEUE_ENABLED", False)
+    BOOKING_QUEUE_MAX_SIZE = env_int("BOOKING_QUEUE_MAX_SIZE", 1000)
+    BOOKING_QUEUE_BATCH_SIZE = env_int("BOOKING_QUEUE_BATCH_SIZE", 50)
+    BOOKING_QUEUE_LINGER_MS = env_int("BOOKING_QUEUE_LINGER_MS", 5)
+    # Attempts per batch when the database stays locked, and how long a
+    # request may stay pending before another process takes it over.
+    BOOKING_QUEUE_RETRIES = env_int("BOOKING_QUEUE_RETRIES", 3)
+    BOOKING_QUEUE_STALE_S = env_int("BOOKING_QUEUE_STALE_S", 60)
+
+    # Thumbnails for property images: "auto" renders them when Pillow is
+    # installed. Images are stored under IMAGE_STORE_DIR (default
+    # instance/images); relative image_links are read from IMAGE_LOCAL_ROOT.
+    IMAGE_THUMBNAILS = env_str("IMAGE_THUMBNAILS", "auto")
+    IMAGE_STORE_DIR = env_str("IMAGE_STORE_DIR", None)
+    IMAGE_LOCAL_ROOT = env_str("IMAGE_LOCAL_ROOT", None)
+    # http(s) image_links are only fetched when enabled, and never from
+    # private, loopback or link-local addresses; IMAGE_FETCH_HOSTS (comma
+    # separated) further restricts them to those hosts.
+    IMAGE_FETCH_REMOTE = env_bool("IMAGE_FETCH_REMOTE", False)
+    IMAGE_FETCH_HOSTS = [host.strip() for host in env_str("IMAGE_FETCH_HOSTS", "").split(",") if host.strip()]
+    IMAGE_FETCH_TIMEOUT = env_int("IMAGE_FETCH_TIMEOUT", 10)
+    IMAGE_MAX_BYTES = env_int("IMAGE_MAX_BYTES", 10 * 1024 * 1024)
+    IMAGE_WORKERS = env_int("IMAGE_WORKERS", 2)
+
+    # Warm each server worker up before it takes traffic (see warmup.py);
+    # PREWARM_PATHS overrides the requests it sends, comma separated.
+    PREWARM = env_bool("PREWARM", False)
+    PREWARM_PATHS = [path for path in env_str("PREWARM_PATHS", "").split(",") if path]
+
+    # Similar-listing vectors: "auto" builds them when NumPy is installed.
+    # The index is stored under SIMILAR_INDEX_DIR (default instance/similarity)
+    # and synced SIMILAR_SYNC_DELAY_MS after property writes.
+    SIMILAR_PROPERTIES = env_str("SIMILAR_PROPERTIES", "auto")
+    SIMILAR_INDEX_DIR = env_str("SIMILAR_INDEX_DIR", None)
+    SIMILAR_MAX_TERMS = env_int("SIMILAR_MAX_TERMS", 512)
+    SIMILAR_MAX_CITIES = env_int("SIMILAR_MAX_CITIES", 64)
+    SIMILAR_MAX_K = env_int("SIMILAR_MAX_K", 50)
+    SIMILAR_SYNC_DELAY_MS = env_int("SIMILAR_SYNC_DELAY_MS", 1000)
@@ -0,0 +1,55 @@
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+
+
+def engine_options(config):
+    """SQLAlchemy engine options for the configured database URI."""
+    if make_url(config["SQLALCHEMY_DATABASE_URI"]).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": True,
+    }
+
+
+def sqlite_pragmas(config):
+    return [
+        f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        # A negative cache_size is in KiB rather than pages.
+        f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def configure_engine(engine, config):
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def begin_write(session):
+    """Start the session's transaction holding the database write lock.
+
+    pysqlite opens a deferred transaction, so a transaction that reads
+    before it writes cannot upgrade its read snapshot once another process
+    has committed, and fails with "database is locked" without waiting.
+    BEGIN IMMEDIATE takes the write lock up front (waiting up to
+    busy_timeout); other databases lock the rows they read instead.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        session.execute(text("BEGIN IMMEDIATE"))
@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+from datetime import date
+from models import db, Property, Booking
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORTS = {
+    "properties": (
+        Property,
+        ["id", "title", "description", "price", "bedrooms", "bathrooms", "location", "image_link"],
+    ),
+    "bookings": (
+        Booking,
+        ["id", "user_id", "property_id", "check_in_date", "check_out_date"],
+    ),
+}
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def iter_export_rows(name, after_id=0):
+    """Yield rows of ``name`` as tuples in id order, starting after ``after_id``.
+
+    Only the exported columns are selected, and ``yield_per`` makes the
+    driver fetch EXPORT_BATCH_SIZE rows at a time from an open cursor, so
+    memory use does not grow with the table.
+    """
+    model, fields = EXPORTS[name]
+    columns = [getattr(model, field) for field in fields]
+    query = (
+        db.session.query(*columns)
+        .filter(model.id > after_id)
+        .order_by(model.id.asc())
+        .execution_options(yield_per=EXPORT_BATCH_SIZE, stream_results=True)
+    )
+    for row in query:
+        yield tuple(row)
+
+
+def generate_ndjson(name, rows):
+    _, fields = EXPORTS[name]
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(dict(zip(fields, row)), default=_json_default))
+        if len(chunk) >= EXPORT_BATCH_SIZE:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def generate_csv(name, rows, header=True):
+    _, fields = EXPORTS[name]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(fields)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def generate_export(name, fmt, after_id=0):
+    rows = iter_export_rows(name, after_id)
+    if fmt == "csv":
+        # A resumed export is appended to an earlier one, so skip the header.
+        return generate_csv(name, rows, header=not after_id)
+    return generate_ndjson(name, rows)
@@ -0,0 +1,84 @@
+from sqlalchemy import text
+from models import db
+
+FACET_TABLE = "property_facet"
+LOCATION_STATS_TABLE = "property_location_stats"
+
+# Upper bounds of the price bands; the last band is open ended. The
+# property_facets_* triggers (migration e5b8a2d4c6f1) bucket prices with the
+# same edges, so changing them needs a migration that recreates the triggers.
+PRICE_BAND_EDGES = (100000, 250000, 500000, 1000000)
+
+
+def is_facet_table(name):
+    return name in (FACET_TABLE, LOCATION_STATS_TABLE)
+
+
+def price_band_sql(column):
+    whens = " ".join(f"WHEN {column} < {edge} THEN {index}" for index, edge in enumerate(PRICE_BAND_EDGES))
+    return f"CASE {whens} ELSE {len(PRICE_BAND_EDGES)} END"
+
+
+def price_band(index):
+    low = PRICE_BAND_EDGES[index - 1] if index > 0 else 0
+    high = PRICE_BAND_EDGES[index] if index < len(PRICE_BAND_EDGES) else None
+    label = f"{low}-{high}" if high is not None else f"{low}+"
+    return {"band": label, "min_price": low, "max_price": high}
+
+
+def property_facets():
+    """Listing counts by location, bedrooms and price band from the summary tables.
+
+    Reads one row per facet value, however many properties there are.
+    """
+    locations = db.session.execute(
+        text(
+            f"SELECT location, count, price_sum, min_price, max_price FROM {LOCATION_STATS_TABLE} "
+            "ORDER BY count DESC, location"
+        )
+    ).all()
+    facets = db.session.execute(text(f"SELECT facet, value, count FROM {FACET_TABLE}")).all()
+
+    bedrooms = sorted((int(value), count) for facet, value, count in facets if facet == "bedrooms")
+    bands = sorted((int(value), count) for facet, value, count in facets if facet == "price_band")
+    return {
+        "total": sum(row.count for row in locations),
+        "locations": [
+            {
+                "location": row.location,
+                "count": row.count,
+                "min_price": row.min_price,
+                "max_price": row.max_price,
+                "avg_price": round(row.price_sum / row.count, 2),
+            }
+            for row in locations
+        ],
+        "bedrooms": [{"bedrooms": value, "count": count} for value, count in bedrooms],
+        "price_bands": [dict(price_band(index), count=count) for index, count in bands],
+    }
+
+
+def rebuild_facets():
+    """Recompute both summary tables from the property table."""
+    db.session.execute(text(f"DELETE FROM {LOCATION_STATS_TABLE}"))
+    db.session.execute(text(f"DELETE FROM {FACET_TABLE}"))
+    db.session.execute(
+        text(
+            f"INSERT INTO {LOCATION_STATS_TABLE} (location, count, price_sum, min_price, max_price) "
+            "SELECT location, COUNT(*), SUM(price), MIN(price), MAX(price) FROM property GROUP BY location"
+        )
+    )
+    db.session.execute(
+        text(
+            f"INSERT INTO {FACET_TABLE} (facet, value, count) "
+            "SELECT 'bedrooms', bedrooms, COUNT(*) FROM property GROUP BY bedrooms"
+        )
+    )
+    db.session.execute(
+        text(
+            f"INSERT INTO {FACET_TABLE} (facet, value, count) "
+            f"SELECT 'price_band', band, COUNT(*) FROM (SELECT {price_band_sql('price')} AS band FROM property) "
+            "GROUP BY band"
+        )
+    )
+    db.session.commit()
@@ -0,0 +1,164 @@
+import math
+from sqlalchemy import event, text
+from models import db
+
+RTREE_TABLE = "property_rtree"
+EARTH_RADIUS_KM = 6371.0088
+
+DEFAULT_RADIUS_KM = 5.0
+MAX_RADIUS_KM = 50.0
+
+
+class CoordinateError(ValueError):
+    pass
+
+
+def is_geo_table(name):
+    # R*Tree keeps its nodes in <table>_node, _parent and _rowid shadow tables.
+    return name == RTREE_TABLE or name.startswith(RTREE_TABLE + "_")
+
+
+def parse_coordinates(latitude, longitude):
+    """Validate a latitude/longitude pair; both missing means no location."""
+    if latitude in (None, "") and longitude in (None, ""):
+        return None, None
+    try:
+        latitude = float(latitude)
+        longitude = float(longitude)
+    except (TypeError, ValueError):
+        raise CoordinateError("latitude and longitude must both be numbers")
+    if not -90 <= latitude <= 90:
+        raise CoordinateError("latitude must be between -90 and 90")
+    if not -180 <= longitude <= 180:
+        raise CoordinateError("longitude must be between -180 and 180")
+    return latitude, longitude
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    # Exact bounds of a spherical cap: the widest longitude span is reached
+    # poleward of the centre, so it is wider than radius / cos(latitude).
+    angle = radius_km / EARTH_RADIUS_KM
+    d_lat = math.degrees(angle)
+    cos_lat = math.cos(math.radians(latitude))
+    # Near the poles a degree of longitude shrinks to nothing; search all of them.
+    if cos_lat < 1e-6 or math.sin(angle) >= cos_lat:
+        d_lng = 180.0
+    else:
+        d_lng = min(180.0, math.degrees(math.asin(math.sin(angle) / cos_lat)))
+    return latitude - d_lat, latitude + d_lat, longitude - d_lng, longitude + d_lng
+
+
+def _inner_box(latitude, longitude, radius_km):
+    """A box of points all closer than ``radius_km``, or None.
+
+    The square inscribed in the circle, shrunk by 5% so that the longitude
+    scale changing across the box (below 75 degrees of latitude) and the
+    flat approximation cannot let a farther point in.
+    """
+    cos_lat = math.cos(math.radians(latitude))
+    if radius_km <= 0 or cos_lat < 0.25:
+        return None
+    half = math.degrees(radius_km * 0.95 / math.sqrt(2) / EARTH_RADIUS_KM)
+    return latitude - half, latitude + half, longitude - half / cos_lat, longitude + half / cos_lat
+
+
+def _search_boxes(latitude, longitude, inner_km, outer_km):
+    """Boxes covering the ring between ``inner_km`` and ``outer_km``.
+
+    The outer bounding box minus the square inside the inner circle, as up
+    to four strips, each split where it crosses the antimeridian.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, outer_km)
+    inner = _inner_box(latitude, longitude, inner_km)
+    if inner is None or inner[2] < -180 or inner[3] > 180:
+        boxes = [(min_lat, max_lat, min_lng, max_lng)]
+    else:
+        in_min_lat, in_max_lat, in_min_lng, in_max_lng = inner
+        boxes = [
+            (min_lat, in_min_lat, min_lng, max_lng),
+            (in_max_lat, max_lat, min_lng, max_lng),
+            (in_min_lat, in_max_lat, min_lng, in_min_lng),
+            (in_min_lat, in_max_lat, in_max_lng, max_lng),
+        ]
+    split = []
+    for box_min_lat, box_max_lat, box_min_lng, box_max_lng in boxes:
+        if box_min_lng < -180:
+            split += [(box_min_lat, box_max_lat, -180.0, box_max_lng), (box_min_lat, box_max_lat, box_min_lng + 360, 180.0)]
+        elif box_max_lng > 180:
+            split += [(box_min_lat, box_max_lat, box_min_lng, 180.0), (box_min_lat, box_max_lat, -180.0, box_max_lng - 360)]
+        else:
+            split.append((box_min_lat, box_max_lat, box_min_lng, box_max_lng))
+    return split
+
+
+def register_sql_functions(engine):
+    """Make ``haversine_km(lat1, lng1, lat2, lng2)`` callable from SQLite."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def create_functions(dbapi_connection, connection_record):
+        dbapi_connection.create_function("haversine_km", 4, _sql_haversine_km, deterministic=True)
+
+
+def _sql_haversine_km(lat1, lng1, lat2, lng2):
+    if None in (lat1, lng1, lat2, lng2):
+        return None
+    return haversine_km(lat1, lng1, lat2, lng2)
+
+
+def _nearby_page(latitude, longitude, inner_km, outer_km, limit, after):
+    # R*Tree stores 32-bit floats rounded outwards, so test for overlap with
+    # each box and take exact coordinates from the property row. A point on
+    # the edge of two strips matches both; UNION keeps it once.
+    boxes = _search_boxes(latitude, longitude, inner_km, outer_km)
+    params = {"latitude": latitude, "longitude": longitude, "outer": outer_km, "limit": limit}
+    candidates = []
+    for index, box in enumerate(boxes):
+        candidates.append(
+            f"SELECT property.id AS id, "
+            f"haversine_km(:latitude, :longitude, property.latitude, property.longitude) AS distance "
+            f"FROM {RTREE_TABLE} JOIN property ON property.id = {RTREE_TABLE}.id "
+            f"WHERE {RTREE_TABLE}.max_lat >= :min_lat_{index} AND {RTREE_TABLE}.min_lat <= :max_lat_{index} "
+            f"AND {RTREE_TABLE}.max_lng >= :min_lng_{index} AND {RTREE_TABLE}.min_lng <= :max_lng_{index}"
+        )
+        (
+            params[f"min_lat_{index}"], params[f"max_lat_{index}"], params[f"min_lng_{index}"], params[f"max_lng_{index}"]
+        ) = box
+    where = "distance <= :outer"
+    if after is not None:
+        where += " AND (distance > :after_distance OR (distance = :after_distance AND id > :after_id))"
+        params["after_distance"], params["after_id"] = after
+    sql = text(f"SELECT distance, id FROM ({' UNION '.join(candidates)}) WHERE {where} ORDER BY distance, id LIMIT :limit")
+    return [tuple(row) for row in db.session.execute(sql, params)]
+
+
+def nearby_property_ids(latitude, longitude, radius_km, limit, after=None):
+    """Up to ``limit`` ``(distance_km, property_id)`` pairs within the radius, nearest first.
+
+    ``after`` is the last pair of the previous page. A page is searched in
+    a ring starting at that distance, widened until it holds ``limit``
+    matches or reaches ``radius_km``: every point inside the ring's outer
+    circle is a candidate, so those matches are the nearest ones. SQLite
+    computes the distances and applies the ring, the cursor, the ordering
+    and the limit itself, and the square inside the inner circle is never
+    scanned, so a page costs about the rows near it rather than every
+    property within the radius.
+    """
+    inner = after[0] if after is not None else 0.0
+    gap = radius_km / 16
+    while True:
+        outer = min(radius_km, inner + gap)
+        page = _nearby_page(latitude, longitude, inner, outer, limit, after)
+        if len(page) >= limit or outer >= radius_km:
+            return page
+        gap *= 2
@@ -0,0 +1,46 @@
+# Production server settings, e.g. `gunicorn -c gunicorn.conf.py wsgi:app`.
+import multiprocessing
+from config import env_bool, env_int, env_str
+
+bind = env_str("BIND", f"0.0.0.0:{env_int('PORT', 4000)}")
+workers = env_int("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1)
+threads = env_int("GUNICORN_THREADS", 4)
+worker_class = "gthread" if threads > 1 else "sync"
+timeout = env_int("GUNICORN_TIMEOUT", 30)
+keepalive = env_int("GUNICORN_KEEPALIVE", 5)
+max_requests = env_int("GUNICORN_MAX_REQUESTS", 10000)
+max_requests_jitter = env_int("GUNICORN_MAX_REQUESTS_JITTER", 1000)
+preload_app = env_bool("GUNICORN_PRELOAD", False)
+prewarm = env_bool("PREWARM", False)
+accesslog = env_str("GUNICORN_ACCESS_LOG", "-")
+
+# Each worker has its own memory cache; without shared invalidation a write
+# would only retire the copies held by the worker that handled it.
+if (
+    workers > 1
+    and env_str("CACHE_BACKEND", "memory") == "memory"
+    and env_str("CACHE_INVALIDATION", "sqlite") == "local"
+):
+    raise RuntimeError("CACHE_INVALIDATION=local is only safe with one worker; use sqlite or CACHE_BACKEND=redis")
+
+
+def post_fork(server, worker):
+    # With preload_app the engine is created in the master; make sure no
+    # pooled connection is shared across the forked workers.
+    if preload_app:
+        from wsgi import app
+        from models import db
+
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    # Runs in each worker after the app is loaded and before it accepts
+    # connections, so the first requests skip connection setup and
+    # first-use compilation.
+    if prewarm:
+        from warmup import warm_up
+
+        timings = warm_up(worker.wsgi)
+        worker.log.info("Worker %s warmed up in %.1f ms", worker.pid, timings["total"])
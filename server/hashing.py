@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+from instrumentation import span
+
+# bcrypt only ever looked at the first 72 bytes; newer releases raise instead
+# of truncating, so truncate here to keep existing hashes verifiable.
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+
+class HasherSaturated(Exception):
+    pass
+
+
+def _password_bytes(password):
+    return password.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES]
+
+
+def _hash_password(password, rounds):
+    return bcrypt.hashpw(_password_bytes(password), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check_password(password_hash, password):
+    try:
+        return bcrypt.checkpw(_password_bytes(password), password_hash.encode("utf-8"))
+    except ValueError:
+        return False
+
+
+def hash_rounds(password_hash):
+    # Modular crypt format: $2b$<cost>$<salt+digest>
+    try:
+        return int(password_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded process pool instead of the request thread.
+
+    At most ``PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_PENDING`` operations
+    are admitted at once; beyond that ``HasherSaturated`` is raised right away
+    so the route can answer 429 instead of queueing without bound. With
+    ``PASSWORD_HASH_WORKERS = 0`` hashing runs inline.
+    """
+
+    def __init__(self, app=None):
+        self.rounds = 12
+        self.timeout = None
+        self.workers = 0
+        self._executor = None
+        self._slots = None
+        self._executor_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("BCRYPT_LOG_ROUNDS", 12)
+        app.config.setdefault("PASSWORD_HASH_WORKERS", 2)
+        app.config.setdefault("PASSWORD_HASH_MAX_PENDING", 16)
+        app.config.setdefault("PASSWORD_HASH_TIMEOUT", 10)
+
+        self.rounds = app.config["BCRYPT_LOG_ROUNDS"]
+        self.timeout = app.config["PASSWORD_HASH_TIMEOUT"]
+        self.workers = app.config["PASSWORD_HASH_WORKERS"]
+        if self.workers:
+            self._slots = threading.BoundedSemaphore(self.workers + app.config["PASSWORD_HASH_MAX_PENDING"])
+        app.extensions["password_hasher"] = self
+
+    def _submit(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HasherSaturated("Too many password operations in progress, retry shortly")
+        try:
+            # The pool is created on first use so it is never forked into
+            # server worker processes before they start.
+            if self._executor is None:
+                with self._executor_lock:
+                    if self._executor is None:
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+    def hash(self, password):
+        with span("password_hash"):
+            return self._submit(_hash_password, password, self.rounds)
+
+    def check(self, password_hash, password):
+        with span("password_check"):
+            return self._submit(_check_password, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return hash_rounds(password_hash) != self.rounds
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,351 @@
+import hashlib
+import http.client
+import importlib.util
+import io
+import ipaddress
+import logging
+import os
+import re
+import socket
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from sqlalchemy import update
+from models import db, Property
+
+logger = logging.getLogger("real_estate.images")
+
+# Widths every image is resized to; the URLs are derived from the digest so
+# these are fixed rather than configurable.
+THUMBNAIL_WIDTHS = (320, 640, 1280)
+LISTING_WIDTH = 320
+THUMBNAIL_FORMAT = "jpg"
+THUMBNAIL_QUALITY = 82
+
+# Thumbnails never change once written (their URL embeds the digest).
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+ORIGINAL_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+
+
+class ImageError(ValueError):
+    pass
+
+
+def thumbnail_url(digest, width=LISTING_WIDTH):
+    return f"/images/{digest}/{width}.{THUMBNAIL_FORMAT}" if digest else None
+
+
+def thumbnail_srcset(digest):
+    if not digest:
+        return None
+    return ", ".join(f"{thumbnail_url(digest, width)} {width}w" for width in THUMBNAIL_WIDTHS)
+
+
+def _load_pillow():
+    from PIL import Image, ImageOps
+
+    return Image, ImageOps
+
+
+class ImagePipeline:
+    """Fetches property images and renders content-addressed thumbnails.
+
+    Every source image is stored once under its SHA-256 digest
+    (``<IMAGE_STORE_DIR>/<d[:2]>/<digest>/``) with one JPEG per width in
+    ``THUMBNAIL_WIDTHS``; identical images shared by many properties are
+    processed once. Work runs on a small thread pool so create and update
+    requests return immediately; the property's ``image_digest`` is set when
+    its thumbnails are ready. ``IMAGE_THUMBNAILS`` is "auto" (on when Pillow
+    is installed), "on" or "off".
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.store_dir = None
+        self.local_root = None
+        self.fetch_remote = False
+        self.fetch_hosts = ()
+        self.fetch_timeout = 10
+        self.max_bytes = 10 * 1024 * 1024
+        self.workers = 1
+        self._app = None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._scheduled = set()
+        # Called with the property id once new thumbnails are linked, so the
+        # app can drop cached responses for it.
+        self.on_ready = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("IMAGE_THUMBNAILS", "auto")
+        app.config.setdefault("IMAGE_STORE_DIR", None)
+        app.config.setdefault("IMAGE_LOCAL_ROOT", None)
+        app.config.setdefault("IMAGE_FETCH_REMOTE", False)
+        app.config.setdefault("IMAGE_FETCH_HOSTS", [])
+        app.config.setdefault("IMAGE_FETCH_TIMEOUT", 10)
+        app.config.setdefault("IMAGE_MAX_BYTES", 10 * 1024 * 1024)
+        app.config.setdefault("IMAGE_WORKERS", 1)
+        app.extensions["image_pipeline"] = self
+
+        mode = app.config["IMAGE_THUMBNAILS"]
+        if mode not in ("auto", "on", "off"):
+            raise ValueError(f"Unknown IMAGE_THUMBNAILS {mode!r}")
+        self.enabled = False
+        if mode != "off":
+            # Only look for Pillow here; it is imported by the first job.
+            if importlib.util.find_spec("PIL") is not None:
+                self.enabled = True
+            elif mode == "on":
+                raise RuntimeError("IMAGE_THUMBNAILS=on requires the Pillow package")
+
+        self.store_dir = app.config["IMAGE_STORE_DIR"] or os.path.join(app.instance_path, "images")
+        self.local_root = app.config["IMAGE_LOCAL_ROOT"]
+        self.fetch_remote = app.config["IMAGE_FETCH_REMOTE"]
+        self.fetch_hosts = tuple(host.lower() for host in app.config["IMAGE_FETCH_HOSTS"])
+        self.fetch_timeout = app.config["IMAGE_FETCH_TIMEOUT"]
+        self.max_bytes = app.config["IMAGE_MAX_BYTES"]
+        self.workers = app.config["IMAGE_WORKERS"]
+        self._app = app
+
+    def directory(self, digest):
+        return os.path.join(self.store_dir, digest[:2], digest)
+
+    def schedule(self, property_id, image_link):
+        """Render thumbnails for a property in the background."""
+        if not self.enabled or not image_link:
+            return
+        with self._executor_lock:
+            if (property_id, image_link) in self._scheduled:
+                return
+            self._scheduled.add((property_id, image_link))
+            # Created on first use so it is never forked into server workers.
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="images")
+            self._executor.submit(self._run, property_id, image_link)
+
+    def _run(self, property_id, image_link):
+        try:
+            with self._app.app_context():
+                self.process(property_id, image_link)
+        except ImageError as e:
+            logger.warning("No thumbnails for property %s: %s", property_id, e)
+        except Exception:
+            logger.exception("Thumbnails for property %s from %s failed", property_id, image_link)
+        finally:
+            with self._executor_lock:
+                self._scheduled.discard((property_id, image_link))
+
+    def process(self, property_id, image_link):
+        """Fetch, store and resize one property's image; returns the digest.
+
+        The property is only updated if its image_link is still the one that
+        was processed, so a slow fetch cannot overwrite a newer image.
+        """
+        digest = self.store(self.fetch(image_link))
+        result = db.session.execute(
+            update(Property)
+            .where(Property.id == property_id, Property.image_link == image_link)
+            .values(image_digest=digest, version=Property.version + 1)
+        )
+        db.session.commit()
+        if result.rowcount and self.on_ready is not None:
+            self.on_ready(property_id)
+        return digest
+
+    def backfill(self, rows):
+        """Process ``(property_id, image_link)`` pairs on ``IMAGE_WORKERS`` threads.
+
+        Yields ``(property_id, error)`` with ``error`` None on success.
+        """
+        def work(row):
+            with self._app.app_context():
+                try:
+                    self.process(*row)
+                    return row[0], None
+                except Exception as e:
+                    db.session.rollback()
+                    return row[0], str(e)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="images") as pool:
+            yield from pool.map(work, rows)
+
+    def save_upload(self, data):
+        """Store an uploaded original and return the image_link serving it."""
+        Image, _ = _load_pillow()
+        if len(data) > self.max_bytes:
+            raise ImageError(f"Image is larger than {self.max_bytes} bytes")
+        try:
+            extension = ORIGINAL_EXTENSIONS.get(Image.open(io.BytesIO(data)).format)
+        except Exception as e:
+            raise ImageError(f"Not a readable image: {e}")
+        if extension is None:
+            raise ImageError("Unsupported image format, expected JPEG, PNG, WebP or GIF")
+        digest = hashlib.sha256(data).hexdigest()
+        os.makedirs(self.directory(digest), exist_ok=True)
+        _write_atomic(os.path.join(self.directory(digest), f"original.{extension}"), data)
+        return f"/images/{digest}/original.{extension}"
+
+    def _check_host(self, host):
+        if self.fetch_hosts and (host or "").lower() not in self.fetch_hosts:
+            raise ImageError(f"Image host {host!r} is not in IMAGE_FETCH_HOSTS")
+
+    def fetch(self, image_link):
+        parsed = urlparse(image_link)
+        if parsed.scheme == "" and parsed.path.startswith("/images/"):
+            # An upload already in the store.
+            _, _, digest, name = (parsed.path.split("/", 3) + ["", ""])[:4]
+            if not DIGEST_RE.match(digest):
+                raise ImageError(f"Unknown stored image {image_link!r}")
+            with open(os.path.join(self.directory(digest), os.path.basename(name)), "rb") as source:
+                return source.read()
+        if parsed.scheme in ("http", "https"):
+            if not self.fetch_remote:
+                raise ImageError("Fetching remote images is disabled")
+            self._check_host(parsed.hostname)
+            request = urllib.request.Request(image_link, headers={"User-Agent": "real-estate-thumbnailer"})
+            with _public_opener(self._check_host).open(request, timeout=self.fetch_timeout) as response:
+                data = response.read(self.max_bytes + 1)
+        elif parsed.scheme in ("", "file") and self.local_root:
+            root = os.path.realpath(self.local_root)
+            path = os.path.realpath(os.path.join(root, parsed.path.lstrip("/")))
+            if os.path.commonpath([root, path]) != root:
+                raise ImageError("Image path is outside IMAGE_LOCAL_ROOT")
+            with open(path, "rb") as source:
+                data = source.read(self.max_bytes + 1)
+        else:
+            raise ImageError(f"Unsupported image location {image_link!r}")
+        if len(data) > self.max_bytes:
+            raise ImageError(f"Image is larger than {self.max_bytes} bytes")
+        return data
+
+    def store(self, data):
+        """Store an original and its thumbnails; a known digest is a no-op."""
+        Image, ImageOps = _load_pillow()
+        digest = hashlib.sha256(data).hexdigest()
+        directory = self.directory(digest)
+        if all(os.path.exists(os.path.join(directory, f"{width}.{THUMBNAIL_FORMAT}")) for width in THUMBNAIL_WIDTHS):
+            return digest
+
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+        except Exception as e:
+            raise ImageError(f"Not a readable image: {e}")
+        extension = ORIGINAL_EXTENSIONS.get(image.format)
+        if extension is None:
+            raise ImageError(f"Unsupported image format {image.format}")
+
+        os.makedirs(directory, exist_ok=True)
+        _write_atomic(os.path.join(directory, f"original.{extension}"), data)
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        for width in THUMBNAIL_WIDTHS:
+            resized = image.copy()
+            # Never upscale; small originals keep their own size.
+            resized.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+            _write_atomic(os.path.join(directory, f"{width}.{THUMBNAIL_FORMAT}"), buffer.getvalue())
+        return digest
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# image_link comes from unauthenticated clients, so remote fetches must not
+# reach the server's own network. Every address the host resolves to is
+# checked, and the socket connects to those checked addresses rather than
+# resolving again, for the first request and for every redirect, so neither
+# a private IP literal nor a name (or a rebinding) that points at one is
+# ever connected to.
+
+def _require_public(address):
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    if not ip.is_global or ip.is_multicast:
+        raise ImageError(f"Refusing to fetch images from non-public address {ip}")
+
+
+def _public_socket(address, timeout=None, source_address=None):
+    host, port = address
+    addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    for *_, sockaddr in addresses:
+        _require_public(sockaddr[0])
+    error = None
+    for family, type_, proto, _, sockaddr in addresses:
+        sock = socket.socket(family, type_, proto)
+        try:
+            if isinstance(timeout, (int, float)):
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as e:
+            sock.close()
+            error = e
+    raise error or OSError(f"Could not resolve {host!r}")
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _public_socket
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _public_socket
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class _CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    def __init__(self, check_host):
+        self.check_host = check_host
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        parsed = urlparse(newurl)
+        if parsed.scheme not in ("http", "https"):
+            raise ImageError(f"Refusing to follow redirect to {newurl!r}")
+        self.check_host(parsed.hostname)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def _public_opener(check_host):
+    # No ProxyHandler: a proxy would make the connection check meaningless.
+    opener = urllib.request.OpenerDirector()
+    for handler in (
+        _PublicHTTPHandler(),
+        _PublicHTTPSHandler(),
+        _CheckedRedirectHandler(check_host),
+        urllib.request.HTTPDefaultErrorHandler(),
+        urllib.request.HTTPErrorProcessor(),
+    ):
+        opener.add_handler(handler)
+    return opener
+
+
+def _write_atomic(path, data):
+    # Readers either see the complete file or none at all.
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, "wb") as target:
+        target.write(data)
+    os.replace(temporary, path)
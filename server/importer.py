@@ -0,0 +1,122 @@
+import csv
+import json
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from models import db, Property
+from geo import CoordinateError, parse_coordinates
+
+REQUIRED_PROPERTY_FIELDS = ["title", "description", "price", "bedrooms", "bathrooms", "location", "image_link"]
+NUMERIC_PROPERTY_FIELDS = {"price": float, "bedrooms": int, "bathrooms": int}
+
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+
+class RowError(ValueError):
+    pass
+
+
+def iter_rows(lines, fmt):
+    """Yield ``(row_number, record)`` from a JSON Lines or CSV text stream."""
+    if fmt == "csv":
+        for row_number, record in enumerate(csv.DictReader(lines), start=1):
+            yield row_number, record
+    elif fmt == "jsonl":
+        for row_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield row_number, json.loads(line)
+            except ValueError as e:
+                yield row_number, RowError(f"Invalid JSON: {e}")
+    else:
+        raise ValueError(f"Unsupported format {fmt!r}, expected jsonl or csv")
+
+
+def validate_row(record):
+    if isinstance(record, RowError):
+        raise record
+    if not isinstance(record, dict):
+        raise RowError("Row is not an object")
+
+    for field in REQUIRED_PROPERTY_FIELDS:
+        if field not in record or not record[field]:
+            raise RowError(f"Missing or empty {field}")
+
+    mapping = {field: record[field] for field in REQUIRED_PROPERTY_FIELDS}
+    for field, cast in NUMERIC_PROPERTY_FIELDS.items():
+        try:
+            mapping[field] = cast(mapping[field])
+        except (TypeError, ValueError):
+            raise RowError(f"Invalid {field}: {mapping[field]!r}")
+    try:
+        mapping["latitude"], mapping["longitude"] = parse_coordinates(record.get("latitude"), record.get("longitude"))
+    except CoordinateError as e:
+        raise RowError(str(e))
+    return mapping
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "message": message})
+
+    def to_dict(self):
+        return {
+            "inserted": self.inserted,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "errors_truncated": self.error_count > len(self.errors),
+        }
+
+
+def import_properties(rows, batch_size=DEFAULT_BATCH_SIZE):
+    """Validate and insert ``rows`` in batches, one transaction per batch.
+
+    Invalid rows are reported and skipped. If the database rejects a batch,
+    that batch is retried row by row under savepoints so only the offending
+    rows are reported and the rest still land.
+    """
+    report = ImportReport()
+    batch = []
+
+    for row_number, record in rows:
+        try:
+            batch.append((row_number, validate_row(record)))
+        except RowError as e:
+            report.add_error(row_number, str(e))
+            continue
+        if len(batch) >= batch_size:
+            _flush_batch(batch, report)
+            batch = []
+
+    if batch:
+        _flush_batch(batch, report)
+    return report
+
+
+def _flush_batch(batch, report):
+    try:
+        db.session.execute(insert(Property), [mapping for _, mapping in batch])
+        db.session.commit()
+        report.inserted += len(batch)
+        return
+    except SQLAlchemyError:
+        db.session.rollback()
+
+    for row_number, mapping in batch:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(Property), [mapping])
+            report.inserted += 1
+        except SQLAlchemyError as e:
+            report.add_error(row_number, str(e.orig if hasattr(e, "orig") else e))
+    db.session.commit()
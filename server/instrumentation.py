@@ -0,0 +1,236 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger("real_estate.instrumentation")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_LITERAL_RE = re.compile(r"\b\d+\b|'[^']*'")
+
+
+class RequestMetrics:
+    __slots__ = ("started", "sql_count", "sql_time", "serialization_time", "statements", "spans")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.serialization_time = 0.0
+        self.statements = Counter()
+        self.spans = {}
+
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[name] = self.spans.get(name, 0.0) + time.perf_counter() - started
+
+
+def span(name):
+    """Time a block of work under ``name`` for the current request.
+
+    A no-op outside requests or when instrumentation is disabled.
+    """
+    metrics = g.get("_request_metrics") if has_request_context() else None
+    if metrics is None:
+        return nullcontext()
+    return metrics.span(name)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "total")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+
+
+class Instrumentation:
+    """Per-request SQL, serialization and handler timings plus /metrics.
+
+    SQL time covers statement execution; fetching rows and building ORM
+    objects count towards handler time. Disabled by default
+    (``METRICS_ENABLED``); when disabled no request hooks, engine events or
+    JSON wrappers are installed at all.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.slow_request_seconds = 0.5
+        self.n_plus_one_threshold = 10
+        self._lock = threading.Lock()
+        self._requests = Counter()
+        self._latency = {}
+        self._sql_queries = Counter()
+        self._sql_seconds = Counter()
+        self._serialization_seconds = Counter()
+        self._span_seconds = Counter()
+        self._slow_requests = Counter()
+        self._n_plus_one = Counter()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, engine=None):
+        app.config.setdefault("METRICS_ENABLED", False)
+        app.config.setdefault("SLOW_REQUEST_MS", 500)
+        app.config.setdefault("N_PLUS_ONE_THRESHOLD", 10)
+        app.extensions["instrumentation"] = self
+
+        self.enabled = app.config["METRICS_ENABLED"]
+        if not self.enabled:
+            return
+        self.slow_request_seconds = app.config["SLOW_REQUEST_MS"] / 1000
+        self.n_plus_one_threshold = app.config["N_PLUS_ONE_THRESHOLD"]
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        self._wrap_json_provider(app)
+        if engine is not None:
+            event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _wrap_json_provider(self, app):
+        respond = app.json.response
+
+        def timed_response(*args, **kwargs):
+            metrics = g.get("_request_metrics") if has_request_context() else None
+            if metrics is None:
+                return respond(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return respond(*args, **kwargs)
+            finally:
+                metrics.serialization_time += time.perf_counter() - started
+
+        app.json.response = timed_response
+
+    def _before_request(self):
+        g._request_metrics = RequestMetrics()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["_query_started"] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("_query_started", None)
+        metrics = g.get("_request_metrics") if has_request_context() else None
+        if metrics is None or started is None:
+            return
+        metrics.sql_count += 1
+        metrics.sql_time += time.perf_counter() - started
+        metrics.statements[statement] += 1
+
+    def _after_request(self, response):
+        metrics = g.pop("_request_metrics", None)
+        if metrics is None:
+            return response
+        duration = time.perf_counter() - metrics.started
+        endpoint = request.url_rule.endpoint if request.url_rule else "unmatched"
+        handler_time = max(0.0, duration - metrics.sql_time - metrics.serialization_time - sum(metrics.spans.values()))
+
+        response.headers["Server-Timing"] = ", ".join(
+            [
+                f"total;dur={duration * 1000:.2f}",
+                f"sql;dur={metrics.sql_time * 1000:.2f};desc=\"{metrics.sql_count} queries\"",
+                f"serialize;dur={metrics.serialization_time * 1000:.2f}",
+                f"handler;dur={handler_time * 1000:.2f}",
+            ]
+            + [f"{name};dur={seconds * 1000:.2f}" for name, seconds in metrics.spans.items()]
+        )
+
+        repeated = [
+            (statement, count)
+            for statement, count in metrics.statements.items()
+            if count >= self.n_plus_one_threshold
+        ]
+        slow = duration >= self.slow_request_seconds
+
+        with self._lock:
+            self._requests[(endpoint, request.method, response.status_code)] += 1
+            self._latency.setdefault(endpoint, _Histogram()).observe(duration)
+            self._sql_queries[endpoint] += metrics.sql_count
+            self._sql_seconds[endpoint] += metrics.sql_time
+            self._serialization_seconds[endpoint] += metrics.serialization_time
+            for name, seconds in metrics.spans.items():
+                self._span_seconds[(endpoint, name)] += seconds
+            if slow:
+                self._slow_requests[endpoint] += 1
+            if repeated:
+                self._n_plus_one[endpoint] += 1
+
+        if slow:
+            logger.warning(
+                "Slow request %s %s: %.1f ms total, %d queries in %.1f ms, serialization %.1f ms, %s",
+                request.method,
+                request.path,
+                duration * 1000,
+                metrics.sql_count,
+                metrics.sql_time * 1000,
+                metrics.serialization_time * 1000,
+                ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in metrics.spans.items()) or "no spans",
+            )
+        for statement, count in repeated:
+            logger.warning(
+                "Possible N+1 in %s %s: statement ran %d times: %s",
+                request.method,
+                request.path,
+                count,
+                _LITERAL_RE.sub("?", " ".join(statement.split()))[:200],
+            )
+        return response
+
+    def render(self):
+        """Metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP http_requests_total Requests handled, by endpoint, method and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+            lines += [
+                "# HELP http_request_duration_seconds Request latency, by endpoint.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for endpoint, histogram in sorted(self._latency.items()):
+                for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+                    lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {histogram.count}')
+                lines.append(f'http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {histogram.total}')
+                lines.append(f'http_request_duration_seconds_count{{endpoint="{endpoint}"}} {histogram.count}')
+
+            for name, help_text, values in (
+                ("sql_queries_total", "SQL statements executed, by endpoint.", self._sql_queries),
+                ("sql_duration_seconds_total", "Time spent in SQL, by endpoint.", self._sql_seconds),
+                ("serialization_duration_seconds_total", "Time spent serializing JSON, by endpoint.", self._serialization_seconds),
+                ("slow_requests_total", "Requests slower than SLOW_REQUEST_MS, by endpoint.", self._slow_requests),
+                ("n_plus_one_requests_total", "Requests repeating one statement N_PLUS_ONE_THRESHOLD+ times.", self._n_plus_one),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for endpoint, value in sorted(values.items()):
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+
+            lines += [
+                "# HELP span_duration_seconds_total Time spent in named spans such as password hashing.",
+                "# TYPE span_duration_seconds_total counter",
+            ]
+            for (endpoint, name), value in sorted(self._span_seconds.items()):
+                lines.append(f'span_duration_seconds_total{{endpoint="{endpoint}",span="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
@@ -1,3 +1,29 @@
+import os
 import secrets
+import time
 
-secret_key = secrets.token_hex(32) 
+
+def instance_secret_key(instance_path, name="secret_key"):
+    """A random key generated once and kept in the instance folder.
+
+    Every worker process and restart reads the same file, so tokens signed by
+    one worker verify in all others; set JWT_SECRET_KEY to manage it yourself.
+    """
+    path = os.path.join(instance_path, name)
+    os.makedirs(instance_path, exist_ok=True)
+    try:
+        # O_EXCL: when workers start together only one of them writes the key.
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(descriptor, "w") as target:
+            target.write(secrets.token_hex(32))
+    for _ in range(50):
+        with open(path) as source:
+            key = source.read().strip()
+        if key:
+            return key
+        # Another process created the file and has not written it yet.
+        time.sleep(0.01)
+    raise RuntimeError(f"{path} is empty; delete it or set JWT_SECRET_KEY")
@@ -0,0 +1,63 @@
+from flask import g
+
+DEFAULT_MAX_IDS = 100
+# Keeps each IN (...) list well below SQLite's bound-parameter limit.
+QUERY_CHUNK_SIZE = 500
+
+_batch_functions = {}
+
+
+class InvalidIds(ValueError):
+    pass
+
+
+def parse_ids(value, maximum=DEFAULT_MAX_IDS):
+    """Parse ``?ids=3,1,2`` into a list of ints, keeping order and repeats."""
+    if not value:
+        raise InvalidIds("Missing or empty ids")
+    try:
+        ids = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise InvalidIds("ids must be a comma separated list of integers")
+    if not ids:
+        raise InvalidIds("Missing or empty ids")
+    if len(ids) > maximum:
+        raise InvalidIds(f"At most {maximum} ids per request")
+    return ids
+
+
+class DataLoader:
+    """Resolves keys through one batch call instead of one query per key.
+
+    ``batch_fn`` takes a list of distinct keys and returns a dict of the keys
+    it found. Results are memoized for the loader's lifetime (one request,
+    see ``loader``), so repeated lookups of a key cost nothing.
+    """
+
+    def __init__(self, batch_fn):
+        self.batch_fn = batch_fn
+        self._results = {}
+
+    def load_many(self, keys):
+        missing = list(dict.fromkeys(key for key in keys if key not in self._results))
+        for start in range(0, len(missing), QUERY_CHUNK_SIZE):
+            chunk = missing[start:start + QUERY_CHUNK_SIZE]
+            found = self.batch_fn(chunk)
+            for key in chunk:
+                self._results[key] = found.get(key)
+        return [self._results[key] for key in keys]
+
+    def load(self, key):
+        return self.load_many([key])[0]
+
+
+def register_loader(name, batch_fn):
+    _batch_functions[name] = batch_fn
+
+
+def loader(name):
+    """The current request's DataLoader for ``name``."""
+    loaders = g.setdefault("_data_loaders", {})
+    if name not in loaders:
+        loaders[name] = DataLoader(_batch_functions[name])
+    return loaders[name]
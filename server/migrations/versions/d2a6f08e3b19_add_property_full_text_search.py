@@ -0,0 +1,55 @@
+"""Add property full-text search
+
+Revision ID: d2a6f08e3b19
+Revises: b7d3e5a1c820
+Create Date: 2024-03-21 11:45:12.639025
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a6f08e3b19'
+down_revision = 'b7d3e5a1c820'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # External-content FTS5 index over property; the triggers keep it in step
+    # with every insert, update and delete, including bulk statements.
+    op.execute(
+        "CREATE VIRTUAL TABLE property_fts USING fts5("
+        "title, description, location, "
+        "content='property', content_rowid='id', "
+        "tokenize='porter unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        "CREATE TRIGGER property_fts_ai AFTER INSERT ON property BEGIN "
+        "INSERT INTO property_fts(rowid, title, description, location) "
+        "VALUES (new.id, new.title, new.description, new.location); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER property_fts_ad AFTER DELETE ON property BEGIN "
+        "INSERT INTO property_fts(property_fts, rowid, title, description, location) "
+        "VALUES ('delete', old.id, old.title, old.description, old.location); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER property_fts_au AFTER UPDATE OF title, description, location ON property BEGIN "
+        "INSERT INTO property_fts(property_fts, rowid, title, description, location) "
+        "VALUES ('delete', old.id, old.title, old.description, old.location); "
+        "INSERT INTO property_fts(rowid, title, description, location) "
+        "VALUES (new.id, new.title, new.description, new.location); "
+        "END"
+    )
+    op.execute("INSERT INTO property_fts(property_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS property_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS property_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS property_fts_ai")
+    op.execute("DROP TABLE IF EXISTS property_fts")
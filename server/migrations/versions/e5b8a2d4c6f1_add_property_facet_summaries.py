@@ -0,0 +1,93 @@
+"""Add property facet summaries
+
+Revision ID: e5b8a2d4c6f1
+Revises: c93f0b6e2a17
+Create Date: 2024-04-15 11:47:03.918254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8a2d4c6f1'
+down_revision = 'c93f0b6e2a17'
+branch_labels = None
+depends_on = None
+
+PRICE_BAND = (
+    "CASE WHEN {price} < 100000 THEN 0 WHEN {price} < 250000 THEN 1 "
+    "WHEN {price} < 500000 THEN 2 WHEN {price} < 1000000 THEN 3 ELSE 4 END"
+)
+
+
+def _add(row):
+    return (
+        "INSERT INTO property_location_stats (location, count, price_sum, min_price, max_price) "
+        f"VALUES ({row}.location, 1, {row}.price, {row}.price, {row}.price) "
+        "ON CONFLICT (location) DO UPDATE SET count = count + 1, price_sum = price_sum + excluded.price_sum, "
+        "min_price = MIN(min_price, excluded.min_price), max_price = MAX(max_price, excluded.max_price); "
+        f"INSERT INTO property_facet (facet, value, count) VALUES ('bedrooms', {row}.bedrooms, 1) "
+        "ON CONFLICT (facet, value) DO UPDATE SET count = count + 1; "
+        f"INSERT INTO property_facet (facet, value, count) VALUES ('price_band', {PRICE_BAND.format(price=row + '.price')}, 1) "
+        "ON CONFLICT (facet, value) DO UPDATE SET count = count + 1; "
+    )
+
+
+def _remove(row):
+    # The row is already gone (or changed) when an AFTER trigger runs, so the
+    # min/max lookups see the remaining properties through
+    # ix_property_location_price_id.
+    return (
+        f"UPDATE property_location_stats SET count = count - 1, price_sum = price_sum - {row}.price, "
+        f"min_price = (SELECT MIN(price) FROM property WHERE location = {row}.location), "
+        f"max_price = (SELECT MAX(price) FROM property WHERE location = {row}.location) "
+        f"WHERE location = {row}.location; "
+        f"DELETE FROM property_location_stats WHERE location = {row}.location AND count <= 0; "
+        f"UPDATE property_facet SET count = count - 1 WHERE facet = 'bedrooms' AND value = {row}.bedrooms; "
+        f"UPDATE property_facet SET count = count - 1 "
+        f"WHERE facet = 'price_band' AND value = {PRICE_BAND.format(price=row + '.price')}; "
+        "DELETE FROM property_facet WHERE count <= 0; "
+    )
+
+
+def upgrade():
+    # Summary tables behind /properties/facets, kept in step with property by
+    # triggers so every write path (routes, bulk import, seeding) updates them.
+    op.execute(
+        "CREATE TABLE property_location_stats ("
+        "location VARCHAR(100) NOT NULL PRIMARY KEY, count INTEGER NOT NULL, price_sum FLOAT NOT NULL, "
+        "min_price FLOAT, max_price FLOAT)"
+    )
+    op.execute(
+        "CREATE TABLE property_facet ("
+        "facet VARCHAR(20) NOT NULL, value TEXT NOT NULL, count INTEGER NOT NULL, "
+        "PRIMARY KEY (facet, value)) WITHOUT ROWID"
+    )
+    op.execute(f"CREATE TRIGGER property_facets_ai AFTER INSERT ON property BEGIN {_add('new')}END")
+    op.execute(f"CREATE TRIGGER property_facets_ad AFTER DELETE ON property BEGIN {_remove('old')}END")
+    op.execute(
+        "CREATE TRIGGER property_facets_au AFTER UPDATE OF price, bedrooms, location ON property "
+        f"BEGIN {_remove('old')}{_add('new')}END"
+    )
+    op.execute(
+        "INSERT INTO property_location_stats (location, count, price_sum, min_price, max_price) "
+        "SELECT location, COUNT(*), SUM(price), MIN(price), MAX(price) FROM property GROUP BY location"
+    )
+    op.execute(
+        "INSERT INTO property_facet (facet, value, count) "
+        "SELECT 'bedrooms', bedrooms, COUNT(*) FROM property GROUP BY bedrooms"
+    )
+    op.execute(
+        "INSERT INTO property_facet (facet, value, count) "
+        f"SELECT 'price_band', band, COUNT(*) FROM (SELECT {PRICE_BAND.format(price='price')} AS band FROM property) "
+        "GROUP BY band"
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS property_facets_au")
+    op.execute("DROP TRIGGER IF EXISTS property_facets_ad")
+    op.execute("DROP TRIGGER IF EXISTS property_facets_ai")
+    op.execute("DROP TABLE IF EXISTS property_facet")
+    op.execute("DROP TABLE IF EXISTS property_location_stats")
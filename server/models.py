@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
+from datetime import datetime
 
 db = SQLAlchemy()
 bcrypt = Bcrypt()
@@ -10,6 +11,10 @@ class User(db.Model):
     email = db.Column(db.String(100), unique=True, nullable=False)
     password = db.Column(db.String(128), nullable=False)
 
+    # Deleting a user or property leaves its bookings alone, as it always has;
+    # passive_deletes="all" stops the ORM from nulling their foreign keys.
+    bookings = db.relationship("Booking", back_populates="user", passive_deletes="all")
+
     def __repr__(self):
         return f"User('{self.username}', '{self.email}')"
 
@@ -22,15 +27,74 @@ class Property(db.Model):
     bathrooms = db.Column(db.Integer, nullable=False)
     location = db.Column(db.String(100), nullable=False)
     image_link = db.Column(db.String(255), nullable=True)
+    image_digest = db.Column(db.String(64), nullable=True)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    version = db.Column(db.Integer, nullable=False, server_default="1")
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    bookings = db.relationship("Booking", back_populates="property", passive_deletes="all")
+
+    __table_args__ = (
+        db.Index("ix_property_price_id", "price", "id"),
+        db.Index("ix_property_location_price_id", "location", "price", "id"),
+        db.Index("ix_property_bedrooms_bathrooms_price", "bedrooms", "bathrooms", "price"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return f"Property('{self.title}', '{self.price}', '{self.location}')"
     
 class Booking(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     property_id = db.Column(db.Integer, db.ForeignKey('property.id'), nullable=False)
     check_in_date = db.Column(db.Date, nullable=False)
     check_out_date = db.Column(db.Date, nullable=False)
 
+    user = db.relationship("User", back_populates="bookings")
+    property = db.relationship("Property", back_populates="bookings")
+
+    __table_args__ = (
+        db.Index("ix_booking_property_dates", "property_id", "check_in_date", "check_out_date"),
+    )
+
     def __repr__(self):
         return f"Booking(User ID: {self.user_id}, Property ID: {self.property_id}, Check-in: {self.check_in_date}, Check-out: {self.check_out_date})"
+
+class PropertyOccupancy(db.Model):
+    # Booked nights of one property in one month (yyyymm): bit d-1 of nights
+    # is set when the night starting on day d is booked. Kept up to date by
+    # occupancy.py.
+    property_id = db.Column(db.Integer, db.ForeignKey('property.id', ondelete='CASCADE'), primary_key=True)
+    month = db.Column(db.Integer, primary_key=True, index=True)
+    nights = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f"PropertyOccupancy(Property ID: {self.property_id}, Month: {self.month}, Nights: {self.nights:b})"
+
+class BookingRequest(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    idempotency_key = db.Column(db.String(64), unique=True, nullable=False)
+    status = db.Column(db.String(16), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    property_id = db.Column(db.Integer, nullable=False)
+    check_in_date = db.Column(db.Date, nullable=False)
+    check_out_date = db.Column(db.Date, nullable=False)
+    booking_id = db.Column(db.Integer, db.ForeignKey('booking.id', ondelete='SET NULL'), nullable=True, index=True)
+    message = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"BookingRequest(Key: {self.idempotency_key}, Status: {self.status})"
+
+class RevokedToken(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    token_type = db.Column(db.String(10), nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"RevokedToken(JTI: {self.jti}, Type: {self.token_type})"
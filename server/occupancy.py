@@ -0,0 +1,253 @@
+import calendar
+from collections import Counter
+from datetime import date, timedelta
+from sqlalchemy import bindparam, delete, event, insert, inspect, select, text, update
+from facets import LOCATION_STATS_TABLE
+from models import db, Booking, PropertyOccupancy
+
+OCCUPANCY_TABLE = PropertyOccupancy.__table__
+MIN_YEAR, MAX_YEAR = 1900, 2999
+
+
+class InvalidPeriod(ValueError):
+    pass
+
+
+def parse_year(value):
+    if value in (None, ""):
+        return date.today().year
+    try:
+        year = int(value)
+    except (TypeError, ValueError):
+        raise InvalidPeriod("Invalid year, expected e.g. 2024")
+    if not MIN_YEAR <= year <= MAX_YEAR:
+        raise InvalidPeriod(f"year must be between {MIN_YEAR} and {MAX_YEAR}")
+    return year
+
+
+def parse_month(value):
+    if value in (None, ""):
+        return None
+    try:
+        month = int(value)
+    except (TypeError, ValueError):
+        raise InvalidPeriod("Invalid month, expected 1-12")
+    if not 1 <= month <= 12:
+        raise InvalidPeriod("Invalid month, expected 1-12")
+    return month
+
+
+def month_key(year, month):
+    return year * 100 + month
+
+
+def month_masks(start, end):
+    """Booked-night bitmaps of the stay [start, end) as {yyyymm: mask}."""
+    masks = {}
+    night = start
+    while night < end:
+        first_of_next = date(night.year, night.month, calendar.monthrange(night.year, night.month)[1]) + timedelta(days=1)
+        stop = min(end, first_of_next)
+        masks[month_key(night.year, night.month)] = ((1 << (stop - night).days) - 1) << (night.day - 1)
+        night = stop
+    return masks
+
+
+def month_bounds(key):
+    year, month = divmod(key, 100)
+    return date(year, month, 1), date(year, month, _days_in(year, month)) + timedelta(days=1)
+
+
+def mark_booked(connection, property_id, start, end):
+    table = OCCUPANCY_TABLE
+    for month, mask in month_masks(start, end).items():
+        where = (table.c.property_id == property_id, table.c.month == month)
+        result = connection.execute(update(table).where(*where).values(nights=table.c.nights.op("|")(mask)))
+        if not result.rowcount:
+            connection.execute(insert(table).values(property_id=property_id, month=month, nights=mask))
+
+
+def _recompute_months(connection, months):
+    """Rewrite the bitmaps of ``{property_id: {yyyymm, ...}}`` from the bookings left.
+
+    Stays booked before the overlap check existed can overlap, so a night
+    stays set while any remaining booking covers it instead of being
+    cleared with the stay that was removed.
+    """
+    property_ids = list(months)
+    bitmaps = Counter()
+    for offset in range(0, len(property_ids), 500):
+        chunk = property_ids[offset:offset + 500]
+        keys = [key for property_id in chunk for key in months[property_id]]
+        window_start, window_end = month_bounds(min(keys))[0], month_bounds(max(keys))[1]
+        remaining = connection.execute(
+            select(Booking.property_id, Booking.check_in_date, Booking.check_out_date).where(
+                Booking.property_id.in_(chunk),
+                Booking.check_in_date < window_end,
+                Booking.check_out_date > window_start,
+            )
+        )
+        for property_id, check_in, check_out in remaining:
+            for month, mask in month_masks(check_in, check_out).items():
+                if month in months[property_id]:
+                    bitmaps[property_id, month] |= mask
+    rows = [
+        {"target_property": property_id, "target_month": month, "nights": bitmaps[property_id, month]}
+        for property_id, keys in months.items()
+        for month in keys
+    ]
+    if not rows:
+        return
+    table = OCCUPANCY_TABLE
+    where = (table.c.property_id == bindparam("target_property"), table.c.month == bindparam("target_month"))
+    connection.execute(update(table).where(*where).values(nights=bindparam("nights")), rows)
+    connection.execute(delete(table).where(*where, table.c.nights == 0), rows)
+
+
+def mark_free(connection, property_id, start, end):
+    _recompute_months(connection, {property_id: set(month_masks(start, end))})
+
+
+def release_bookings(stays):
+    """Update the bitmaps after many ``(property_id, check_in, check_out)`` stays were deleted.
+
+    For set-based booking deletes that bypass the ORM events below; call it
+    once the bookings are gone. The affected months are recomputed with
+    one query per 500 properties and one executemany UPDATE.
+    """
+    months = {}
+    for property_id, start, end in stays:
+        months.setdefault(property_id, set()).update(month_masks(start, end))
+    if months:
+        _recompute_months(db.session.connection(), months)
+
+
+# The bitmaps are written in the same flush as the booking rows, so every
+# path that adds or removes bookings through the session (create_booking,
+# the booking queue, delete_booking) keeps them current, and a rolled back
+# booking rolls its bits back too.
+# Bulk SQL on the booking table bypasses this; use rebuild_occupancy.
+
+@event.listens_for(Booking, "after_insert")
+def _booking_inserted(mapper, connection, booking):
+    mark_booked(connection, booking.property_id, booking.check_in_date, booking.check_out_date)
+
+
+@event.listens_for(Booking, "after_delete")
+def _booking_deleted(mapper, connection, booking):
+    mark_free(connection, booking.property_id, booking.check_in_date, booking.check_out_date)
+
+
+@event.listens_for(Booking, "after_update")
+def _booking_updated(mapper, connection, booking):
+    state = inspect(booking)
+    fields = ("property_id", "check_in_date", "check_out_date")
+    histories = [state.attrs[field].history for field in fields]
+    if not any(history.deleted for history in histories):
+        return
+    old = [history.deleted[0] if history.deleted else getattr(booking, field) for field, history in zip(fields, histories)]
+    mark_free(connection, *old)
+    mark_booked(connection, booking.property_id, booking.check_in_date, booking.check_out_date)
+
+
+def rebuild_occupancy(property_ids=None):
+    """Recompute the bitmaps from the booking table, for all properties or only ``property_ids``."""
+    bookings = db.session.query(Booking.property_id, Booking.check_in_date, Booking.check_out_date)
+    stale = delete(PropertyOccupancy)
+    if property_ids is not None:
+        bookings = bookings.filter(Booking.property_id.in_(property_ids))
+        stale = stale.where(PropertyOccupancy.property_id.in_(property_ids))
+    db.session.execute(stale)
+
+    bitmaps = Counter()
+    for property_id, check_in, check_out in bookings.yield_per(5000):
+        for month, mask in month_masks(check_in, check_out).items():
+            bitmaps[property_id, month] |= mask
+    if bitmaps:
+        db.session.execute(
+            insert(PropertyOccupancy),
+            [{"property_id": key[0], "month": key[1], "nights": nights} for key, nights in bitmaps.items()],
+        )
+    db.session.commit()
+    return len(bitmaps)
+
+
+def _days_in(year, month):
+    return calendar.monthrange(year, month)[1]
+
+
+def property_calendar(property_id, year):
+    """Booked nights of one property per month of ``year``; at most 12 rows read."""
+    rows = dict(
+        db.session.query(PropertyOccupancy.month, PropertyOccupancy.nights).filter(
+            PropertyOccupancy.property_id == property_id,
+            PropertyOccupancy.month.between(month_key(year, 1), month_key(year, 12)),
+        )
+    )
+    months = []
+    for month in range(1, 13):
+        nights = rows.get(month_key(year, month), 0)
+        days = _days_in(year, month)
+        months.append(
+            {
+                "month": month,
+                "days": days,
+                "booked_nights": nights.bit_count(),
+                "booked_days": [day for day in range(1, days + 1) if nights >> (day - 1) & 1],
+            }
+        )
+    booked = sum(month["booked_nights"] for month in months)
+    days = sum(month["days"] for month in months)
+    return {
+        "property_id": property_id,
+        "year": year,
+        "booked_nights": booked,
+        "occupancy_rate": round(booked / days, 4),
+        "months": months,
+    }
+
+
+def occupancy_report(year, month=None, top=10):
+    """Occupancy across all properties for a year (or one month of it).
+
+    Counts booked nights with popcounts over the bitmaps; the number of
+    listed properties comes from the facet summary table. Every current
+    property counts as available for the whole period.
+    """
+    months = [month] if month else list(range(1, 13))
+    rows = db.session.query(PropertyOccupancy.property_id, PropertyOccupancy.month, PropertyOccupancy.nights).filter(
+        PropertyOccupancy.month.between(month_key(year, months[0]), month_key(year, months[-1]))
+    )
+    by_month = Counter()
+    by_property = Counter()
+    for property_id, key, nights in rows:
+        booked = nights.bit_count()
+        by_month[key % 100] += booked
+        by_property[property_id] += booked
+
+    properties = db.session.execute(text(f"SELECT COALESCE(SUM(count), 0) FROM {LOCATION_STATS_TABLE}")).scalar()
+    days = sum(_days_in(year, m) for m in months)
+
+    def rate(booked, nights):
+        return round(booked / nights, 4) if nights else 0.0
+
+    return {
+        "year": year,
+        "month": month,
+        "properties": properties,
+        "available_nights": properties * days,
+        "booked_nights": sum(by_month.values()),
+        "occupancy_rate": rate(sum(by_month.values()), properties * days),
+        "months": [
+            {
+                "month": m,
+                "booked_nights": by_month[m],
+                "occupancy_rate": rate(by_month[m], properties * _days_in(year, m)),
+            }
+            for m in months
+        ],
+        "busiest_properties": [
+            {"property_id": property_id, "booked_nights": booked, "occupancy_rate": rate(booked, days)}
+            for property_id, booked in by_property.most_common(top)
+        ],
+    }
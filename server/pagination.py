@@ -0,0 +1,49 @@
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 12
+MAX_PAGE_SIZE = 100
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE, name="limit"):
+    if value is None or value == "":
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise PaginationError(f"{name} must be an integer")
+    if limit < 1:
+        raise PaginationError(f"{name} must be at least 1")
+    return min(limit, maximum)
+
+
+def encode_cursor(*values):
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, types):
+    """Decode a cursor into values of ``types``, one type per sort key.
+
+    An int is also accepted where a float is expected (JSON does not keep
+    ``1.0`` apart from ``1``), and booleans never count as numbers.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        raise PaginationError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise PaginationError("Invalid cursor")
+    for value, expected in zip(values, types):
+        if expected is float:
+            expected = (int, float)
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise PaginationError("Invalid cursor")
+    return values
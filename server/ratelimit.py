@@ -0,0 +1,213 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import decode_token
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class RateLimitError(ValueError):
+    pass
+
+
+def parse_rate(value):
+    """Parse ``"<count>/<period>"`` (e.g. ``"5/minute"``) into (rate, burst).
+
+    The bucket holds ``count`` tokens and refills at ``count / period`` per
+    second, so a client may burst the whole allowance and then continues at
+    the average rate.
+    """
+    count, _, period = value.partition("/")
+    period = period.strip()
+    try:
+        count = int(count)
+        seconds = int(period) if period.isdigit() else PERIODS[period.rstrip("s")]
+    except (ValueError, KeyError):
+        raise RateLimitError(f"Invalid rate {value!r}, expected e.g. '10/second' or '100/minute'")
+    if count < 1 or seconds < 1:
+        raise RateLimitError(f"Invalid rate {value!r}")
+    return count / seconds, count
+
+
+class MemoryBuckets:
+    """Token buckets of one process, dropping the least recently used keys."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, now=None):
+        """Take a token; returns 0 when allowed, else seconds until one is free."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(burst), now]
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate
+
+
+class SqliteBuckets:
+    """Token buckets in a local SQLite file shared by every worker process.
+
+    One UPSERT per check refills and takes a token atomically; it only
+    returns a row when a token was available. The file holds throwaway state,
+    so it skips fsyncs entirely.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL) "
+            "WITHOUT ROWID"
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None or getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def take(self, key, rate, burst, now=None):
+        # Wall-clock time, the only clock all processes share.
+        now = time.time() if now is None else now
+        connection = self._connection()
+        row = connection.execute(
+            "INSERT INTO bucket (key, tokens, updated) VALUES (:key, :burst - 1, :now) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "tokens = MIN(:burst, tokens + (:now - updated) * :rate) - 1, updated = :now "
+            "WHERE MIN(:burst, tokens + (:now - updated) * :rate) >= 1 "
+            "RETURNING tokens",
+            {"key": key, "burst": burst, "rate": rate, "now": now},
+        ).fetchone()
+        if row is not None:
+            return 0.0
+        tokens, updated = connection.execute("SELECT tokens, updated FROM bucket WHERE key = ?", (key,)).fetchone()
+        tokens = min(burst, tokens + (now - updated) * rate)
+        return max(0.0, (1 - tokens) / rate)
+
+    def clear(self):
+        self._connection().execute("DELETE FROM bucket")
+
+
+class RateLimiter:
+    """Per-route, per-client token buckets plus per-route concurrency caps.
+
+    Clients are identified by their JWT identity when they send a valid
+    token, otherwise by IP address. ``RATE_LIMITS`` maps endpoint names to
+    rates (``"5/minute"``); other endpoints use ``RATE_LIMIT_DEFAULT``
+    (unlimited when empty). ``RATE_LIMIT_BACKEND`` "memory" gives each
+    process its own buckets; "sqlite" shares them between all workers on the
+    host through ``RATE_LIMIT_SQLITE_PATH``. ``CONCURRENCY_LIMITS`` caps
+    requests in flight per endpoint and process. Rejections are 429 with
+    ``Retry-After``.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.backend = None
+        self.default = None
+        self.rules = {}
+        self._slots = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RATE_LIMIT_ENABLED", False)
+        app.config.setdefault("RATE_LIMIT_BACKEND", "memory")
+        app.config.setdefault("RATE_LIMIT_SQLITE_PATH", None)
+        app.config.setdefault("RATE_LIMIT_DEFAULT", "")
+        app.config.setdefault("RATE_LIMITS", {})
+        app.config.setdefault("CONCURRENCY_LIMITS", {})
+        app.extensions["rate_limiter"] = self
+
+        self.enabled = app.config["RATE_LIMIT_ENABLED"]
+        if not self.enabled:
+            return
+        backend = app.config["RATE_LIMIT_BACKEND"]
+        if backend == "memory":
+            self.backend = MemoryBuckets()
+        elif backend == "sqlite":
+            os.makedirs(app.instance_path, exist_ok=True)
+            self.backend = SqliteBuckets(
+                app.config["RATE_LIMIT_SQLITE_PATH"] or os.path.join(app.instance_path, "ratelimit.db")
+            )
+        else:
+            raise ValueError(f"Unknown RATE_LIMIT_BACKEND {backend!r}")
+
+        self.default = parse_rate(app.config["RATE_LIMIT_DEFAULT"]) if app.config["RATE_LIMIT_DEFAULT"] else None
+        self.rules = {endpoint: parse_rate(rate) for endpoint, rate in app.config["RATE_LIMITS"].items()}
+        self._slots = {
+            endpoint: threading.BoundedSemaphore(int(limit)) for endpoint, limit in app.config["CONCURRENCY_LIMITS"].items()
+        }
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    def client_key(self):
+        # Only the token's subject is needed here, so skip the full
+        # verify_jwt_in_request (user lookup, revocation check); decoding goes
+        # through the JWT manager's token cache. Invalid tokens fall back to
+        # the IP and are rejected by the route itself if it needs one.
+        identity = None
+        header = request.headers.get(current_app.config["JWT_HEADER_NAME"], "")
+        prefix = f"{current_app.config['JWT_HEADER_TYPE']} "
+        if header.startswith(prefix):
+            try:
+                identity = decode_token(header[len(prefix):])["sub"]
+            except Exception:
+                identity = None
+        return f"user:{identity}" if identity is not None else f"ip:{request.remote_addr}"
+
+    def check(self, endpoint, client):
+        """Seconds the client has to wait before calling ``endpoint``; 0 if allowed."""
+        rule = self.rules.get(endpoint, self.default)
+        if rule is None:
+            return 0.0
+        rate, burst = rule
+        return self.backend.take(f"{endpoint}|{client}", rate, burst)
+
+    def _before_request(self):
+        endpoint = request.endpoint
+        if endpoint is None or request.method == "OPTIONS":
+            return None
+
+        wait = self.check(endpoint, self.client_key())
+        if wait > 0:
+            return _too_many(f"Rate limit exceeded, retry in {math.ceil(wait)} seconds", wait)
+
+        slots = self._slots.get(endpoint)
+        if slots is not None:
+            if not slots.acquire(blocking=False):
+                return _too_many("Too many concurrent requests for this endpoint, retry shortly", 1)
+            g._concurrency_slot = slots
+        return None
+
+    def _teardown_request(self, exc):
+        slots = g.pop("_concurrency_slot", None)
+        if slots is not None:
+            slots.release()
+
+
+def _too_many(message, retry_after):
+    response = jsonify({"error": True, "message": message})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
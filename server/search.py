@@ -0,0 +1,63 @@
+import re
+from sqlalchemy import column, select, table, text
+from models import db, Property
+
+FTS_TABLE = "property_fts"
+
+# Column weights for bm25(): a hit in the title counts most, then location.
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+LOCATION_WEIGHT = 5.0
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def is_search_table(name):
+    # FTS5 keeps its index in <table>_data, _idx, _docsize and _config shadow
+    # tables; none of them are ORM models, so autogenerate must skip them.
+    return name == FTS_TABLE or name.startswith(FTS_TABLE + "_")
+
+
+def match_expression(query):
+    """Turn free text into a safe FTS5 MATCH expression.
+
+    Every word is quoted so user input can never be parsed as FTS5 syntax,
+    and the last word matches as a prefix to support search-as-you-type.
+    """
+    tokens = _TOKEN_RE.findall(query or "")
+    if not tokens:
+        return None
+    terms = ['"%s"' % token for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_properties(query, columns, limit, offset):
+    """Rank properties matching ``query``, selecting ``columns`` (schema columns)."""
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    fts = table(FTS_TABLE, column("rowid"))
+    statement = (
+        select(*columns)
+        .select_from(fts)
+        .join(Property, Property.id == fts.c.rowid)
+        .where(text(f"{FTS_TABLE} MATCH :expression"))
+        .order_by(text(f"bm25({FTS_TABLE}, :title_weight, :description_weight, :location_weight)"), Property.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return db.session.execute(
+        statement,
+        {
+            "expression": expression,
+            "title_weight": TITLE_WEIGHT,
+            "description_weight": DESCRIPTION_WEIGHT,
+            "location_weight": LOCATION_WEIGHT,
+        },
+    ).all()
+
+
+def rebuild_index():
+    db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    db.session.commit()
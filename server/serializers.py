@@ -0,0 +1,171 @@
+from functools import lru_cache
+from flask.json.provider import DefaultJSONProvider
+from models import User, Property, Booking
+from images import thumbnail_url, thumbnail_srcset
+
+
+class FieldSelectionError(ValueError):
+    pass
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+class Field:
+    def __init__(self, column, format=None):
+        self.column = column
+        self.format = format
+
+
+class Schema:
+    """Declarative field list for one model, compiled into fast serializers.
+
+    Queries select exactly the columns of the requested fields (plus any
+    ``extra`` columns a route needs internally) with ``with_entities``, and
+    the compiled serializer turns each result row into a dict by position.
+    """
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+    def parse_fields(self, value, default):
+        """Validate a ``?fields=a,b`` value, falling back to ``default``."""
+        if not value:
+            return tuple(default)
+        names = tuple(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise FieldSelectionError(
+                f"Unknown {self.name} field(s): {', '.join(unknown) or value}; "
+                f"expected any of {', '.join(self.fields)}"
+            )
+        return names
+
+    def columns(self, names, extra=()):
+        """Labelled columns for ``names`` followed by ``extra`` columns.
+
+        The selected fields always come first so the serializer can read
+        them by position; extras are addressable by attribute on the row.
+        """
+        columns = [self.fields[name].column.label(name) for name in names]
+        labels = set(names)
+        for column in extra:
+            if column.key not in labels:
+                columns.append(column)
+                labels.add(column.key)
+        return columns
+
+    def serializer(self, names):
+        return _compile(self, tuple(names))
+
+    def dump(self, obj, names):
+        """Serialize an already loaded ORM object (for freshly written rows)."""
+        values = []
+        for name in names:
+            field = self.fields[name]
+            value = getattr(obj, field.column.key)
+            values.append(field.format(value) if field.format else value)
+        return dict(zip(names, values))
+
+
+@lru_cache(maxsize=None)
+def _compile(schema, names):
+    # Generate a dict display per field list; it avoids a per-field loop and
+    # attribute lookups on every row.
+    namespace = {}
+    items = []
+    for index, name in enumerate(names):
+        format = schema.fields[name].format
+        if format is None:
+            items.append(f"{name!r}: row[{index}]")
+        else:
+            namespace[f"format_{index}"] = format
+            items.append(f"{name!r}: format_{index}(row[{index}])")
+    source = f"def serialize(row):\n    return {{{', '.join(items)}}}\n"
+    exec(compile(source, f"<{schema.name} serializer>", "exec"), namespace)
+    return namespace["serialize"]
+
+
+USER_SCHEMA = Schema(
+    "user",
+    {
+        "id": Field(User.id),
+        "username": Field(User.username),
+        "email": Field(User.email),
+    },
+)
+
+PROPERTY_SCHEMA = Schema(
+    "property",
+    {
+        "id": Field(Property.id),
+        "title": Field(Property.title),
+        "description": Field(Property.description),
+        "price": Field(Property.price),
+        "bedrooms": Field(Property.bedrooms),
+        "bathrooms": Field(Property.bathrooms),
+        "location": Field(Property.location),
+        "image_link": Field(Property.image_link),
+        "thumbnail_link": Field(Property.image_digest, thumbnail_url),
+        "image_srcset": Field(Property.image_digest, thumbnail_srcset),
+        "latitude": Field(Property.latitude),
+        "longitude": Field(Property.longitude),
+    },
+)
+
+BOOKING_SCHEMA = Schema(
+    "booking",
+    {
+        "id": Field(Booking.id),
+        "user_id": Field(Booking.user_id),
+        "property_id": Field(Booking.property_id),
+        "check_in_date": Field(Booking.check_in_date, _isoformat),
+        "check_out_date": Field(Booking.check_out_date, _isoformat),
+        # Needs the property joined into the query.
+        "property_image_link": Field(Property.image_link),
+        "property_thumbnail_link": Field(Property.image_digest, thumbnail_url),
+    },
+)
+
+USER_LIST_FIELDS = ("username", "email")
+PROPERTY_LIST_FIELDS = ("id", "title", "price", "location", "image_link", "thumbnail_link", "image_srcset")
+PROPERTY_DETAIL_FIELDS = ("title", "description", "price", "bedrooms", "bathrooms", "location", "image_link")
+BOOKING_FIELDS = (
+    "id", "user_id", "property_id", "check_in_date", "check_out_date", "property_image_link", "property_thumbnail_link",
+)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, several times faster on large lists."""
+
+    def __init__(self, app):
+        super().__init__(app)
+        import orjson
+
+        self._orjson = orjson
+
+    def dumps(self, obj, **kwargs):
+        return self._orjson.dumps(obj, default=self.default, option=self._orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return self._orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self._orjson.dumps(obj, default=self.default, option=self._orjson.OPT_NON_STR_KEYS)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def configure_json(app):
+    """Install the JSON backend chosen by ``JSON_BACKEND`` (auto, orjson, std)."""
+    app.config.setdefault("JSON_BACKEND", "auto")
+    backend = app.config["JSON_BACKEND"]
+    if backend == "std":
+        return
+    try:
+        app.json = OrjsonProvider(app)
+    except ImportError:
+        if backend == "orjson":
+            raise RuntimeError("JSON_BACKEND=orjson requires the orjson package")
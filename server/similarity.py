@@ -0,0 +1,458 @@
+import fcntl
+import importlib.util
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from loader import QUERY_CHUNK_SIZE
+from models import db, Property
+
+logger = logging.getLogger("real_estate.similarity")
+
+DEFAULT_K = 10
+
+# Relative weight of each feature block in the final (unit length) vector.
+TEXT_WEIGHT = 1.0
+LOCATION_WEIGHT = 0.6
+NUMERIC_WEIGHT = 0.8
+NUMERIC_FEATURES = ("log_price", "bedrooms", "bathrooms")
+
+_WORD_RE = re.compile(r"[a-z]{3,}")
+STOP_WORDS = frozenset(
+    "the and for with this that from are was were has have had not but all any can our your you its into out over "
+    "more most very will would there their they them then than also such been being each other some these those "
+    "which what when where who how about after before under above between both only own same just".split()
+)
+
+FeatureRow = namedtuple("FeatureRow", "id version description location price bedrooms bathrooms")
+_FEATURE_COLUMNS = (
+    Property.id, Property.version, Property.description, Property.location,
+    Property.price, Property.bedrooms, Property.bathrooms,
+)
+
+
+def _load_numpy():
+    import numpy
+
+    return numpy
+
+
+def description_terms(text):
+    return [word for word in _WORD_RE.findall((text or "").lower()) if word not in STOP_WORDS]
+
+
+def location_city(location):
+    # Locations are "<street>, <city>"; the city is what listings share.
+    return (location or "").rsplit(",", 1)[-1].strip().lower()
+
+
+class FeatureModel:
+    """Turns property rows into unit-length float32 vectors.
+
+    Blocks: TF-IDF over the description vocabulary, a one-hot city and the
+    z-scored log price, bedrooms and bathrooms. The vocabulary, IDF weights
+    and numeric scaling are fitted on a full build and then kept fixed, so
+    vectors of changed properties can be recomputed one at a time.
+    """
+
+    def __init__(self, terms, idf, cities, mean, std):
+        np = _load_numpy()
+        self.terms = list(terms)
+        self.cities = list(cities)
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.std = np.asarray(std, dtype=np.float32)
+        self._term_index = {term: index for index, term in enumerate(self.terms)}
+        self._city_index = {city: len(self.terms) + index for index, city in enumerate(self.cities)}
+        self.dimensions = len(self.terms) + len(self.cities) + len(NUMERIC_FEATURES)
+
+    @classmethod
+    def fit(cls, rows, max_terms, max_cities):
+        np = _load_numpy()
+        document_frequency = Counter()
+        cities = Counter()
+        for row in rows:
+            document_frequency.update(set(description_terms(row.description)))
+            cities[location_city(row.location)] += 1
+        count = len(rows)
+        # Terms in a single listing cannot relate two listings, and terms in
+        # most of them do not tell them apart.
+        candidates = [
+            (frequency, term) for term, frequency in document_frequency.items()
+            if 2 <= frequency <= max(2, count // 2)
+        ]
+        terms = [term for _, term in sorted(candidates, key=lambda item: (-item[0], item[1]))[:max_terms]]
+        idf = [math.log((1 + count) / (1 + document_frequency[term])) + 1 for term in terms]
+        numeric = cls._numeric(np, rows)
+        std = numeric.std(axis=0) if count else np.ones(len(NUMERIC_FEATURES))
+        return cls(
+            terms,
+            idf,
+            [city for city, _ in cities.most_common(max_cities) if city],
+            numeric.mean(axis=0) if count else np.zeros(len(NUMERIC_FEATURES)),
+            np.where(std > 0, std, 1.0),
+        )
+
+    @staticmethod
+    def _numeric(np, rows):
+        return np.array(
+            [[math.log1p(max(row.price or 0, 0)), row.bedrooms or 0, row.bathrooms or 0] for row in rows],
+            dtype=np.float32,
+        ).reshape(len(rows), len(NUMERIC_FEATURES))
+
+    def transform(self, rows):
+        np = _load_numpy()
+        vectors = np.zeros((len(rows), self.dimensions), dtype=np.float32)
+        text_end = len(self.terms)
+        city_end = text_end + len(self.cities)
+        for position, row in enumerate(rows):
+            counts = Counter(term for term in description_terms(row.description) if term in self._term_index)
+            for term, frequency in counts.items():
+                vectors[position, self._term_index[term]] = 1 + math.log(frequency)
+            city = self._city_index.get(location_city(row.location))
+            if city is not None:
+                vectors[position, city] = LOCATION_WEIGHT
+
+        text = vectors[:, :text_end]
+        text *= self.idf
+        norms = np.linalg.norm(text, axis=1, keepdims=True)
+        np.divide(text, norms, out=text, where=norms > 0)
+        text *= TEXT_WEIGHT
+
+        numeric = (self._numeric(np, rows) - self.mean) / self.std
+        vectors[:, city_end:] = np.clip(numeric, -3, 3) * (NUMERIC_WEIGHT / (3 * math.sqrt(len(NUMERIC_FEATURES))))
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def to_dict(self):
+        return {
+            "terms": self.terms,
+            "idf": self.idf.tolist(),
+            "cities": self.cities,
+            "mean": self.mean.tolist(),
+            "std": self.std.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["terms"], data["idf"], data["cities"], data["mean"], data["std"])
+
+
+_Snapshot = namedtuple("_Snapshot", "generation model ids versions vectors")
+
+
+class SimilarityIndex:
+    """Precomputed property vectors for "similar listings" lookups.
+
+    The index lives in ``SIMILAR_INDEX_DIR`` as one directory per build
+    generation holding ``vectors.npy`` (one unit-length row per property),
+    ``ids.npy``, ``versions.npy`` and the fitted ``model.json``; ``CURRENT``
+    names the live generation. Every process memory-maps the arrays read
+    only, so a query is one matrix-vector product over shared pages.
+
+    ``build`` refits the model on all properties. ``sync`` compares property
+    versions with the indexed ones and rewrites only the rows of changed,
+    new and deleted properties in place; property writes schedule it on a
+    background thread. Writers in different processes take a file lock.
+    ``SIMILAR_PROPERTIES`` is "auto" (on when NumPy is installed), "on" or
+    "off".
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.directory = None
+        self.max_terms = 512
+        self.max_cities = 64
+        self.sync_delay = 1.0
+        self._app = None
+        self._snapshot = None
+        self._current_stamp = None
+        self._write_lock = threading.Lock()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._pending = threading.Event()
+        self._pending_ids = set()
+        self._pending_all = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SIMILAR_PROPERTIES", "auto")
+        app.config.setdefault("SIMILAR_INDEX_DIR", None)
+        app.config.setdefault("SIMILAR_MAX_TERMS", 512)
+        app.config.setdefault("SIMILAR_MAX_CITIES", 64)
+        app.config.setdefault("SIMILAR_MAX_K", 50)
+        app.config.setdefault("SIMILAR_SYNC_DELAY_MS", 1000)
+        app.extensions["similarity_index"] = self
+
+        mode = app.config["SIMILAR_PROPERTIES"]
+        if mode not in ("auto", "on", "off"):
+            raise ValueError(f"Unknown SIMILAR_PROPERTIES {mode!r}")
+        self.enabled = False
+        if mode != "off":
+            # Only look for NumPy here; importing it is left to the first query.
+            if importlib.util.find_spec("numpy") is not None:
+                self.enabled = True
+            elif mode == "on":
+                raise RuntimeError("SIMILAR_PROPERTIES=on requires the numpy package")
+
+        self.directory = app.config["SIMILAR_INDEX_DIR"] or os.path.join(app.instance_path, "similarity")
+        self.max_terms = app.config["SIMILAR_MAX_TERMS"]
+        self.max_cities = app.config["SIMILAR_MAX_CITIES"]
+        self.sync_delay = app.config["SIMILAR_SYNC_DELAY_MS"] / 1000
+        self._app = app
+
+    # Reading
+
+    def _current_path(self):
+        return os.path.join(self.directory, "CURRENT")
+
+    def snapshot(self):
+        """The live generation, reopened when another process published a new one."""
+        np = _load_numpy()
+        try:
+            stat = os.stat(self._current_path())
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if self._snapshot is None or stamp != self._current_stamp:
+            with open(self._current_path()) as current:
+                generation = current.read().strip()
+            path = os.path.join(self.directory, generation)
+            with open(os.path.join(path, "model.json")) as model:
+                model = FeatureModel.from_dict(json.load(model))
+            self._snapshot = _Snapshot(
+                generation,
+                model,
+                np.load(os.path.join(path, "ids.npy"), mmap_mode="r"),
+                np.load(os.path.join(path, "versions.npy"), mmap_mode="r"),
+                np.load(os.path.join(path, "vectors.npy"), mmap_mode="r"),
+            )
+            self._current_stamp = stamp
+        return self._snapshot
+
+    def similar(self, property_id, k=DEFAULT_K):
+        """``[(property_id, score), ...]`` of the ``k`` most similar properties.
+
+        Returns None while no index has been built. A property that is not
+        indexed yet is vectorized on the fly with the current model.
+        """
+        np = _load_numpy()
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+        # Rows can be rewritten by a sync while they are scored. A writer
+        # clears a row's id first and sets it again only after the vector
+        # and a new version are in place, so a row is trusted only if its id
+        # and version were the same before and after scoring.
+        ids = np.array(snapshot.ids)
+        versions = np.array(snapshot.versions)
+        vectors = np.asarray(snapshot.vectors)
+        rows = np.flatnonzero(ids == property_id)
+        query = None
+        if rows.size:
+            row = rows[0]
+            query = vectors[row].copy()
+            if snapshot.ids[row] != property_id or snapshot.versions[row] != versions[row]:
+                query = None
+        if query is None:
+            found = _feature_rows([property_id])
+            if not found:
+                return []
+            query = snapshot.model.transform(found)[0]
+
+        scores = vectors @ query
+        unstable = (np.asarray(snapshot.ids) != ids) | (np.asarray(snapshot.versions) != versions)
+        scores[(ids < 0) | (ids == property_id) | unstable] = -np.inf
+        k = min(k, int(np.count_nonzero(np.isfinite(scores))))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(ids[row]), float(scores[row])) for row in top]
+
+    # Writing
+
+    @contextmanager
+    def _writer(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with self._write_lock, open(os.path.join(self.directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def build(self):
+        """Refit the model on every property and publish a fresh generation."""
+        with self._writer():
+            rows = _feature_rows()
+            model = FeatureModel.fit(rows, self.max_terms, self.max_cities)
+            generation = self._create_generation(model, _capacity(len(rows)))
+            ids, versions, vectors = self._open_generation(generation)
+            for start in range(0, len(rows), 5000):
+                chunk = rows[start:start + 5000]
+                vectors[start:start + len(chunk)] = model.transform(chunk)
+                versions[start:start + len(chunk)] = [row.version for row in chunk]
+                ids[start:start + len(chunk)] = [row.id for row in chunk]
+            for array in (vectors, versions, ids):
+                array.flush()
+            self._publish(generation)
+        return len(rows)
+
+    def sync(self, property_ids=None):
+        """Re-vectorize properties whose version changed since they were indexed.
+
+        Only ``property_ids`` are looked at when given (the ones a write
+        touched); otherwise every property is compared with the index.
+        Returns the number of rows written, or builds the index if there is none.
+        """
+        np = _load_numpy()
+        if self.snapshot() is None:
+            return self.build()
+        with self._writer():
+            snapshot = self.snapshot()
+            ids, versions, vectors = self._open_generation(snapshot.generation)
+            if property_ids is None:
+                indexed_rows = np.flatnonzero(ids >= 0)
+                current = dict(db.session.query(Property.id, Property.version))
+            else:
+                property_ids = sorted(set(property_ids))
+                indexed_rows = np.flatnonzero(np.isin(ids, property_ids))
+                current = {}
+                for start in range(0, len(property_ids), QUERY_CHUNK_SIZE):
+                    chunk = property_ids[start:start + QUERY_CHUNK_SIZE]
+                    current.update(
+                        db.session.query(Property.id, Property.version).filter(Property.id.in_(chunk))
+                    )
+            indexed = dict(zip(ids[indexed_rows].tolist(), indexed_rows.tolist()))
+
+            removed = [indexed[property_id] for property_id in indexed if property_id not in current]
+            changed = [
+                property_id for property_id, version in current.items()
+                if property_id not in indexed or versions[indexed[property_id]] != version
+            ]
+            if not removed and not changed:
+                return 0
+
+            # Readers skip rows whose id is -1, so clear the id before the vector.
+            ids[removed] = -1
+            vectors[removed] = 0
+            free = np.flatnonzero(ids < 0)
+            needed = sum(1 for property_id in changed if property_id not in indexed)
+            if needed > len(free):
+                generation = self._grow(snapshot, ids, versions, vectors, int(np.count_nonzero(ids >= 0)) + needed)
+                ids, versions, vectors = self._open_generation(generation)
+                free = np.flatnonzero(ids < 0)
+            else:
+                generation = None
+
+            free = iter(free.tolist())
+            for start in range(0, len(changed), QUERY_CHUNK_SIZE):
+                rows = _feature_rows(changed[start:start + QUERY_CHUNK_SIZE])
+                positions = [indexed[row.id] if row.id in indexed else next(free) for row in rows]
+                if rows:
+                    # Same order as similar() expects: id cleared, then the
+                    # vector and version, then the id again.
+                    ids[positions] = -1
+                    vectors[positions] = snapshot.model.transform(rows)
+                    versions[positions] = [row.version for row in rows]
+                    ids[positions] = [row.id for row in rows]
+            for array in (vectors, versions, ids):
+                array.flush()
+            if generation is not None:
+                self._publish(generation)
+            return len(removed) + len(changed)
+
+    def schedule_sync(self, property_ids=None):
+        """Sync soon on a background thread; bursts of writes share one sync.
+
+        Pass the ids a write touched; without them (bulk imports) the next
+        sync compares every property with the index.
+        """
+        if not self.enabled:
+            return
+        with self._worker_lock:
+            if property_ids is None:
+                self._pending_all = True
+            else:
+                self._pending_ids.update(property_ids)
+            self._pending.set()
+            # Started on first use so it is never forked into server workers.
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="similarity-sync", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            self._pending.wait()
+            time.sleep(self.sync_delay)
+            with self._worker_lock:
+                self._pending.clear()
+                property_ids = None if self._pending_all else self._pending_ids
+                self._pending_ids = set()
+                self._pending_all = False
+            try:
+                with self._app.app_context():
+                    self.sync(property_ids)
+            except Exception:
+                logger.exception("Similarity index sync failed")
+
+    def _create_generation(self, model, capacity):
+        np = _load_numpy()
+        generation = f"{time.time_ns():x}"
+        path = os.path.join(self.directory, generation)
+        os.makedirs(path)
+        with open(os.path.join(path, "model.json"), "w") as target:
+            json.dump(model.to_dict(), target)
+        np.lib.format.open_memmap(os.path.join(path, "ids.npy"), "w+", np.int64, (capacity,))[:] = -1
+        np.lib.format.open_memmap(os.path.join(path, "versions.npy"), "w+", np.int64, (capacity,))
+        np.lib.format.open_memmap(os.path.join(path, "vectors.npy"), "w+", np.float32, (capacity, model.dimensions))
+        return generation
+
+    def _open_generation(self, generation):
+        np = _load_numpy()
+        path = os.path.join(self.directory, generation)
+        return tuple(np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r+") for name in ("ids", "versions", "vectors"))
+
+    def _grow(self, snapshot, ids, versions, vectors, rows):
+        generation = self._create_generation(snapshot.model, _capacity(rows))
+        new_ids, new_versions, new_vectors = self._open_generation(generation)
+        new_vectors[:len(ids)] = vectors
+        new_versions[:len(ids)] = versions
+        new_ids[:len(ids)] = ids
+        for array in (new_vectors, new_versions, new_ids):
+            array.flush()
+        return generation
+
+    def _publish(self, generation):
+        temporary = f"{self._current_path()}.{os.getpid()}.tmp"
+        with open(temporary, "w") as target:
+            target.write(generation)
+        os.replace(temporary, self._current_path())
+        # Processes still mapping an old generation keep reading it until
+        # they notice CURRENT changed; unlinked files stay valid until then.
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name != generation and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def _capacity(rows):
+    # Headroom so new listings usually fill free rows instead of a regrow.
+    return max(64, int(rows * 1.25))
+
+
+def _feature_rows(property_ids=None):
+    query = db.session.query(*_FEATURE_COLUMNS)
+    if property_ids is not None:
+        query = query.filter(Property.id.in_(property_ids))
+    return [FeatureRow(*row) for row in query.order_by(Property.id)]
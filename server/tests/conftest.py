@@ -0,0 +1,94 @@
+import threading
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import event
+from app import create_app
+from models import db, Booking, Property, User
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+            "JWT_SECRET_KEY": "test-secret-key-of-at-least-32-bytes",
+            "CACHE_BACKEND": "null",
+            "IMAGE_THUMBNAILS": "off",
+            "SIMILAR_PROPERTIES": "off",
+            "BCRYPT_LOG_ROUNDS": 4,
+        }
+    )
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class QueryCounter:
+    """Counts the SQL statements the engine executes while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _increment(self, *args):
+        with self._lock:
+            self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, "before_cursor_execute", self._increment)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._increment)
+
+
+@pytest.fixture
+def count_queries(app):
+    with app.app_context():
+        engine = db.engine
+    return lambda: QueryCounter(engine)
+
+
+@pytest.fixture
+def add_bookings(app):
+    """Returns ``add(count)``: books ``count`` more nights of one user at one property.
+
+    The user and property are created on the first call; returns their ids.
+    """
+    owner = {}
+
+    def add(count):
+        with app.app_context():
+            if not owner:
+                user = User(username="guest", email="guest@example.com", password="x")
+                home = Property(title="Home", price=100, bedrooms=2, bathrooms=1, location="Lisbon", image_link="/img/home.jpg")
+                db.session.add_all([user, home])
+                db.session.flush()
+                owner.update(user_id=user.id, property_id=home.id, nights=0)
+            first_night = date(2030, 1, 1) + timedelta(days=owner["nights"])
+            for i in range(count):
+                night = first_night + timedelta(days=i)
+                db.session.add(
+                    Booking(
+                        user_id=owner["user_id"],
+                        property_id=owner["property_id"],
+                        check_in_date=night,
+                        check_out_date=night + timedelta(days=1),
+                    )
+                )
+            owner["nights"] += count
+            db.session.commit()
+        return owner["user_id"], owner["property_id"]
+
+    return add
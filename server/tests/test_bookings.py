@@ -0,0 +1,80 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from models import Booking
+
+# Each listing must read its bookings and their properties with a fixed
+# number of statements, however many bookings there are.
+ROUTES = {
+    "all": lambda user_id, property_id: "/get_all_bookings",
+    "user": lambda user_id, property_id: f"/users/{user_id}/bookings?limit=100",
+    "property": lambda user_id, property_id: f"/properties/{property_id}/bookings?limit=100",
+}
+
+
+def _get(client, count_queries, path):
+    with count_queries() as counter:
+        response = client.get(path)
+    assert response.status_code == 200, response.get_json()
+    return counter.count, response.get_json()["bookings"]
+
+
+@pytest.mark.parametrize("route", ROUTES.values(), ids=ROUTES.keys())
+def test_booking_listing_query_count_is_constant(client, count_queries, add_bookings, route):
+    path = route(*add_bookings(1))
+    single, bookings = _get(client, count_queries, path)
+    assert len(bookings) == 1
+
+    add_bookings(40)
+    many, bookings = _get(client, count_queries, path)
+    assert len(bookings) == 41
+    assert many == single
+
+
+def test_booking_listing_includes_property_image(client, add_bookings):
+    user_id, _ = add_bookings(3)
+    bookings = client.get(f"/users/{user_id}/bookings").get_json()["bookings"]
+    assert [booking["property_image_link"] for booking in bookings] == ["/img/home.jpg"] * 3
+
+
+def _booking(user_id, property_id):
+    return {"user_id": user_id, "property_id": property_id, "check_in_date": "5th Jan 2031", "check_out_date": "7th Jan 2031"}
+
+
+def test_create_booking_requires_a_token(client, add_bookings):
+    user_id, property_id = add_bookings(0)
+    response = client.post("/create_booking", json=_booking(user_id, property_id))
+    assert response.status_code == 401
+
+
+def test_create_booking_books_as_the_token_user(app, client, add_bookings):
+    user_id, property_id = add_bookings(0)
+    with app.test_request_context():
+        token = create_access_token(identity=str(user_id))
+    response = client.post(
+        "/create_booking", json=_booking(99, property_id), headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 201, response.get_json()
+    assert response.get_json()["user_id"] == user_id
+
+
+def test_body_user_id_needs_the_flag_and_an_existing_user(app, client, add_bookings):
+    user_id, property_id = add_bookings(0)
+    app.config["BOOKING_BODY_USER_ID"] = True
+    assert client.post("/create_booking", json=_booking(99, property_id)).status_code == 400
+    response = client.post("/create_booking", json=_booking(user_id, property_id))
+    assert response.status_code == 201, response.get_json()
+
+
+@pytest.mark.parametrize("path", ["/delete_user/{user_id}", "/delete_property/{property_id}"])
+def test_deleting_an_owner_keeps_its_bookings(app, client, add_bookings, path):
+    user_id, property_id = add_bookings(2)
+    response = client.delete(path.format(user_id=user_id, property_id=property_id))
+    assert response.status_code == 200, response.get_json()
+    with app.app_context():
+        assert Booking.query.count() == 2
+
+
+def test_booking_request_status_is_404_while_the_queue_is_disabled(client):
+    response = client.get("/booking_requests/some-key")
+    assert response.status_code == 404
+    assert response.get_json()["message"] == "Queued bookings are disabled"
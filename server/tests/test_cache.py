@@ -0,0 +1,34 @@
+import sys
+import threading
+import pytest
+from cache import MemoryBackend, ResponseCache
+
+
+@pytest.fixture
+def frequent_thread_switches():
+    # Switch threads as often as possible to expose unguarded increments.
+    previous = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(previous)
+
+
+def test_hit_and_miss_counts_survive_concurrent_lookups(frequent_thread_switches):
+    cache = ResponseCache()
+    cache.backend = MemoryBackend()
+    cache.set("present", {"id": 1})
+
+    def lookups():
+        for _ in range(20000):
+            cache.get("present")
+            cache.get_many(["absent"])
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert cache.stats() == {"backend": "MemoryBackend", "hits": 160000, "misses": 160000, "hit_rate": 0.5}
+    cache.clear()
+    assert cache.stats()["hits"] == 0
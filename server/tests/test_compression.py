@@ -0,0 +1,21 @@
+import gzip
+import json
+
+
+def test_bodies_without_an_etag_are_compressed_once(app, client, add_bookings, monkeypatch):
+    add_bookings(20)
+    compression = app.extensions["compression"]
+    calls = []
+    compress = compression.compress
+    monkeypatch.setattr(compression, "compress", lambda data, encoding: calls.append(encoding) or compress(data, encoding))
+
+    responses = [client.get("/get_all_bookings", headers={"Accept-Encoding": "gzip"}) for _ in range(3)]
+    assert all(response.headers["Content-Encoding"] == "gzip" for response in responses)
+    assert "ETag" not in responses[0].headers
+    assert len(json.loads(gzip.decompress(responses[-1].data))["bookings"]) == 20
+    assert calls == ["gzip"]
+
+    add_bookings(1)
+    response = client.get("/get_all_bookings", headers={"Accept-Encoding": "gzip"})
+    assert len(json.loads(gzip.decompress(response.data))["bookings"]) == 21
+    assert calls == ["gzip", "gzip"]
@@ -0,0 +1,37 @@
+from datetime import date
+from models import db, Booking, User
+from occupancy import property_calendar
+from users import delete_users
+
+
+def _booked_nights(app, property_id, year=2030):
+    with app.app_context():
+        return {month["month"]: month["booked_nights"] for month in property_calendar(property_id, year)["months"]}
+
+
+def _overlapping_stay(app, property_id, username):
+    # Bookings made before the overlap check existed can share nights.
+    with app.app_context():
+        user = User(username=username, email=f"{username}@example.com", password="x")
+        db.session.add(user)
+        db.session.flush()
+        booking = Booking(user_id=user.id, property_id=property_id, check_in_date=date(2030, 1, 1), check_out_date=date(2030, 1, 3))
+        db.session.add(booking)
+        db.session.commit()
+        return user.id, booking.id
+
+
+def test_deleting_one_of_two_overlapping_stays_keeps_the_shared_nights(app, client, add_bookings):
+    _, property_id = add_bookings(2)
+    _, booking_id = _overlapping_stay(app, property_id, "early")
+    assert client.delete(f"/delete_booking/{booking_id}").status_code == 200
+    assert _booked_nights(app, property_id)[1] == 2
+
+
+def test_bulk_user_delete_keeps_nights_other_users_still_book(app, add_bookings):
+    _, property_id = add_bookings(2)
+    user_id, _ = _overlapping_stay(app, property_id, "early")
+    with app.app_context():
+        delete_users([user_id])
+        db.session.commit()
+    assert _booked_nights(app, property_id)[1] == 2
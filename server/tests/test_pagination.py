@@ -0,0 +1,45 @@
+import pytest
+from pagination import PaginationError, decode_cursor, encode_cursor, parse_limit
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(250000.0, 7), (float, int)) == [250000.0, 7]
+    assert decode_cursor(encode_cursor(250000, 7), (float, int)) == [250000, 7]
+    assert decode_cursor(encode_cursor("ann@example.com"), (str,)) == ["ann@example.com"]
+
+
+@pytest.mark.parametrize(
+    "values, types",
+    [
+        (["x", {}], (float, int)),
+        ([1.5, 2.5], (float, int)),
+        ([True], (int,)),
+        ([None], (int,)),
+        ([1], (str,)),
+        ([1, 2], (int,)),
+    ],
+)
+def test_cursor_with_wrong_types_is_rejected(values, types):
+    with pytest.raises(PaginationError):
+        decode_cursor(encode_cursor(*values), types)
+
+
+@pytest.mark.parametrize(
+    "path, query",
+    [
+        ("/get_all_properties", {"sort": "price_asc", "cursor": encode_cursor("x", {})}),
+        ("/users/1/bookings", {"cursor": encode_cursor("x")}),
+        ("/get_all_users", {"cursor": encode_cursor([1])}),
+        ("/get_all_users", {"email_prefix": "guest", "cursor": encode_cursor(1)}),
+    ],
+)
+def test_crafted_cursor_is_a_400(client, add_bookings, path, query):
+    add_bookings(1)
+    response = client.get(path, query_string=query)
+    assert response.status_code == 400, response.get_json()
+    assert response.get_json()["message"] == "Invalid cursor"
+
+
+def test_parse_limit_names_the_parameter():
+    with pytest.raises(PaginationError, match="^k must be an integer$"):
+        parse_limit("many", name="k")
@@ -0,0 +1,135 @@
+from collections import defaultdict
+from sqlalchemy import bindparam, delete, select, update
+from models import db, User, Booking, BookingRequest
+from occupancy import release_bookings
+
+# Columns that can be searched by prefix; each has a unique index.
+PREFIX_COLUMNS = {"username": User.username, "email": User.email}
+BULK_UPDATE_FIELDS = ("username", "email")
+
+
+class InvalidUserBatch(ValueError):
+    pass
+
+
+def prefix_filter(column, prefix):
+    """``column LIKE 'prefix%'`` written as a range so the index is used.
+
+    SQLite never uses an index for a case-insensitive LIKE; the range
+    ``prefix <= column < next(prefix)`` is a plain index range scan.
+    """
+    last = ord(prefix[-1])
+    if last >= 0x10FFFF:
+        return column >= prefix
+    return (column >= prefix) & (column < prefix[:-1] + chr(last + 1))
+
+
+def _in_ids(column, ids):
+    # Rendered inline rather than as one parameter per id, which would hit
+    # SQLite's bound-parameter limit on large batches; ids are validated ints.
+    return column.in_(bindparam(f"{column.key}_ids", ids, expanding=True, literal_execute=True))
+
+
+def parse_user_ids(data, maximum):
+    if not isinstance(data, dict) or not isinstance(data.get("ids"), list) or not data["ids"]:
+        raise InvalidUserBatch("Expected a JSON body like {\"ids\": [1, 2, 3]}")
+    if len(data["ids"]) > maximum:
+        raise InvalidUserBatch(f"At most {maximum} ids per request")
+    try:
+        return list(dict.fromkeys(int(user_id) for user_id in data["ids"]))
+    except (TypeError, ValueError):
+        raise InvalidUserBatch("ids must be integers")
+
+
+def parse_user_changes(data, maximum):
+    """Validate ``{"users": [{"id": 1, "email": ...}, ...]}`` into per-user changes."""
+    if not isinstance(data, dict) or not isinstance(data.get("users"), list) or not data["users"]:
+        raise InvalidUserBatch("Expected a JSON body like {\"users\": [{\"id\": 1, \"email\": \"...\"}]}")
+    if len(data["users"]) > maximum:
+        raise InvalidUserBatch(f"At most {maximum} users per request")
+
+    changes = {}
+    for index, record in enumerate(data["users"]):
+        if not isinstance(record, dict):
+            raise InvalidUserBatch(f"users[{index}] is not an object")
+        try:
+            user_id = int(record.get("id"))
+        except (TypeError, ValueError):
+            raise InvalidUserBatch(f"users[{index}] needs an integer id")
+        if user_id in changes:
+            raise InvalidUserBatch(f"User {user_id} appears more than once")
+        unknown = [field for field in record if field != "id" and field not in BULK_UPDATE_FIELDS]
+        if unknown:
+            raise InvalidUserBatch(
+                f"users[{index}]: cannot bulk update {', '.join(unknown)}; expected any of {', '.join(BULK_UPDATE_FIELDS)}"
+            )
+        values = {field: record[field] for field in BULK_UPDATE_FIELDS if field in record}
+        for field, value in values.items():
+            if not isinstance(value, str) or not value:
+                raise InvalidUserBatch(f"users[{index}]: {field} must be a non-empty string")
+        if not values:
+            raise InvalidUserBatch(f"users[{index}] has nothing to update")
+        changes[user_id] = values
+    return changes
+
+
+def existing_user_ids(user_ids):
+    return set(db.session.scalars(select(User.id).where(_in_ids(User.id, user_ids))))
+
+
+def update_users(changes):
+    """Apply per-user changes; returns the ids that were updated.
+
+    Users changing the same set of fields share one executemany UPDATE, so
+    a batch costs at most one statement per field combination. The caller
+    commits; a unique violation raises IntegrityError for the whole batch.
+    """
+    found = existing_user_ids(list(changes))
+    groups = defaultdict(list)
+    for user_id, values in changes.items():
+        if user_id in found:
+            row = {f"new_{field}": value for field, value in values.items()}
+            row["user_id"] = user_id
+            groups[tuple(sorted(values))].append(row)
+
+    table = User.__table__
+    for fields, rows in groups.items():
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("user_id"))
+            .values({field: bindparam(f"new_{field}") for field in fields})
+        )
+        db.session.execute(statement, rows)
+    return [user_id for user_id in changes if user_id in found]
+
+
+def delete_users(user_ids):
+    """Delete users and their bookings with set-based statements.
+
+    Unlike /delete_user, which leaves a user's bookings in place, this
+    removes them too, without loading any objects: booking requests stop
+    pointing at their bookings, bookings and users go in one DELETE each,
+    and the occupancy bitmaps of the removed stays are recomputed.
+    Returns ``(deleted_user_ids, deleted_booking_count)``; the caller commits.
+    """
+    found = existing_user_ids(user_ids)
+    deleted = [user_id for user_id in user_ids if user_id in found]
+    if not deleted:
+        return [], 0
+
+    stays = db.session.execute(
+        select(Booking.property_id, Booking.check_in_date, Booking.check_out_date).where(
+            _in_ids(Booking.user_id, deleted)
+        )
+    ).all()
+    booking_ids = select(Booking.id).where(_in_ids(Booking.user_id, deleted))
+    db.session.execute(
+        update(BookingRequest).where(BookingRequest.booking_id.in_(booking_ids)).values(booking_id=None),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.execute(
+        delete(Booking).where(_in_ids(Booking.user_id, deleted)), execution_options={"synchronize_session": False}
+    )
+    release_bookings(stays)
+    db.session.execute(delete(User).where(_in_ids(User.id, deleted)), execution_options={"synchronize_session": False})
+    return deleted, len(stays)
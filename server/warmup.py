@@ -0,0 +1,83 @@
+import logging
+import time
+from models import db, Property
+from serializers import (
+    USER_SCHEMA, PROPERTY_SCHEMA, BOOKING_SCHEMA, USER_LIST_FIELDS, PROPERTY_LIST_FIELDS, PROPERTY_DETAIL_FIELDS,
+    BOOKING_FIELDS,
+)
+
+logger = logging.getLogger("real_estate.warmup")
+
+# Read-only requests that touch the hot query shapes; "{property_id}" is
+# replaced by an existing property.
+DEFAULT_PREWARM_PATHS = (
+    "/get_all_properties",
+    "/get_all_properties?sort=price_asc",
+    "/get_property_by_id/{property_id}",
+    "/properties/{property_id}/bookings",
+    "/properties/facets",
+    "/search?q=house",
+)
+
+
+def warm_up(app):
+    """Do a worker's first-request work before it serves traffic.
+
+    Opens the pool's connections (running the SQLite pragmas or the
+    Postgres handshake), compiles the row serializers, and sends the
+    ``PREWARM_PATHS`` requests through the app so routing, SQLAlchemy's
+    statement cache and the lazily imported optional packages are ready.
+    Call it once per process, after forking. Returns timings in ms.
+    """
+    timings = {}
+    started = step = time.perf_counter()
+    with app.app_context():
+        engine = db.engine
+        # One connection per pooled slot (QueuePool), or just one otherwise.
+        size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+        connections = []
+        try:
+            for _ in range(size):
+                connection = engine.connect()
+                connection.exec_driver_sql("SELECT 1")
+                connections.append(connection)
+        finally:
+            for connection in connections:
+                connection.close()
+        timings["connections"], step = _elapsed(step)
+
+        for schema, fields in (
+            (USER_SCHEMA, USER_LIST_FIELDS),
+            (PROPERTY_SCHEMA, PROPERTY_LIST_FIELDS),
+            (PROPERTY_SCHEMA, PROPERTY_DETAIL_FIELDS),
+            (PROPERTY_SCHEMA, tuple(PROPERTY_SCHEMA.fields)),
+            (BOOKING_SCHEMA, BOOKING_FIELDS),
+            (BOOKING_SCHEMA, tuple(BOOKING_SCHEMA.fields)),
+        ):
+            schema.serializer(fields)
+        property_id = db.session.query(Property.id).order_by(Property.id).limit(1).scalar()
+        db.session.remove()
+        timings["serializers"], step = _elapsed(step)
+
+    client = app.test_client()
+    for path in app.config.get("PREWARM_PATHS") or DEFAULT_PREWARM_PATHS:
+        if "{property_id}" in path:
+            if property_id is None:
+                continue
+            path = path.format(property_id=property_id)
+        response = client.get(path, environ_base={"REMOTE_ADDR": "127.0.0.1"})
+        if response.status_code >= 500:
+            logger.warning("Warm-up request %s failed with %s", path, response.status_code)
+    timings["requests"], step = _elapsed(step)
+
+    similarity = app.extensions.get("similarity_index")
+    if similarity is not None and similarity.enabled:
+        similarity.snapshot()
+        timings["similarity"], step = _elapsed(step)
+    timings["total"], _ = _elapsed(started)
+    return timings
+
+
+def _elapsed(started):
+    now = time.perf_counter()
+    return round((now - started) * 1000, 2), now